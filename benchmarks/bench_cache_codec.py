@@ -0,0 +1,106 @@
+"""
+Measures the time it takes to load the server list cache at process start,
+comparing the JSON, binary and indexed cache formats, as well as the time it
+takes to look up a single server in an indexed cache file.
+
+Each load is done in a fresh process, so that the measurements include the
+cost of a cold start (e.g. nothing is shared with previous loads).
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SERVER_COUNT = 20_000
+REPETITIONS = 5
+
+
+def load(path: str, server_name: str = None):
+    """
+    Loads the server list cache (or only the specified server) and prints
+    the time it took, in seconds.
+    """
+    # pylint: disable=import-outside-toplevel
+    from proton.vpn.session.cache import CacheFile
+    from proton.vpn.session.servers.logicals import ServerList
+
+    if server_name:
+        start = time.perf_counter()
+        with CacheFile(Path(path)).open_mapped() as cache:
+            cache.get("Name", server_name)
+        decoded = time.perf_counter()
+        print(f"{decoded - start} {decoded - start}")
+        return
+
+    start = time.perf_counter()
+    data = CacheFile(Path(path)).load()
+    decoded = time.perf_counter()
+    ServerList.from_dict(data)
+    built = time.perf_counter()
+
+    print(f"{decoded - start} {built - start}")
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from server_list_data import generate_server_list_dict
+    from proton.vpn.session.cache import BinaryCodec, CacheFile, IndexedCodec, JSONCodec
+
+    data = generate_server_list_dict(SERVER_COUNT)
+    data["MaxTier"] = 2
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Loading {SERVER_COUNT} servers from cache "
+              f"(best of {REPETITIONS} cold starts):")
+        server_name = data["LogicalServers"][len(data["LogicalServers"]) // 2]["Name"]
+        for codec, label, args in (
+            (JSONCodec(), "JSON", ()),
+            (BinaryCodec(), "binary", ()),
+            (IndexedCodec(), "indexed", ()),
+            (IndexedCodec(), "indexed lookup", (server_name,)),
+        ):
+            path = Path(directory) / f"serverlist.{type(codec).__name__}"
+            CacheFile(path, codec=codec).save(data)
+
+            timings = [
+                tuple(map(float, subprocess.run(
+                    [sys.executable, __file__, str(path), *args],
+                    check=True, capture_output=True, text=True
+                ).stdout.split()))
+                for _ in range(REPETITIONS)
+            ]
+            decode_time = min(timing[0] for timing in timings)
+            total_time = min(timing[1] for timing in timings)
+            print(
+                f"  {label + ':':16}"
+                f" {os.path.getsize(path) / 1024 / 1024:6.1f} MB,"
+                f" decode {decode_time * 1000:7.1f} ms,"
+                f" decode + from_dict {total_time * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        load(*sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,100 @@
+"""
+Measures the trade-off of deduplicating the repeated values of the server
+list when loading it: the time it takes to load the server list cache and
+the memory used by the resulting server list, with and without interning.
+
+Each load is done in a fresh process, so that the measurements include the
+cost of a cold start and the peak RSS is not shared between loads.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SERVER_COUNT = 20_000
+REPETITIONS = 5
+
+
+def get_peak_rss_in_mb() -> float:
+    """:returns: the peak RSS of the current process (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(path: str, intern_values: str):
+    """
+    Loads the server list cache and prints the time it took, in seconds,
+    the peak RSS and the memory footprint of the server list, in MB.
+    """
+    # pylint: disable=import-outside-toplevel
+    from unittest.mock import Mock
+    from proton.vpn.session.cache import CacheFile
+    from proton.vpn.session.servers.fetcher import ServerListFetcher
+
+    fetcher = ServerListFetcher(
+        Mock(), cache_file=CacheFile(Path(path)), intern_values=intern_values == "True"
+    )
+
+    start = time.perf_counter()
+    server_list = fetcher.load_from_cache()
+    elapsed = time.perf_counter() - start
+
+    footprint = server_list.memory_footprint().total / 1024 / 1024
+    print(f"{elapsed} {get_peak_rss_in_mb()} {footprint}")
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from server_list_data import generate_server_list_dict
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "serverlist.json")
+        with open(path, "w", encoding="utf-8") as file:
+            data = generate_server_list_dict(SERVER_COUNT)
+            data["MaxTier"] = 2
+            json.dump(data, file)
+
+        print(f"Loading {SERVER_COUNT} servers from cache (best of {REPETITIONS} cold starts):")
+        for intern_values in (False, True):
+            timings = [
+                tuple(map(float, subprocess.run(
+                    [sys.executable, __file__, path, str(intern_values)],
+                    check=True, capture_output=True, text=True
+                ).stdout.split()))
+                for _ in range(REPETITIONS)
+            ]
+            label = "interned" if intern_values else "default"
+            print(
+                f"  {label + ':':10}"
+                f" load {min(timing[0] for timing in timings) * 1000:7.1f} ms,"
+                f" peak RSS {min(timing[1] for timing in timings):7.1f} MB,"
+                f" server list {timings[0][2]:6.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        load(*sys.argv[1:])
+    else:
+        main()
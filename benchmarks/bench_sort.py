@@ -0,0 +1,70 @@
+"""
+Measures the time it takes to sort a server list alphabetically by
+country and server name, comparing the string keys built on every sort
+with the natural sort keys precomputed by LogicalServer.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import random
+import timeit
+
+from proton.vpn.session.servers.logicals import ServerList
+
+from server_list_data import generate_server_list_dict
+
+SERVER_COUNT = 20_000
+REPETITIONS = 20
+
+
+def string_sort_key(server) -> str:
+    """Sort key as it was computed before it was precomputed per server."""
+    country_name = server.exit_country_name
+    server_name = server.name or ""
+    server_name = server_name.lower()
+    if "#" in server_name:
+        server_name = f"{server_name.split('#')[0]}#" \
+                      f"{server_name.split('#')[1].zfill(10)}"
+
+    return f"{country_name}__{server_name}"
+
+
+def main():
+    server_list = ServerList.from_dict(generate_server_list_dict(SERVER_COUNT))
+    logicals = list(server_list.logicals)
+
+    def shuffle():
+        random.shuffle(logicals)
+
+    before = min(timeit.repeat(
+        "logicals.sort(key=string_sort_key)", setup=shuffle,
+        number=1, repeat=REPETITIONS, globals={**globals(), "logicals": logicals}
+    ))
+    after = min(timeit.repeat(
+        "logicals.sort(key=sort_key)", setup=shuffle,
+        number=1, repeat=REPETITIONS,
+        globals={"logicals": logicals, "sort_key": lambda server: server.sort_key}
+    ))
+
+    print(f"Sorting {SERVER_COUNT} servers (best of {REPETITIONS}):")
+    print(f"  string keys built on every sort: {before * 1000:8.2f} ms")
+    print(f"  precomputed natural sort keys:   {after * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Measures the peak memory (RSS) used to load a server list from a JSON file,
+comparing loading the whole JSON document before building the server list
+with parsing the document incrementally.
+
+Each approach is measured in a separate process so that they do not affect
+each other.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+SERVER_COUNT = 20_000
+MODES = ("baseline", "json.load + from_dict", "from_stream")
+
+
+def get_peak_rss_in_mb() -> float:
+    """:returns: the peak RSS of the current process (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(mode: str, path: str):
+    """Loads the server list from the file using the specified approach."""
+    # pylint: disable=import-outside-toplevel
+    from proton.vpn.session.servers.logicals import ServerList
+    from proton.vpn.session.servers.memory import ValueInterner, intern_server_list_data
+
+    if mode == "json.load + from_dict":
+        with open(path, "r", encoding="utf-8") as file:
+            server_list = ServerList.from_dict(intern_server_list_data(json.load(file)))
+    elif mode == "from_stream":
+        with open(path, "rb") as file:
+            server_list = ServerList.from_stream(file, interner=ValueInterner())
+    else:
+        server_list = None
+
+    print(f"{get_peak_rss_in_mb():.1f} {len(server_list or ())}")
+
+
+def main():
+    # pylint: disable=import-outside-toplevel
+    from server_list_data import generate_server_list_dict
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "serverlist.json")
+        with open(path, "w", encoding="utf-8") as file:
+            data = generate_server_list_dict(SERVER_COUNT)
+            data["MaxTier"] = 2
+            json.dump(data, file)
+        file_size = os.path.getsize(path) / 1024 / 1024
+
+        print(f"Loading {SERVER_COUNT} servers from a {file_size:.1f} MB file (peak RSS):")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, mode, path],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            print(f"  {mode + ':':24} {float(output[0]):8.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        load(sys.argv[1], sys.argv[2])
+    else:
+        main()
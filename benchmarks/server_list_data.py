@@ -0,0 +1,87 @@
+"""
+Synthetic server list payloads used by the benchmarks.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import random
+
+COUNTRIES = {
+    "AR": ("Buenos Aires", -34.6, -58.4),
+    "AU": ("Sydney", -33.9, 151.2),
+    "CA": ("Toronto", 43.7, -79.4),
+    "CH": ("Zurich", 47.4, 8.5),
+    "DE": ("Frankfurt", 50.1, 8.7),
+    "FR": ("Paris", 48.9, 2.4),
+    "JP": ("Tokyo", 35.7, 139.7),
+    "NL": ("Amsterdam", 52.4, 4.9),
+    "SE": ("Stockholm", 59.3, 18.1),
+    "US": ("New York", 40.7, -74.0),
+}
+
+
+def generate_server_list_dict(
+        logicals_count: int, physicals_per_logical: int = 2, seed: int = 0
+) -> dict:
+    """:returns: a /vpn/logicals-like payload with the given number of logicals."""
+    rng = random.Random(seed)
+    country_codes = sorted(COUNTRIES)
+    logicals = []
+    for index in range(logicals_count):
+        country_code = country_codes[index % len(country_codes)]
+        city, latitude, longitude = COUNTRIES[country_code]
+        logical_id = f"logical-{index:08d}"
+        logicals.append({
+            "ID": logical_id,
+            "Name": f"{country_code}#{index // len(country_codes) + 1}",
+            "EntryCountry": country_code,
+            "ExitCountry": country_code,
+            "HostCountry": None,
+            "Domain": f"node-{country_code.lower()}-{index:05d}.protonvpn.net",
+            "Tier": rng.choice([0, 2, 2, 2]),
+            "Features": rng.choice([0, 0, 4, 8, 12, 1, 2]),
+            "Region": None,
+            "City": city,
+            "Score": rng.uniform(0.5, 10),
+            "Load": rng.randint(0, 100),
+            "Status": 1,
+            "Location": {
+                "Lat": latitude + rng.uniform(-1, 1),
+                "Long": longitude + rng.uniform(-1, 1),
+            },
+            "Servers": [
+                {
+                    "ID": f"{logical_id}-physical-{physical_index}",
+                    "EntryIP": f"10.{index % 256}.{physical_index}.1",
+                    "ExitIP": f"10.{index % 256}.{physical_index}.2",
+                    "Domain": f"node-{country_code.lower()}-{index:05d}.protonvpn.net",
+                    "Status": 1,
+                    "Generation": 0,
+                    "Label": str(physical_index),
+                    "ServicesDownReason": None,
+                    "X25519PublicKey": "UBA8UbeQMmwfFeBp2lwwqwa/aF606BQKjzKHmNoJ03E=",
+                }
+                for physical_index in range(physicals_per_logical)
+            ],
+        })
+
+    return {
+        "Code": 1000,
+        "LogicalServers": logicals,
+        "MaxTier": 2,
+    }
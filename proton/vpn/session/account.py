@@ -133,6 +133,23 @@ class VPNAccount:
             )
         )
 
+    @property
+    def certificate(self) -> VPNCertificate:
+        """
+        :return: the certificate used to authenticate against the VPN servers.
+        """
+        return self._certificate
+
+    def with_certificate(self, certificate: VPNCertificate) -> VPNAccount:
+        """
+        :return: a copy of this account with the specified certificate,
+            e.g. after fetching a new one before the current one expires.
+        """
+        return VPNAccount(
+            vpninfo=self._vpninfo, certificate=certificate,
+            secrets=self._secrets, location=self._location
+        )
+
     @property
     def location(self) -> VPNLocation:
         """
@@ -16,20 +16,285 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+from __future__ import annotations
 
+import asyncio
+import io
 import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from proton.vpn import logging
+
+logger = logging.getLogger(__name__)
+
+CacheData = Union[dict, Callable[[], dict]]
+
+
+class CacheCodec(ABC):
+    """Format in which the cache data is persisted."""
+
+    @abstractmethod
+    def encode(self, data: dict, file: BinaryIO) -> None:
+        """Writes the dictionary to the file."""
+
+    @abstractmethod
+    def decode(self, file: BinaryIO) -> dict:
+        """
+        Reads a dictionary from the file.
+
+        :raises ValueError: if the file content is invalid.
+        """
+
+
+class JSONCodec(CacheCodec):
+    """Persists the cache data as UTF-8 encoded JSON."""
+
+    def encode(self, data: dict, file: BinaryIO) -> None:
+        text_file = io.TextIOWrapper(file, encoding="utf-8")
+        json.dump(obj=data, fp=text_file)
+        text_file.flush()
+        text_file.detach()
+
+    def decode(self, file: BinaryIO) -> dict:
+        return json.load(file)
+
+
+class BinaryCodec(CacheCodec):
+    """
+    Persists the cache data as a pickle (protocol 5) snapshot preceded by a
+    versioned header. It is smaller and faster to decode than JSON, which
+    also shortens loading the server list from it, although building the
+    server list still takes most of that time.
+
+    Values shared by several entries (see
+    :class:`proton.vpn.session.servers.memory.ValueInterner`) are only
+    written once and are still shared after loading them.
+
+    Only plain data (dicts, lists, strings, numbers...) can be persisted:
+    loading any other type of object is refused.
+    """
+    MAGIC = b"\x00PVPNCACHE"
+    VERSION = 1
+    HEADER = MAGIC + bytes([VERSION])
+    PICKLE_PROTOCOL = 5
+
+    def encode(self, data: dict, file: BinaryIO) -> None:
+        file.write(self.HEADER)
+        pickle.dump(data, file, protocol=self.PICKLE_PROTOCOL)
+
+    def decode(self, file: BinaryIO) -> dict:
+        header = file.read(len(self.HEADER))
+        if header != self.HEADER:
+            raise ValueError(f"Unexpected cache file header: {header!r}.")
+
+        return _load_data(file)
+
+    @classmethod
+    def matches(cls, header: bytes) -> bool:
+        """:returns: whether the file header corresponds to this format."""
+        return header.startswith(cls.MAGIC)
+
+
+class IndexedCodec(CacheCodec):
+    """
+    Persists the items of a list of the cache data (by default, the logical
+    servers) as separate records, preceded by a header with the rest of the
+    data and an index of the records by some of their keys (by default, id
+    and name).
+
+    Files in this format can be opened with :meth:`CacheFile.open_mapped`
+    to decode single records without reading the rest of the file.
+
+    Layout: versioned header, header length (unsigned 64 bits, little
+    endian), header, records. The header and each record are pickle
+    (protocol 5) snapshots, with the same restrictions as :class:`BinaryCodec`.
+    """
+    MAGIC = b"\x00PVPNINDEX"
+    VERSION = 1
+    HEADER = MAGIC + bytes([VERSION])
+    PICKLE_PROTOCOL = 5
+    HEADER_LENGTH = struct.Struct("<Q")
+
+    def __init__(
+            self, records_key: str = "LogicalServers", index_keys: Sequence[str] = ("ID", "Name")
+    ):
+        """
+        :param records_key: key of the list whose items are stored as records.
+        :param index_keys: keys of the records by which they are indexed.
+        """
+        self.records_key = records_key
+        self.index_keys = tuple(index_keys)
+
+    def encode(self, data: dict, file: BinaryIO) -> None:
+        records = [
+            pickle.dumps(record, protocol=self.PICKLE_PROTOCOL)
+            for record in data.get(self.records_key, [])
+        ]
+        spans = []
+        offset = 0
+        for record in records:
+            spans.append((offset, len(record)))
+            offset += len(record)
+
+        index = {key: {} for key in self.index_keys}
+        for position, record in enumerate(data.get(self.records_key, [])):
+            for key in self.index_keys:
+                if record.get(key) is not None:
+                    index[key][record[key]] = position
+
+        header = pickle.dumps({
+            "records_key": self.records_key,
+            "data": {key: value for key, value in data.items() if key != self.records_key},
+            "spans": spans,
+            "index": index,
+        }, protocol=self.PICKLE_PROTOCOL)
+
+        file.write(self.HEADER)
+        file.write(self.HEADER_LENGTH.pack(len(header)))
+        file.write(header)
+        for record in records:
+            file.write(record)
+
+    def decode(self, file: BinaryIO) -> dict:
+        header_length = _read_indexed_header(
+            file.read(len(self.HEADER) + self.HEADER_LENGTH.size)
+        )
+        header = _load_data(io.BytesIO(file.read(header_length)))
+        data = dict(header["data"])
+        data[header["records_key"]] = [
+            _load_data(io.BytesIO(file.read(length))) for _, length in header["spans"]
+        ]
+        return data
+
+    @classmethod
+    def matches(cls, header: bytes) -> bool:
+        """:returns: whether the file header corresponds to this format."""
+        return header.startswith(cls.MAGIC)
+
+
+class MappedCache:
+    """
+    Read-only view of a cache file persisted with :class:`IndexedCodec`.
+
+    The file is mapped into memory, so that only the parts of the file that
+    are accessed are read, and so that processes reading the same file
+    share its pages. Only the header is decoded upfront; records are
+    decoded on access.
+    """
+
+    def __init__(self, file_path: Path):
+        """
+        :param file_path: path to the cache file.
+        :raises ValueError: if the file is not in the expected format.
+        :raises FileNotFoundError: if the file was not found.
+        """
+        with open(file_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            header_end = len(IndexedCodec.HEADER) + IndexedCodec.HEADER_LENGTH.size
+            header_length = _read_indexed_header(self._mmap[:header_end])
+            self._records_start = header_end + header_length
+            header = _load_data(io.BytesIO(self._mmap[header_end:self._records_start]))
+            self._data: dict = header["data"]
+            self._spans: List[Tuple[int, int]] = header["spans"]
+            self._index: Dict[str, dict] = header["index"]
+        except (ValueError, KeyError, TypeError):
+            self.close()
+            raise
+
+    @property
+    def data(self) -> dict:
+        """Cache data other than the records."""
+        return self._data
+
+    def get(self, key: str, value) -> Optional[dict]:
+        """
+        :returns: the record with the given value for the given key
+            (e.g. "Name"), or None if not found.
+        :raises KeyError: if the records were not indexed by the key.
+        """
+        position = self._index[key].get(value)
+        return self[position] if position is not None else None
+
+    def __getitem__(self, position: int) -> dict:
+        offset, length = self._spans[position]
+        start = self._records_start + offset
+        return _load_data(io.BytesIO(self._mmap[start:start + length]))
+
+    def __len__(self):
+        return len(self._spans)
+
+    def __iter__(self) -> Iterator[dict]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def close(self):
+        """Unmaps the file."""
+        self._mmap.close()
+
+    def __enter__(self) -> MappedCache:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _DataUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Unexpected object in cache file: {module}.{name}")
+
+
+def _load_data(file: BinaryIO) -> dict:
+    try:
+        data = _DataUnpickler(file).load()
+    except (
+        pickle.UnpicklingError, EOFError, IndexError, KeyError, TypeError
+    ) as error:
+        raise ValueError("Invalid cache file content.") from error
+
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cache file content.")
+    return data
+
+
+def _read_indexed_header(header: bytes) -> int:
+    """:returns: the length of the header of a file in the indexed format."""
+    if len(header) != len(IndexedCodec.HEADER) + IndexedCodec.HEADER_LENGTH.size \
+            or not header.startswith(IndexedCodec.HEADER):
+        raise ValueError(f"Unexpected cache file header: {header[:len(IndexedCodec.HEADER)]!r}.")
+    return IndexedCodec.HEADER_LENGTH.unpack_from(header, len(IndexedCodec.HEADER))[0]
 
 
 class CacheFile:
     """
     Persists/loads a python dictionary to disk.
+
+    The data is persisted with the codec selected for the file. Files are
+    loaded with the codec they were persisted with, falling back to JSON.
     """
-    def __init__(self, file_path: Path):
+    def __init__(self, file_path: Path, codec: Optional[CacheCodec] = None):
         """
         :param file_path: Path from/to which load/persist the cache data.
+        :param codec: format in which the cache data is persisted.
+            By default, JSON.
         """
         self.file_path = file_path
+        self.codec = codec or JSONCodec()
+        self._pending_data: Optional[CacheData] = None
+        self._save_task: Optional[asyncio.Task] = None
+        # Incremented every time the cache is removed, so that background
+        # saves scheduled before that are discarded.
+        self._generation = 0
+        self._lock = threading.Lock()
 
     @property
     def exists(self):
@@ -38,13 +303,70 @@ class CacheFile:
 
     def save(self, data: dict) -> None:
         """Persists the dictionary to the current file path."""
-        CacheFile.to_path(data, self.file_path)
+        with self._lock:
+            CacheFile.to_path(data, self.file_path, self.codec)
+
+    def save_in_background(self, data: CacheData) -> None:
+        """
+        Persists the dictionary to the current file path from a worker
+        thread, so that the event loop is not blocked while it is serialized
+        and written. It has to be called from a running event loop.
+
+        Saves requested while a previous one is still ongoing are coalesced:
+        only the latest data is written afterwards.
+
+        :param data: dictionary to persist, or function returning it. The
+            function is called from the worker thread, and neither it nor
+            the dictionary should be modified afterwards.
+        """
+        self._pending_data = data
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.get_running_loop().create_task(self._save_pending_data())
+
+    async def flush(self) -> None:
+        """Waits for the ongoing background saves, e.g. before shutting down."""
+        while self._save_task is not None and not self._save_task.done():
+            await asyncio.shield(self._save_task)
+
+    async def _save_pending_data(self):
+        loop = asyncio.get_running_loop()
+        while self._pending_data is not None:
+            data, self._pending_data = self._pending_data, None
+            try:
+                await loop.run_in_executor(None, self._save_snapshot, data, self._generation)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(f"Error saving cache file {self.file_path}.")
+
+    def _save_snapshot(self, data: CacheData, generation: int):
+        if callable(data):
+            data = data()
+
+        with self._lock:
+            if generation == self._generation:
+                CacheFile.to_path(data, self.file_path, self.codec)
 
     @staticmethod
-    def to_path(data: dict, file_path: Path) -> None:
-        """Persists the dictionary to the given path."""
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(obj=data, fp=file)
+    def to_path(data: dict, file_path: Path, codec: Optional[CacheCodec] = None) -> None:
+        """
+        Persists the dictionary to the given path, in JSON format unless
+        another codec is specified.
+
+        The data is written to a temporary file first, which then replaces
+        the one at the given path, so that the file is never left half written.
+        """
+        file_path = Path(file_path)
+        codec = codec or JSONCodec()
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=file_path.parent,
+            prefix=f".{file_path.name}.", suffix=".tmp", delete=False
+        ) as file:
+            try:
+                codec.encode(data, file)
+            except BaseException:
+                file.close()
+                os.unlink(file.name)
+                raise
+        os.replace(file.name, file_path)
 
     def load(self) -> dict:
         """
@@ -59,16 +381,53 @@ class CacheFile:
     @staticmethod
     def from_path(file_path: Path) -> dict:
         """
-        Loads a dictionary from a given file path.
+        Loads a dictionary from a given file path, in the format it was
+        persisted with.
 
         :param: file_path: path to the file to load as dictionary.
         :returns: the loaded dictionary.
         :raises ValueError: if the file content is invalid.
         :raises FileNotFoundError: if the file was not found.
         """
-        with open(file_path, "r", encoding="utf-8") as file:
-            return json.load(file)
+        with open(file_path, "rb") as file:
+            header = file.read(max(len(BinaryCodec.HEADER), len(IndexedCodec.HEADER)))
+            file.seek(0)
+            if BinaryCodec.matches(header):
+                codec = BinaryCodec()
+            elif IndexedCodec.matches(header):
+                codec = IndexedCodec()
+            else:
+                codec = JSONCodec()
+            return codec.decode(file)
+
+    def open(self) -> BinaryIO:
+        """
+        Opens the current file path to read it as a binary stream, e.g. to
+        parse it incrementally instead of loading it all at once.
+
+        :returns: the opened file, which should be closed after reading it.
+        :raises FileNotFoundError: if the file was not found.
+        """
+        return open(self.file_path, "rb")  # pylint: disable=consider-using-with
+
+    def open_mapped(self) -> MappedCache:
+        """
+        Maps the current file path into memory, to decode single records
+        instead of loading it all at once. The file must have been persisted
+        with :class:`IndexedCodec`.
+
+        :returns: the mapped cache, which should be closed after reading it.
+        :raises ValueError: if the file is not in the expected format.
+        :raises FileNotFoundError: if the file was not found.
+        """
+        return MappedCache(self.file_path)
 
     def remove(self) -> None:
-        """Removes the current persistence file, if exists."""
-        self.file_path.unlink(missing_ok=True)
+        """
+        Removes the current persistence file, if exists.
+        Pending background saves are discarded.
+        """
+        self._pending_data = None
+        with self._lock:
+            self._generation += 1
+            self.file_path.unlink(missing_ok=True)
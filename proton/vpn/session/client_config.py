@@ -20,14 +20,14 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 import random
-from typing import List, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 import time
 
 from proton.utils.environment import VPNExecutionEnvironment
 
 from proton.vpn.session.cache import CacheFile
 from proton.vpn.session.exceptions import ClientConfigDecodeError
-from proton.vpn.session.utils import rest_api_request
+from proton.vpn.session.utils import rest_api_request, SingleFlight
 
 if TYPE_CHECKING:
     from proton.vpn.session import VPNSession
@@ -231,31 +231,48 @@ class ClientConfigFetcher:
     ROUTE = "/vpn/v2/clientconfig"
     CACHE_PATH = Path(VPNExecutionEnvironment().path_cache) / "clientconfig.json"
 
-    def __init__(self, session: "VPNSession"):
+    def __init__(
+            self, session: "VPNSession",
+            single_flight: bool = True,
+            cache_file: Optional[CacheFile] = None
+    ):
         """
         :param session: session used to retrieve the client configuration.
+        :param single_flight: whether concurrent fetches should share a
+            single REST API request or not.
+        :param cache_file: cache file used to persist the client configuration.
         """
         self._session = session
         self._client_config = None
-        self._cache_file = CacheFile(self.CACHE_PATH)
+        self._cache_file = cache_file or CacheFile(self.CACHE_PATH)
+        self._single_flight = SingleFlight(enabled=single_flight)
 
     def clear_cache(self):
         """Discards the cache, if existing."""
         self._client_config = None
         self._cache_file.remove()
 
+    async def flush_cache(self):
+        """Waits for the client configuration to be persisted to the cache."""
+        await self._cache_file.flush()
+
     async def fetch(self) -> ClientConfig:
         """
         Fetches the client configuration from the REST API.
+        Concurrent calls share the same request, unless single flight
+        was disabled.
         :returns: the fetched client configuration.
         """
+        return await self._single_flight.run(self.ROUTE, self._fetch)
+
+    async def _fetch(self) -> ClientConfig:
         response = await rest_api_request(
             self._session,
             self.ROUTE,
         )
         response["ExpirationTime"] = ClientConfig.get_expiration_time()
-        self._cache_file.save(response)
         self._client_config = ClientConfig.from_dict(response)
+        self._cache_file.save_in_background(response)
         return self._client_config
 
     def load_from_cache(self) -> ClientConfig:
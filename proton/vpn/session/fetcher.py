@@ -18,7 +18,8 @@ along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
+import asyncio
+from typing import TYPE_CHECKING, Callable, Optional
 
 from proton.vpn import logging
 from proton.vpn.session.client_config import ClientConfigFetcher, ClientConfig
@@ -103,6 +104,14 @@ class VPNSessionFetcher:
         """Fetches new server loads and updates the current server list with them."""
         return await self._server_list_fetcher.update_loads()
 
+    def subscribe_to_server_loads_updates(self, callback: Callable[[ServerList], None]):
+        """Subscribes to server loads updates. See ServerListFetcher.subscribe_to_loads_updates."""
+        self._server_list_fetcher.subscribe_to_loads_updates(callback)
+
+    def unsubscribe_from_server_loads_updates(self, callback: Callable[[ServerList], None]):
+        """Unsubscribes a callback previously subscribed to server loads updates."""
+        self._server_list_fetcher.unsubscribe_from_loads_updates(callback)
+
     def load_client_config_from_cache(self) -> ClientConfig:
         """
         Loads the previously persisted client configuration.
@@ -119,3 +128,10 @@ class VPNSessionFetcher:
         """Discards the cache, if existing."""
         self._server_list_fetcher.clear_cache()
         self._client_config_fetcher.clear_cache()
+
+    async def flush_cache(self):
+        """Waits for the data being persisted to the cache in the background."""
+        await asyncio.gather(
+            self._server_list_fetcher.flush_cache(),
+            self._client_config_fetcher.flush_cache()
+        )
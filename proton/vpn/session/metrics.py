@@ -0,0 +1,200 @@
+"""
+Metrics about the requests made to Proton's REST API.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the request duration histogram buckets.
+# The last bucket counts the requests slower than the last bound.
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class MetricsCollector(ABC):  # pylint: disable=too-few-public-methods
+    """Receives the metrics of every REST API request made by the package."""
+
+    @abstractmethod
+    def record_request(
+            self, route: str, duration: float,
+            received_bytes: Optional[int] = None,
+            error: Optional[BaseException] = None
+    ):
+        """
+        Records a REST API request.
+
+        :param route: route of the request, without query string.
+        :param duration: seconds it took to get the response.
+        :param received_bytes: size of the response body, if known.
+        :param error: exception raised by the request, if it failed.
+        """
+
+
+@dataclass(frozen=True)
+class LatencyHistogram:
+    """Distribution of the request durations."""
+    buckets: Tuple[float, ...]
+    """Upper bound of each bucket, in seconds. The last one is infinity."""
+    counts: Tuple[int, ...]
+    """Number of requests in each bucket."""
+    total: float
+    """Sum of the durations of all the requests, in seconds."""
+    minimum: Optional[float]
+    maximum: Optional[float]
+
+    @property
+    def count(self) -> int:
+        """Number of requests."""
+        return sum(self.counts)
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean duration of the requests, in seconds."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """
+        :returns: the upper bound of the bucket containing the given
+            quantile (e.g. 0.95) of the request durations.
+        """
+        if not self.count:
+            return None
+
+        rank = quantile * self.count
+        accumulated = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            accumulated += count
+            if accumulated >= rank:
+                return bucket if bucket != math.inf else self.maximum
+        return self.maximum
+
+
+@dataclass(frozen=True)
+class RouteMetrics:
+    """Metrics of the requests made to a route."""
+    route: str
+    requests: int
+    errors: Dict[str, int]
+    """Number of failed requests, by exception class name."""
+    received_bytes: int
+    """Total size of the response bodies whose size is known."""
+    latency: LatencyHistogram
+
+    @property
+    def successes(self) -> int:
+        """Number of successful requests."""
+        return self.requests - sum(self.errors.values())
+
+
+class _RouteAccumulator:  # pylint: disable=too-few-public-methods
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.requests = 0
+        self.errors: Dict[str, int] = {}
+        self.received_bytes = 0
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+
+class InMemoryMetricsCollector(MetricsCollector):
+    """
+    Default metrics collector, which aggregates the metrics in memory
+    per route. The aggregated metrics are retrieved with :meth:`snapshot`.
+    """
+
+    def __init__(self, latency_buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        """
+        :param latency_buckets: upper bounds, in seconds, of the request
+            duration histogram buckets, in ascending order.
+        """
+        self._buckets = tuple(latency_buckets)
+        self._routes: Dict[str, _RouteAccumulator] = {}
+        self._lock = threading.Lock()
+
+    def record_request(
+            self, route: str, duration: float,
+            received_bytes: Optional[int] = None,
+            error: Optional[BaseException] = None
+    ):
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = _RouteAccumulator(self._buckets)
+
+            metrics.requests += 1
+            if error is not None:
+                error_class = type(error).__name__
+                metrics.errors[error_class] = metrics.errors.get(error_class, 0) + 1
+            if received_bytes is not None:
+                metrics.received_bytes += received_bytes
+            metrics.counts[bisect.bisect_left(self._buckets, duration)] += 1
+            metrics.total += duration
+            metrics.minimum = duration if metrics.minimum is None \
+                else min(metrics.minimum, duration)
+            metrics.maximum = duration if metrics.maximum is None \
+                else max(metrics.maximum, duration)
+
+    def snapshot(self) -> Dict[str, RouteMetrics]:
+        """:returns: a copy of the metrics aggregated so far, by route."""
+        with self._lock:
+            return {
+                route: RouteMetrics(
+                    route=route,
+                    requests=metrics.requests,
+                    errors=dict(metrics.errors),
+                    received_bytes=metrics.received_bytes,
+                    latency=LatencyHistogram(
+                        buckets=self._buckets + (math.inf,),
+                        counts=tuple(metrics.counts),
+                        total=metrics.total,
+                        minimum=metrics.minimum,
+                        maximum=metrics.maximum,
+                    )
+                )
+                for route, metrics in self._routes.items()
+            }
+
+    def reset(self):
+        """Discards the metrics aggregated so far."""
+        with self._lock:
+            self._routes.clear()
+
+
+_metrics_collector: MetricsCollector = InMemoryMetricsCollector()
+
+
+def get_metrics_collector() -> MetricsCollector:
+    """
+    :returns: the collector receiving the metrics of the REST API requests.
+        By default, an :class:`InMemoryMetricsCollector`.
+    """
+    return _metrics_collector
+
+
+def set_metrics_collector(collector: MetricsCollector):
+    """Sets the collector receiving the metrics of the REST API requests."""
+    global _metrics_collector  # pylint: disable=global-statement,invalid-name
+    _metrics_collector = collector
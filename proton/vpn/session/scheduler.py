@@ -0,0 +1,184 @@
+"""
+Background refresh of the VPN session data before it expires.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence, TYPE_CHECKING
+
+from proton.vpn import logging
+
+if TYPE_CHECKING:
+    from proton.vpn.session import VPNSession
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RefreshTask:
+    """Piece of session data refreshed by the :class:`RefreshScheduler`."""
+    name: str
+    """Name of the data, used for logging purposes."""
+    get_expiration_time: Callable[[], Optional[float]]
+    """Returns the unix time at which the data expires, or None if there is no data."""
+    refresh: Callable[[], Awaitable]
+    """Fetches the data again."""
+
+
+class RefreshScheduler:  # pylint: disable=too-many-instance-attributes
+    """
+    Refreshes session data in the background shortly before it expires, so
+    that readers never have to wait for a network request to get fresh data.
+
+    Each task is refreshed at a random time between `lead_time` and
+    `lead_time + jitter` seconds before its expiration time, so that clients
+    do not all refresh their data at the same time.
+    """
+    LEAD_TIME = 60  # seconds
+    JITTER = 30  # seconds
+    RETRY_DELAY = 60  # seconds
+    # Waits are capped so that expiration times are checked again after the
+    # system is resumed from suspension.
+    MAX_SLEEP = 5 * 60  # seconds
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            tasks: Sequence[RefreshTask],
+            *,
+            clock: Callable[[], float] = time.time,
+            sleep: Callable[[float], Awaitable] = asyncio.sleep,
+            lead_time: float = LEAD_TIME,
+            jitter: float = JITTER,
+            retry_delay: float = RETRY_DELAY,
+            rng: Optional[random.Random] = None
+    ):
+        """
+        :param tasks: the data to refresh.
+        :param clock: function returning the current unix time.
+        :param sleep: coroutine function used to wait for a number of seconds.
+        :param lead_time: seconds before the expiration time at which data
+            is refreshed.
+        :param jitter: maximum amount of random seconds added to the lead time.
+        :param retry_delay: seconds to wait before checking again data that
+            is not available yet or that could not be refreshed.
+        :param rng: random number generator used to compute the jitter.
+        """
+        self._tasks = list(tasks)
+        self._clock = clock
+        self._sleep = sleep
+        self._lead_time = lead_time
+        self._jitter = jitter
+        self._retry_delay = retry_delay
+        self._rng = rng or random.Random()
+        self._running_tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def for_session(cls, session: VPNSession, **kwargs) -> RefreshScheduler:
+        """
+        :returns: a scheduler refreshing the server list, the server loads,
+            the client configuration and the VPN certificate of the session.
+            See the constructor for the supported keyword arguments.
+        """
+        def get_certificate_refresh_time():
+            account = session.vpn_account
+            return account.certificate.RefreshTime if account else None
+
+        return cls([
+            RefreshTask(
+                "server list",
+                lambda: session.server_list.expiration_time if session.server_list else None,
+                session.fetch_server_list
+            ),
+            RefreshTask(
+                "server loads",
+                lambda: session.server_list.loads_expiration_time
+                if session.server_list else None,
+                session.update_server_loads
+            ),
+            RefreshTask(
+                "client config",
+                lambda: session.client_config.expiration_time if session.client_config else None,
+                session.fetch_client_config
+            ),
+            RefreshTask(
+                "certificate", get_certificate_refresh_time, session.fetch_certificate
+            ),
+        ], **kwargs)
+
+    @property
+    def running(self) -> bool:
+        """Whether the scheduler was started or not."""
+        return bool(self._running_tasks)
+
+    def start(self):
+        """
+        Starts refreshing the data in the background. It has to be called
+        from a running event loop. Calling it while running has no effect.
+        """
+        if self.running:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._running_tasks = [loop.create_task(self._run(task)) for task in self._tasks]
+
+    async def stop(self):
+        """Stops refreshing the data, cancelling any ongoing refresh."""
+        running_tasks, self._running_tasks = self._running_tasks, []
+        for running_task in running_tasks:
+            running_task.cancel()
+        await asyncio.gather(*running_tasks, return_exceptions=True)
+
+    async def _run(self, task: RefreshTask):
+        jitter = None
+        while True:
+            expiration_time = task.get_expiration_time()
+            if expiration_time is None:
+                await self._sleep(self._retry_delay)
+                continue
+
+            # The jitter is kept until the data is refreshed so that it
+            # does not change every time the expiration time is checked.
+            if jitter is None:
+                jitter = self._rng.uniform(0, self._jitter)
+
+            delay = expiration_time - self._lead_time - jitter - self._clock()
+            if delay > 0:
+                await self._sleep(min(delay, self.MAX_SLEEP))
+                continue
+
+            jitter = None
+            await self._refresh(task, expiration_time)
+
+    async def _refresh(self, task: RefreshTask, expiration_time: float):
+        logger.info(f"Refreshing {task.name}.")
+        try:
+            await task.refresh()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception(f"Error refreshing {task.name}.")
+            await self._sleep(self._retry_delay)
+            return
+
+        if task.get_expiration_time() == expiration_time:
+            # Avoid refreshing in a loop if the expiration time did not change.
+            await self._sleep(self._retry_delay)
@@ -0,0 +1,131 @@
+"""
+Changes applied to a server list by a server loads update.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from proton.vpn.session.servers.types import LogicalServer
+
+# (load, score, enabled) of a logical server.
+LoadState = Tuple[int, float, bool]
+
+
+def get_load_state(logical_server: LogicalServer) -> LoadState:
+    """:returns: the attributes of a logical server that change with server load updates."""
+    return logical_server.load, logical_server.score, logical_server.enabled
+
+
+@dataclass(frozen=True)
+class ServerChange:  # pylint: disable=too-many-instance-attributes
+    """Old and new load, score and status of a logical server."""
+    id: str  # pylint: disable=invalid-name
+    old_load: int
+    new_load: int
+    old_score: float
+    new_score: float
+    old_enabled: bool
+    new_enabled: bool
+
+    @property
+    def load_changed(self) -> bool:
+        """Whether the load of the server changed or not."""
+        return self.old_load != self.new_load
+
+    @property
+    def score_changed(self) -> bool:
+        """Whether the score of the server changed or not."""
+        return self.old_score != self.new_score
+
+    @property
+    def enabled_changed(self) -> bool:
+        """Whether the server was enabled or disabled."""
+        return self.old_enabled != self.new_enabled
+
+    @staticmethod
+    def build(
+            server_id: str, old_state: LoadState, new_state: LoadState
+    ) -> Optional[ServerChange]:
+        """
+        :param server_id: id of the logical server.
+        :param old_state: state of the logical server before the update,
+            see :func:`get_load_state`.
+        :param new_state: state of the logical server after the update.
+        :returns: the server change, or None if the load, the score and
+            the status did not change.
+        """
+        if old_state == new_state:
+            return None
+
+        old_load, old_score, old_enabled = old_state
+        new_load, new_score, new_enabled = new_state
+        return ServerChange(
+            id=server_id,
+            old_load=old_load, new_load=new_load,
+            old_score=old_score, new_score=new_score,
+            old_enabled=old_enabled, new_enabled=new_enabled
+        )
+
+
+@dataclass(frozen=True)
+class ServerListChanges:
+    """Changes applied to the logical servers by a server loads update."""
+    changes: Tuple[ServerChange, ...] = ()
+
+    @property
+    def ids(self) -> Tuple[str, ...]:
+        """Ids of the logical servers that changed."""
+        return tuple(change.id for change in self.changes)
+
+    @property
+    def enabled_changes(self) -> Tuple[ServerChange, ...]:
+        """Changes of the logical servers that were either enabled or disabled."""
+        return tuple(change for change in self.changes if change.enabled_changed)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __iter__(self) -> Iterator[ServerChange]:
+        return iter(self.changes)
+
+
+@dataclass(frozen=True)
+class ServerListDelta:
+    """
+    Logical servers added, removed and modified by a full server list
+    refresh, see :meth:`proton.vpn.session.servers.logicals.ServerList.merge`.
+
+    Servers whose load, score or status changed, but nothing else, are
+    not considered modified. Their changes are reported as
+    :class:`ServerListChanges` instead.
+    """
+    added: Tuple[str, ...] = ()
+    removed: Tuple[str, ...] = ()
+    modified: Tuple[str, ...] = ()
+    reused_count: int = 0
+    """Number of logical server instances reused from the previous server list."""
+
+    @property
+    def empty(self) -> bool:
+        """Whether no server was added, removed or modified."""
+        return not (self.added or self.removed or self.modified)
@@ -0,0 +1,164 @@
+"""
+Columnar storage of the logical server attributes used to filter and
+rank servers.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import copy
+import math
+from typing import Dict, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # pylint: disable=invalid-name
+
+from proton.vpn.session.servers.types import LogicalServer
+
+
+def is_columnar_storage_available() -> bool:
+    """Returns whether the optional numpy dependency is installed or not."""
+    return numpy is not None
+
+
+class ServerColumns:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps the attributes of a list of logical servers in contiguous numpy
+    arrays (one array per attribute), so that filtering and ranking servers
+    can be done with vectorized operations instead of calling the
+    properties of every LogicalServer instance.
+
+    Position ``i`` of every array holds the attributes of the ``i``-th
+    logical server passed to the constructor.
+    """
+
+    def __init__(self, logicals: Sequence[LogicalServer], keys: Optional[Sequence] = None):
+        """
+        :param logicals: servers to store.
+        :param keys: objects with the attributes of the servers to store, by
+            position. See :class:`proton.vpn.session.servers.indexes.ServerBitmaps`.
+        """
+        if numpy is None:
+            raise RuntimeError(
+                "Columnar server list storage requires numpy to be installed."
+            )
+
+        self._logicals = logicals if keys is not None else list(logicals)
+        self._positions_by_id: Dict[str, int] = {}
+        self._country_ids: Dict[str, int] = {}
+
+        size = len(self._logicals)
+        self.load = numpy.zeros(size, dtype=numpy.int32)
+        self.score = numpy.full(size, numpy.inf, dtype=numpy.float64)
+        self.tier = numpy.zeros(size, dtype=numpy.int8)
+        self.enabled = numpy.zeros(size, dtype=numpy.bool_)
+        self.features = numpy.zeros(size, dtype=numpy.int64)
+        self.country = numpy.zeros(size, dtype=numpy.int32)
+        self.latitude = numpy.full(size, numpy.nan, dtype=numpy.float64)
+        self.longitude = numpy.full(size, numpy.nan, dtype=numpy.float64)
+
+        for position, logical in enumerate(keys if keys is not None else self._logicals):
+            self._positions_by_id[logical.id] = position
+            self.tier[position] = int(logical.tier or 0)
+            self.features[position] = logical.feature_mask
+            self.country[position] = self._get_country_id(logical.exit_country, create=True)
+            self.latitude[position] = _to_float(logical.latitude)
+            self.longitude[position] = _to_float(logical.longitude)
+            self._set_mutable_columns(position, logical)
+
+    def __len__(self):
+        return len(self._logicals)
+
+    def copy(self, logicals: Optional[Sequence[LogicalServer]] = None) -> ServerColumns:
+        """
+        :param logicals: servers of the copy, by position, kept instead of
+            copying the current ones. This is used to keep indexing a lazy
+            sequence of servers, which would otherwise be fully built.
+        :returns: a copy of the columns that can be updated independently.
+            Columns that do not change on updates are shared with the copy.
+        """
+        columns_copy = copy.copy(self)
+        # pylint: disable=protected-access
+        columns_copy._logicals = logicals if logicals is not None else list(self._logicals)
+        columns_copy.load = self.load.copy()
+        columns_copy.score = self.score.copy()
+        columns_copy.enabled = self.enabled.copy()
+        return columns_copy
+
+    def update(self, logical: LogicalServer):
+        """
+        Replaces the server with the same id as the one passed and updates
+        the columns that can change after a server loads update
+        (load, score and status) with its current values.
+        """
+        position = self._positions_by_id.get(logical.id)
+        if position is not None:
+            self._logicals[position] = logical
+            self._set_mutable_columns(position, logical)
+
+    def eligible_mask(self, max_tier: int, excluded_features: int = 0):
+        """
+        :returns: a boolean array flagging the enabled servers that are in the
+            specified tier (or a lower one) and do not have any of the
+            excluded features.
+        """
+        return (
+            self.enabled
+            & (self.tier <= int(max_tier))
+            & ((self.features & int(excluded_features)) == 0)
+        )
+
+    def country_mask(self, country_code: str):
+        """:returns: a boolean array flagging the servers exiting in the given country."""
+        country_id = self._get_country_id(country_code)
+        if country_id is None:
+            return numpy.zeros(len(self._logicals), dtype=numpy.bool_)
+        return self.country == country_id
+
+    def get_fastest(self, mask) -> Optional[LogicalServer]:
+        """
+        :returns: the server with the lowest score among the ones flagged in
+            the mask, or None if the mask does not flag any server.
+        """
+        positions = numpy.flatnonzero(mask)
+        if not positions.size:
+            return None
+
+        # The argmin is taken over the flagged servers only: otherwise, when
+        # the scores of all of them are missing (inf), it would return the
+        # first server of the list, even if the mask does not flag it.
+        position = positions[numpy.argmin(self.score[positions])]
+        return self._logicals[int(position)]
+
+    def _set_mutable_columns(self, position: int, logical: LogicalServer):
+        self.load[position] = int(logical.load or 0)
+        self.score[position] = _to_float(logical.score, default=math.inf)
+        self.enabled[position] = logical.enabled
+
+    def _get_country_id(self, country_code: Optional[str], create: bool = False):
+        country_code = (country_code or "").lower()
+        if create:
+            return self._country_ids.setdefault(country_code, len(self._country_ids))
+        return self._country_ids.get(country_code)
+
+
+def _to_float(value, default: float = math.nan) -> float:
+    return float(value) if value is not None else default
@@ -17,22 +17,29 @@ You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 from pathlib import Path
-from typing import Optional, TYPE_CHECKING
+from typing import Callable, List, Optional, TYPE_CHECKING
 import re
 
 from proton.utils.environment import VPNExecutionEnvironment
 
-from proton.vpn.session.cache import CacheFile
-from proton.vpn.session.exceptions import ServerListDecodeError
-from proton.vpn.session.servers.types import ServerLoad
+from proton.vpn import logging
+
+from proton.vpn.session.cache import CacheFile, JSONCodec
+from proton.vpn.session.exceptions import ServerListDecodeError, ServerNotFoundError
+from proton.vpn.session.servers.types import LogicalServer, ServerLoad
 from proton.vpn.session.servers.logicals import ServerList, PersistenceKeys
-from proton.vpn.session.utils import rest_api_request
+from proton.vpn.session.servers.memory import ValueInterner, intern_server_list_data
+from proton.vpn.session.utils import rest_api_request, SingleFlight
 
 if TYPE_CHECKING:
     from proton.vpn.session import VPNSession
 
+logger = logging.getLogger(__name__)
+
+HTTP_NOT_MODIFIED = 304
 
-class ServerListFetcher:
+
+class ServerListFetcher:  # pylint: disable=too-many-instance-attributes
     """Fetches the server list either from disk or from the REST API."""
 
     ROUTE_LOGICALS = "/vpn/logicals?SecureCoreFilter=all"
@@ -44,40 +51,160 @@ class ServerListFetcher:
             self,
             session: "VPNSession",
             server_list: Optional[ServerList] = None,
-            cache_file: Optional[CacheFile] = None
-    ):
+            cache_file: Optional[CacheFile] = None,
+            *,
+            columnar: bool = False,
+            lazy: bool = False,
+            single_flight: bool = True,
+            streaming: bool = False,
+            intern_values: bool = False,
+            compact: bool = False
+    ):  # pylint: disable=too-many-arguments
+        """
+        :param session: session used to retrieve the server list.
+        :param server_list: server list to start with, if any.
+        :param cache_file: cache file used to persist the server list. Pass
+            one with a :class:`BinaryCodec` to decode it faster.
+        :param columnar: whether the server lists built by this fetcher keep
+            a columnar (numpy) copy of the server attributes. Requires numpy.
+        :param lazy: whether the server list loaded from cache only builds
+            the logical servers when they are accessed. This speeds up
+            short-lived processes that only need a few servers.
+        :param single_flight: whether concurrent fetches of the same route
+            should share a single REST API request or not.
+        :param streaming: whether the server list cache is parsed
+            incrementally, building each logical server as soon as it is
+            parsed, to reduce the peak memory usage. Ignored in lazy mode,
+            which needs the raw server data, and for binary cache files.
+        :param intern_values: whether the values repeated across servers
+            (e.g. country codes, cities, domains) are deduplicated when the
+            server list is parsed, to reduce its memory usage. This makes
+            parsing the server list several times slower. Ignored in lazy mode.
+        :param compact: whether the logical servers are fully decoded when
+            the server list is parsed, releasing their raw data, to reduce its
+            memory usage. This makes parsing the server list slower. Ignored
+            in lazy mode.
+        """
         self._session = session
         self._server_list = server_list
         self._cache_file = cache_file or CacheFile(self.CACHE_PATH)
+        self._columnar = columnar
+        self._lazy = lazy
+        self._single_flight = SingleFlight(enabled=single_flight)
+        self._streaming = streaming
+        self._intern_values = intern_values
+        self._compact = compact
+        self._loads_update_callbacks: List[Callable[[ServerList], None]] = []
+
+    def subscribe_to_loads_updates(self, callback: Callable[[ServerList], None]):
+        """
+        Subscribes to server loads updates.
+
+        :param callback: function called with the new version of the server
+            list every time the server loads are updated. The servers whose
+            load, score or status changed are available through the
+            `changes` attribute of the server list.
+        """
+        self._loads_update_callbacks.append(callback)
+
+    def unsubscribe_from_loads_updates(self, callback: Callable[[ServerList], None]):
+        """Unsubscribes a callback previously subscribed to server loads updates."""
+        self._loads_update_callbacks.remove(callback)
 
     def clear_cache(self):
         """Discards the cache, if existing."""
         self._server_list = None
         self._cache_file.remove()
 
+    async def flush_cache(self):
+        """Waits for the server list to be persisted to the cache."""
+        await self._cache_file.flush()
+
     async def fetch(self) -> ServerList:
-        """Fetches the list of VPN servers. Warning: this is a heavy request."""
-        response = await rest_api_request(
+        """
+        Fetches the list of VPN servers. Warning: this is a heavy request.
+
+        When a server list was already fetched, the request is made
+        conditional on the server list having changed since then. If it did
+        not change, the expiration time of the current server list is
+        extended instead of downloading and parsing it again.
+
+        Concurrent calls share the same request, unless single flight
+        was disabled.
+        """
+        return await self._single_flight.run(self.ROUTE_LOGICALS, self._fetch)
+
+    async def _fetch(self) -> ServerList:
+        raw_response = await rest_api_request(
             self._session,
             self.ROUTE_LOGICALS,
-            additional_headers=self._build_netzone_header(),
+            additional_headers={
+                **self._build_netzone_header(),
+                **self._build_conditional_headers(),
+            },
+            return_raw=True
         )
 
+        if raw_response.status_code == HTTP_NOT_MODIFIED and self._server_list:
+            logger.info("Server list not modified since the last fetch.")
+            self._server_list = self._server_list.with_expiration_time(
+                ServerList.get_expiration_time()
+            )
+            self._cache_file.save_in_background(self._server_list.to_dict)
+            return self._server_list
+
+        response = raw_response.json
+        for header, persistence_key in (
+            ("ETag", PersistenceKeys.ETAG), ("Last-Modified", PersistenceKeys.LAST_MODIFIED)
+        ):
+            value = raw_response.find_first_header(header)
+            if value is not None:
+                response[persistence_key.value] = value
+
         response[PersistenceKeys.USER_TIER.value] = self._session.vpn_account.max_tier
         response[PersistenceKeys.EXPIRATION_TIME.value] = ServerList.get_expiration_time()
         response[
             PersistenceKeys.LOADS_EXPIRATION_TIME.value
         ] = ServerList.get_loads_expiration_time()
 
-        self._cache_file.save(response)
+        if self._server_list:
+            # Servers that did not change since the last fetch are reused.
+            self._server_list = self._server_list.merge(
+                response, interner=self._build_interner()
+            )
+            if self._compact:
+                # Only the servers built again by the merge are not decoded yet.
+                for logical_server in self._server_list:
+                    logical_server.decode()
+        else:
+            if self._intern_values:
+                response = intern_server_list_data(response)
+            self._server_list = ServerList.from_dict(
+                response, columnar=self._columnar, compact=self._compact
+            )
 
-        self._server_list = ServerList.from_dict(response)
+        # Saved once parsed, since parsing may deduplicate the values in place.
+        self._cache_file.save_in_background(response)
         return self._server_list
 
     async def update_loads(self) -> ServerList:
         """
         Fetches the server loads from the REST API and
-        updates the current server list with them."""
+        updates the current server list with them.
+
+        The current server list is not modified. Instead, a new version of
+        the server list is built with the new loads and then published, so
+        that the previous version can still be safely used by readers.
+
+        The servers whose load, score or status changed are available through
+        the `changes` attribute of the returned server list.
+
+        Concurrent calls share the same request, unless single flight
+        was disabled.
+        """
+        return await self._single_flight.run(self.ROUTE_LOADS, self._update_loads)
+
+    async def _update_loads(self) -> ServerList:
         if not self._server_list:
             raise RuntimeError(
                 "Server loads can only be updated after fetching the the full server list."
@@ -90,11 +217,22 @@ class ServerListFetcher:
         )
 
         server_loads = [ServerLoad(data) for data in response["LogicalServers"]]
-        self._server_list.update(server_loads)
-        self._cache_file.save(self._server_list.to_dict())
+        self._server_list = self._server_list.with_loads(server_loads)
+        self._cache_file.save_in_background(self._server_list.to_dict)
+        self._notify_loads_update(self._server_list)
 
         return self._server_list
 
+    def _build_interner(self) -> Optional[ValueInterner]:
+        return ValueInterner() if self._intern_values else None
+
+    def _notify_loads_update(self, server_list: ServerList):
+        for callback in self._loads_update_callbacks.copy():
+            try:
+                callback(server_list)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Error notifying server loads update.")
+
     def load_from_cache(self) -> ServerList:
         """
         Loads and returns the server list that was last persisted to the cache.
@@ -103,14 +241,85 @@ class ServerListFetcher:
         :raises ServerListDecodeError: if the cache is not found or if the
             data stored in the cache is not valid.
         """
+        if self._streaming and not self._lazy and isinstance(self._cache_file.codec, JSONCodec):
+            try:
+                with self._cache_file.open() as stream:
+                    self._server_list = ServerList.from_stream(
+                        stream, columnar=self._columnar, interner=self._build_interner(),
+                        compact=self._compact
+                    )
+            except FileNotFoundError as error:
+                raise ServerListDecodeError("Cached server list was not found") from error
+            return self._server_list
+
         try:
             cache = self._cache_file.load()
         except FileNotFoundError as error:
             raise ServerListDecodeError("Cached server list was not found") from error
 
-        self._server_list = ServerList.from_dict(cache)
+        if self._intern_values and not self._lazy:
+            # Lazy server lists are meant for short-lived processes, where
+            # deduplicating all the values would defeat the purpose.
+            cache = intern_server_list_data(cache)
+
+        self._server_list = ServerList.from_dict(
+            cache, columnar=self._columnar, lazy=self._lazy, compact=self._compact
+        )
         return self._server_list
 
+    def load_server_by_id_from_cache(self, server_id: str) -> LogicalServer:
+        """
+        Loads a single logical server from the cache, by id.
+
+        When the cache was persisted with an :class:`IndexedCodec`, only
+        the requested server is decoded, which is much faster than loading
+        the whole server list. Otherwise, the whole server list is loaded.
+
+        :returns: the logical server with the given id.
+        :raises ServerNotFoundError: if there is not a server with a matching id.
+        :raises ServerListDecodeError: if the cache is not found.
+        """
+        return self._load_server_from_cache(
+            "ID", server_id, lambda server_list: server_list.get_by_id(server_id)
+        )
+
+    def load_server_by_name_from_cache(self, name: str) -> LogicalServer:
+        """
+        Loads a single logical server from the cache, by name.
+        See :meth:`load_server_by_id_from_cache`.
+
+        :returns: the logical server with the given name.
+        :raises ServerNotFoundError: if there is not a server with a matching name.
+        :raises ServerListDecodeError: if the cache is not found.
+        """
+        return self._load_server_from_cache(
+            "Name", name, lambda server_list: server_list.get_by_name(name)
+        )
+
+    def _load_server_from_cache(
+            self, key: str, value: str, get_server: Callable[[ServerList], LogicalServer]
+    ) -> LogicalServer:
+        try:
+            with self._cache_file.open_mapped() as cache:
+                data = cache.get(key, value)
+        except FileNotFoundError as error:
+            raise ServerListDecodeError("Cached server list was not found") from error
+        except ValueError:
+            # The cache was not persisted in the indexed format.
+            return get_server(self.load_from_cache())
+
+        if data is None:
+            raise ServerNotFoundError(f"The server with {key} {value!r} was not found")
+        return LogicalServer(data)
+
+    def _build_conditional_headers(self):
+        headers = {}
+        if self._server_list and self._server_list.etag:
+            headers["If-None-Match"] = self._server_list.etag
+        if self._server_list and self._server_list.last_modified:
+            headers["If-Modified-Since"] = self._server_list.last_modified
+        return headers
+
     def _build_netzone_header(self):
         headers = {}
         truncated_ip_address = truncate_ip_address(
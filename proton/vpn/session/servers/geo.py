@@ -0,0 +1,186 @@
+"""
+Spatial index to find the servers closest to a location.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Callable, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+Point = Tuple[float, float, float]
+
+
+def haversine_distance(
+        latitude1: float, longitude1: float, latitude2: float, longitude2: float
+) -> float:
+    """:returns: the great-circle distance in km between two coordinates."""
+    lat1, long1, lat2, long2 = map(
+        math.radians, (latitude1, longitude1, latitude2, longitude2)
+    )
+    haversine = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(haversine)))
+
+
+class GeoIndex:
+    """
+    k-d tree over the coordinates of a set of servers.
+
+    Coordinates are projected on the unit sphere, where the euclidean
+    (chord) distance between two points grows with their great-circle
+    distance. This allows using a regular 3-dimensional k-d tree to find
+    the closest servers in O(log n) on average.
+    """
+
+    def __init__(self, coordinates: Iterable[Tuple[int, Optional[float], Optional[float]]]):
+        """
+        :param coordinates: (server position, latitude, longitude) tuples.
+            Servers without coordinates are not indexed.
+        """
+        points = [
+            (_to_unit_sphere(latitude, longitude), position)
+            for position, latitude, longitude in coordinates
+            if latitude is not None and longitude is not None
+        ]
+        self._size = len(points)
+        self._root = _build_tree(points, axis=0)
+
+    def __len__(self):
+        return self._size
+
+    def nearest(
+            self, latitude: float, longitude: float, count: int = 1,
+            accept: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        :param latitude: latitude of the location to search from.
+        :param longitude: longitude of the location to search from.
+        :param count: maximum number of servers to return.
+        :param accept: optional function called with the server position
+            to decide whether it should be part of the result or not.
+        :returns: (distance in km, server position) tuples, closest first.
+        """
+        if count <= 0:
+            return []
+
+        target = _to_unit_sphere(latitude, longitude)
+        # Max-heap (through negated distances) of the closest servers found so far.
+        closest: List[Tuple[float, int]] = []
+
+        def search(node):
+            if node is None:
+                return
+            point, position, axis, left, right = node
+            if accept is None or accept(position):
+                distance = _squared_distance(point, target)
+                if len(closest) < count:
+                    heapq.heappush(closest, (-distance, position))
+                elif distance < -closest[0][0]:
+                    heapq.heapreplace(closest, (-distance, position))
+
+            delta = target[axis] - point[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            search(near)
+            if len(closest) < count or delta ** 2 < -closest[0][0]:
+                search(far)
+
+        search(self._root)
+        return sorted(
+            (_chord_to_km(math.sqrt(-distance)), position) for distance, position in closest
+        )
+
+    def within_radius(
+            self, latitude: float, longitude: float, radius_km: float,
+            accept: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        :param latitude: latitude of the location to search from.
+        :param longitude: longitude of the location to search from.
+        :param radius_km: maximum distance in km of the servers to return.
+        :param accept: optional function called with the server position
+            to decide whether it should be part of the result or not.
+        :returns: (distance in km, server position) tuples, closest first.
+        """
+        target = _to_unit_sphere(latitude, longitude)
+        max_distance = _km_to_chord(radius_km) ** 2
+        found: List[Tuple[float, int]] = []
+
+        def search(node):
+            if node is None:
+                return
+            point, position, axis, left, right = node
+            if accept is None or accept(position):
+                distance = _squared_distance(point, target)
+                if distance <= max_distance:
+                    found.append((_chord_to_km(math.sqrt(distance)), position))
+
+            delta = target[axis] - point[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            search(near)
+            if delta ** 2 <= max_distance:
+                search(far)
+
+        search(self._root)
+        return sorted(found)
+
+
+def _build_tree(points: List[Tuple[Point, int]], axis: int):
+    if not points:
+        return None
+
+    points.sort(key=lambda item: item[0][axis])
+    median = len(points) // 2
+    point, position = points[median]
+    next_axis = (axis + 1) % 3
+    return (
+        point, position, axis,
+        _build_tree(points[:median], next_axis),
+        _build_tree(points[median + 1:], next_axis)
+    )
+
+
+def _to_unit_sphere(latitude: float, longitude: float) -> Point:
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    return (
+        math.cos(latitude) * math.cos(longitude),
+        math.cos(latitude) * math.sin(longitude),
+        math.sin(latitude)
+    )
+
+
+def _squared_distance(point1: Point, point2: Point) -> float:
+    return (
+        (point1[0] - point2[0]) ** 2
+        + (point1[1] - point2[1]) ** 2
+        + (point1[2] - point2[2]) ** 2
+    )
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(distance_km: float) -> float:
+    return 2 * math.sin(min(math.pi, max(distance_km, 0) / EARTH_RADIUS_KM) / 2)
@@ -0,0 +1,272 @@
+"""
+Secondary indexes over the logical servers of a server list.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import bisect
+import copy
+import math
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from proton.vpn.session.servers.types import LogicalServer
+
+
+class ScoreIndex:
+    """
+    Keeps server ids ordered by (score, id).
+
+    Lookups of the server with the lowest score are O(1) and score updates
+    are O(log n) to locate the entry plus the cost of shifting the entries
+    of the underlying list.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[float]]] = ()):
+        """
+        :param entries: (server id, score) pairs to index.
+        """
+        self._scores: Dict[str, float] = {}
+        for server_id, score in entries:
+            self._scores[server_id] = _normalize_score(score)
+        self._entries: List[Tuple[float, str]] = sorted(
+            (score, server_id) for server_id, score in self._scores.items()
+        )
+
+    def add(self, server_id: str, score: Optional[float]):
+        """Adds the server to the index, replacing the previous entry if it existed."""
+        if server_id in self._scores:
+            self.remove(server_id)
+
+        score = _normalize_score(score)
+        self._scores[server_id] = score
+        bisect.insort(self._entries, (score, server_id))
+
+    def remove(self, server_id: str):
+        """Removes the server from the index, if it was indexed."""
+        score = self._scores.pop(server_id, None)
+        if score is None:
+            return
+
+        position = bisect.bisect_left(self._entries, (score, server_id))
+        del self._entries[position]
+
+    def update(self, server_id: str, score: Optional[float]):
+        """Updates the score of the server, adding it to the index if it was not indexed."""
+        if self._scores.get(server_id) != _normalize_score(score):
+            self.add(server_id, score)
+
+    def copy(self) -> ScoreIndex:
+        """:returns: a copy of the index that can be modified independently."""
+        index_copy = ScoreIndex()
+        index_copy._scores = self._scores.copy()  # pylint: disable=protected-access
+        index_copy._entries = self._entries.copy()  # pylint: disable=protected-access
+        return index_copy
+
+    def first(self) -> Optional[str]:
+        """:returns: the id of the server with the lowest score, or None if empty."""
+        return self._entries[0][1] if self._entries else None
+
+    def first_n(self, count: int) -> List[str]:
+        """:returns: the ids of the servers with the lowest score, in order."""
+        return [server_id for _, server_id in self._entries[:max(count, 0)]]
+
+    def __contains__(self, server_id) -> bool:
+        return server_id in self._scores
+
+    def __iter__(self) -> Iterator[str]:
+        return (server_id for _, server_id in self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _normalize_score(score: Optional[float]) -> float:
+    # Servers without score are sorted last.
+    return float(score) if score is not None else math.inf
+
+
+class BitmapIndex:
+    """
+    Maps keys (e.g. country codes) to bitmaps of server positions, where
+    bit ``i`` is set when the ``i``-th indexed server has that key.
+
+    Bitmaps are plain python integers, so that intersecting several
+    indexes is a single bitwise operation per index.
+    """
+
+    def __init__(self):
+        self._bitmaps: Dict[object, int] = {}
+
+    def add(self, key, position: int):
+        """Flags the server at the given position as having the key."""
+        self._bitmaps[key] = self._bitmaps.get(key, 0) | (1 << position)
+
+    def remove(self, key, position: int):
+        """Unflags the server at the given position as having the key."""
+        self._bitmaps[key] = self._bitmaps.get(key, 0) & ~(1 << position)
+
+    def get(self, key) -> int:
+        """:returns: the bitmap of the servers with the key."""
+        return self._bitmaps.get(key, 0)
+
+    def keys(self):
+        """:returns: the indexed keys."""
+        return self._bitmaps.keys()
+
+
+def count_bits(bitmap: int) -> int:
+    """:returns: the number of bits set in the bitmap."""
+    return bin(bitmap).count("1")
+
+
+def iter_bits(bitmap: int) -> Iterator[int]:
+    """:returns: the positions of the bits set in the bitmap, in ascending order."""
+    while bitmap:
+        lowest_bit = bitmap & -bitmap
+        yield lowest_bit.bit_length() - 1
+        bitmap ^= lowest_bit
+
+
+class ServerBitmaps:
+    """
+    Bitmap indexes over a list of logical servers, by exit country, city,
+    tier, feature and status.
+
+    Servers are identified by their position in the list passed to the
+    constructor. The list is copied, so that reordering the server list
+    does not invalidate the bitmaps.
+    """
+
+    def __init__(self, logicals: Sequence[LogicalServer], keys: Optional[Sequence] = None):
+        """
+        :param logicals: servers to index.
+        :param keys: objects with the attributes of the servers used to build
+            the bitmaps, by position (see
+            :class:`proton.vpn.session.servers.lazy.LogicalServerKeys`).
+            When given, the servers are only accessed when returned, and the
+            sequence of servers is kept instead of being copied, so it must
+            not be reordered.
+        """
+        self._logicals = logicals if keys is not None else list(logicals)
+        self._positions_by_id: Dict[str, int] = {}
+        self.by_country = BitmapIndex()
+        self.by_city = BitmapIndex()
+        self.by_tier = BitmapIndex()
+        self.by_feature = BitmapIndex()
+        self.enabled = 0
+
+        for position, logical in enumerate(keys if keys is not None else self._logicals):
+            self._positions_by_id[logical.id] = position
+            self.by_country.add((logical.exit_country or "").lower(), position)
+            self.by_city.add((logical.city or "").lower(), position)
+            self.by_tier.add(int(logical.tier or 0), position)
+            for feature_bit in iter_bits(logical.feature_mask):
+                self.by_feature.add(1 << feature_bit, position)
+            if logical.enabled:
+                self.enabled |= 1 << position
+
+    @property
+    def logicals(self) -> Sequence[LogicalServer]:
+        """The indexed servers, by position."""
+        return self._logicals
+
+    @property
+    def all(self) -> int:
+        """:returns: the bitmap with all the indexed servers."""
+        return (1 << len(self._logicals)) - 1
+
+    def copy(self, logicals: Optional[Sequence[LogicalServer]] = None) -> ServerBitmaps:
+        """
+        :param logicals: servers of the copy, by position, kept instead of
+            copying the current ones. This is used to keep indexing a lazy
+            sequence of servers, which would otherwise be fully built.
+        :returns: a copy of the bitmaps that can be updated independently.
+            Bitmaps that do not change on updates are shared with the copy.
+        """
+        bitmaps_copy = copy.copy(self)
+        # pylint: disable=protected-access
+        bitmaps_copy._logicals = logicals if logicals is not None else list(self._logicals)
+        return bitmaps_copy
+
+    def update(self, logical: LogicalServer):
+        """
+        Replaces the indexed server with the same id as the one passed and
+        updates the status bitmap with its current status.
+        """
+        position = self._positions_by_id.get(logical.id)
+        if position is None:
+            return
+
+        self._logicals[position] = logical
+        if logical.enabled:
+            self.enabled |= 1 << position
+        else:
+            self.enabled &= ~(1 << position)
+
+    def select(  # pylint: disable=too-many-arguments
+            self,
+            *,
+            country: Optional[str] = None,
+            city: Optional[str] = None,
+            features_all: int = 0,
+            features_none: int = 0,
+            max_tier: Optional[int] = None,
+            enabled: Optional[bool] = None
+    ) -> int:
+        """
+        :returns: the bitmap of the servers matching all the given conditions.
+            Conditions set to None are ignored.
+        """
+        required = []
+        if country is not None:
+            required.append(self.by_country.get(country.lower()))
+        if city is not None:
+            required.append(self.by_city.get(city.lower()))
+        if max_tier is not None:
+            tiers = 0
+            for tier in self.by_tier.keys():
+                if tier <= int(max_tier):
+                    tiers |= self.by_tier.get(tier)
+            required.append(tiers)
+        for feature_bit in iter_bits(int(features_all)):
+            required.append(self.by_feature.get(1 << feature_bit))
+        if enabled is True:
+            required.append(self.enabled)
+
+        excluded = 0
+        for feature_bit in iter_bits(int(features_none)):
+            excluded |= self.by_feature.get(1 << feature_bit)
+        if enabled is False:
+            excluded |= self.enabled
+
+        # Intersect the most selective bitmaps first so that
+        # the result becomes empty as soon as possible.
+        result = self.all & ~excluded
+        for bitmap in sorted(required, key=count_bits):
+            result &= bitmap
+            if not result:
+                break
+
+        return result
+
+    def get_servers(self, bitmap: int) -> List[LogicalServer]:
+        """:returns: the servers flagged in the bitmap, in the indexed order."""
+        return [self._logicals[position] for position in iter_bits(bitmap)]
@@ -0,0 +1,192 @@
+"""
+Lazy materialization of the logical servers of a server list.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import copy
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List, Optional
+
+from proton.vpn.session.servers.types import LogicalServer, ServerLoad
+
+
+class LogicalServerKeys:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    Attributes of a logical server required to index it, extracted from
+    its raw data without building the LogicalServer instance (nor its
+    physical servers).
+
+    Attribute names match the ones of :class:`LogicalServer`, so that
+    indexes can be built from either of them.
+    """
+    __slots__ = (
+        "id", "name", "exit_country", "city", "tier", "feature_mask",
+        "score", "load", "enabled", "latitude", "longitude"
+    )
+
+    def __init__(self, data: Dict):
+        # pylint: disable=invalid-name
+        self.id = data.get("ID")
+        self.name = data.get("Name")
+        self.exit_country = data.get("ExitCountry")
+        self.city = data.get("City")
+        tier = data.get("Tier")
+        self.tier = int(tier) if tier is not None else None
+        self.feature_mask = int(data.get("Features") or 0)
+        self.score = data.get("Score")
+        self.load = data.get("Load")
+        self.enabled = data.get("Status") == 1 and any(
+            physical_data.get("Status") == 1 for physical_data in data.get("Servers", [])
+        )
+        location = data.get("Location") or {}
+        self.latitude = location.get("Lat")
+        self.longitude = location.get("Long")
+
+    def lacks_features(self, feature_mask: int) -> bool:
+        """See :meth:`LogicalServer.lacks_features`."""
+        return not self.feature_mask & int(feature_mask)
+
+
+class LazyLogicalServers(Sequence):
+    """
+    Sequence of logical servers built from their raw data on first access.
+
+    Only the keys required to index the servers are extracted upfront
+    (see :attr:`keys`). Each LogicalServer instance is built the first time
+    it is accessed and then reused.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        """
+        :param entries: raw data of the logical servers, as returned by the
+            REST API. It should not be modified afterwards.
+        """
+        self._entries = entries
+        self._servers: List[Optional[LogicalServer]] = [None] * len(entries)
+        self._keys = [LogicalServerKeys(entry) for entry in entries]
+
+    @property
+    def keys(self) -> List[LogicalServerKeys]:
+        """
+        Keys required to index the servers, by position. Servers that were
+        already built are used as their own keys.
+        """
+        return self._keys
+
+    @property
+    def materialized_count(self) -> int:
+        """Number of servers that were already built."""
+        return len(self._servers) - self._servers.count(None)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+
+        server = self._servers[index]
+        if server is None:
+            server = LogicalServer(self._entries[index])
+            self[index] = server
+        return server
+
+    def __setitem__(self, index: int, server: LogicalServer):
+        self._servers[index] = server
+        # Built servers are their own keys, so that indexes built afterwards
+        # see the updates applied to them, even in place.
+        self._keys[index] = server
+
+    def has_load(self, position: int, server_load: ServerLoad) -> bool:
+        """
+        :returns: whether the server at the given position was not built yet
+            and its raw data already has the load, score and status of the
+            server load, in which case applying it would not change anything.
+        """
+        if self._servers[position] is not None:
+            return False
+
+        entry = self._entries[position]
+        return entry.get("Load") == server_load.load \
+            and entry.get("Score") == server_load.score \
+            and entry.get("Status") == (1 if server_load.enabled else 0)
+
+    def replacing(self, servers: Dict[int, LogicalServer]) -> LazyLogicalServers:
+        """
+        :param servers: servers replacing the current ones, by position.
+        :returns: a copy of the sequence with the given servers replaced.
+            The raw data is shared with the copy, which still builds the
+            servers that were not replaced on first access.
+        """
+        servers_copy = copy.copy(self)
+        # pylint: disable=protected-access
+        servers_copy._servers = self._servers.copy()
+        servers_copy._keys = self._keys.copy()
+        for position, server in servers.items():
+            servers_copy[position] = server
+        return servers_copy
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[LogicalServer]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+class LazyServerMapping(Mapping):
+    """
+    Read-only mapping of keys (e.g. server ids) to the servers of a
+    :class:`LazyLogicalServers` sequence, which are built on first access.
+    """
+
+    def __init__(self, positions: Dict[str, int], servers: LazyLogicalServers):
+        """
+        :param positions: position of the server in the sequence, by key.
+        :param servers: lazy sequence of servers.
+        """
+        self._positions = positions
+        self._servers = servers
+
+    def __getitem__(self, key) -> LogicalServer:
+        return self._servers[self._positions[key]]
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def position(self, key) -> Optional[int]:
+        """:returns: the position of the server in the sequence, or None if not found."""
+        return self._positions.get(key)
+
+    def with_servers(self, servers: LazyLogicalServers) -> LazyServerMapping:
+        """
+        :param servers: lazy sequence with the servers at the same positions,
+            e.g. a copy returned by :meth:`LazyLogicalServers.replacing`.
+        :returns: a mapping of the same keys to the servers of the given sequence.
+        """
+        return LazyServerMapping(self._positions, servers)
+
+    def copy(self) -> Dict[str, LogicalServer]:
+        """:returns: a dict copy of the mapping. All servers are built."""
+        return dict(self)
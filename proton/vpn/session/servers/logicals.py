@@ -16,32 +16,54 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+# pylint: disable=too-many-lines
 from __future__ import annotations
 
+import copy
+import hashlib
+import heapq
 import itertools
+import json
 import random
 import time
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, List, Callable
+from typing import IO, Optional, List, Callable, Dict, Sequence, Tuple
 
 from proton.vpn import logging
 from proton.vpn.session.exceptions import ServerNotFoundError, ServerListDecodeError
+from proton.vpn.session.servers.changes import (
+    ServerChange, ServerListChanges, ServerListDelta, get_load_state
+)
+from proton.vpn.session.servers.columnar import ServerColumns
 from proton.vpn.session.servers.country_codes import get_country_name_by_code
+from proton.vpn.session.servers.geo import GeoIndex
+from proton.vpn.session.servers.indexes import ScoreIndex, ServerBitmaps
+from proton.vpn.session.servers.lazy import LazyLogicalServers, LazyServerMapping
+from proton.vpn.session.servers.memory import (
+    MemoryFootprint, ValueInterner, measure_memory_footprint
+)
+from proton.vpn.session.servers.streaming import DEFAULT_CHUNK_SIZE, load_server_list_stream
 from proton.vpn.session.servers.types import LogicalServer, TierEnum, ServerFeatureEnum, ServerLoad
 
 logger = logging.getLogger(__name__)
 
 
+# Features of the servers that are never picked as the fastest server.
+_FASTEST_SERVER_EXCLUDED_FEATURES = int(ServerFeatureEnum.SECURE_CORE | ServerFeatureEnum.TOR)
+
+
 class PersistenceKeys(Enum):
     """JSON Keys used to persist the ServerList to disk."""
     LOGICALS = "LogicalServers"
     EXPIRATION_TIME = "ExpirationTime"
     LOADS_EXPIRATION_TIME = "LoadsExpirationTime"
     USER_TIER = "MaxTier"
+    ETAG = "ETag"
+    LAST_MODIFIED = "LastModified"
 
 
-class ServerList:
+class ServerList:  # pylint: disable=too-many-public-methods,too-many-instance-attributes
     """
     Server list model class.
     """
@@ -59,7 +81,11 @@ class ServerList:
             logicals: Optional[List[LogicalServer]] = None,
             expiration_time: Optional[int] = None,
             loads_expiration_time: Optional[int] = None,
-            index_servers: bool = True
+            index_servers: bool = True,
+            *,
+            columnar: bool = False,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None
     ):  # pylint: disable=too-many-arguments
         self._user_tier = user_tier
         self._logicals = logicals or []
@@ -68,31 +94,127 @@ class ServerList:
         self._loads_expiration_time = loads_expiration_time if loads_expiration_time is not None\
             else self.get_loads_expiration_time()
 
+        # Validators of the REST API response the server list was built from,
+        # used to only download the server list again when it changed.
+        self._etag = etag
+        self._last_modified = last_modified
+
+        self._logicals_by_id = None
+        self._logicals_by_name = None
+        self._logicals_by_country = None
+        self._available_servers = None
+        # Bitmap and geo-spatial indexes, built on first use.
+        self._bitmaps = None
+        self._geo_index = None
         if index_servers:
-            self._logicals_by_id, self._logicals_by_name = self._build_indexes(logicals)
-        else:
-            self._logicals_by_id = None
-            self._logicals_by_name = None
+            self._build_indexes()
+
+        # Changes applied by the last server loads update.
+        self._changes = ServerListChanges()
+
+        # Servers added, removed and modified by the refresh that built this version.
+        self._delta = ServerListDelta()
+
+        # Fingerprints of the data of the logical servers, by id, computed
+        # on demand to detect which servers changed on a full refresh.
+        self._fingerprints: Dict[str, bytes] = {}
+
+        # Servers grouped by country, computed on demand.
+        self._countries = None
+
+        # Optional columnar (numpy) storage used to filter and rank servers.
+        self._columns = ServerColumns(
+            self._logicals, keys=self._get_index_keys()
+        ) if columnar else None
+
+    @property
+    def lazy(self) -> bool:
+        """Whether logical servers are only built when they are accessed."""
+        return isinstance(self._logicals, LazyLogicalServers)
+
+    def _get_index_keys(self):
+        # Lazy server lists are indexed from the keys extracted from the raw
+        # server data, so that logical servers are only built when accessed.
+        return self._logicals.keys if self.lazy else None
 
-    @staticmethod
-    def _build_indexes(logicals):
+    def _build_indexes(self):
         logicals_by_id = {}
         logicals_by_name = {}
+        scores_by_country = {}
+        available_scores = []
+        keys = self._get_index_keys()
 
-        for logical_server in logicals:
-            logicals_by_id[logical_server.id] = logical_server
-            logicals_by_name[logical_server.name] = logical_server
+        for position, logical_server in enumerate(keys if keys is not None else self._logicals):
+            # Lazy server lists map ids and names to the position of the server.
+            value = position if keys is not None else logical_server
+            logicals_by_id[logical_server.id] = value
+            logicals_by_name[logical_server.name] = value
+            scores_by_country.setdefault(_country_key(logical_server), []).append(
+                (logical_server.id, logical_server.score)
+            )
+            if self._is_available(logical_server):
+                available_scores.append((logical_server.id, logical_server.score))
+
+        if keys is not None:
+            logicals_by_id = LazyServerMapping(logicals_by_id, self._logicals)
+            logicals_by_name = LazyServerMapping(logicals_by_name, self._logicals)
+
+        self._logicals_by_id = logicals_by_id
+        self._logicals_by_name = logicals_by_name
+        # Each country bucket keeps its server ids ordered by score.
+        self._logicals_by_country = {
+            country_code: ScoreIndex(scores)
+            for country_code, scores in scores_by_country.items()
+        }
+        # Servers that are candidates for the fastest server, ordered by score.
+        self._available_servers = ScoreIndex(available_scores)
+
+    def _get_bitmaps(self) -> ServerBitmaps:
+        """
+        :returns: the bitmap indexes, building them on first use. Versions of
+            the server list created afterwards with :meth:`with_loads` or
+            :meth:`merge` get a copy of them.
+        """
+        if self._logicals_by_id is None:
+            raise RuntimeError("The server list was not indexed.")
 
-        return logicals_by_id, logicals_by_name
+        if self._bitmaps is None:
+            self._bitmaps = ServerBitmaps(self._logicals, keys=self._get_index_keys())
+        return self._bitmaps
+
+    def _get_geo_index(self) -> GeoIndex:
+        """
+        :returns: the geo-spatial index, building it on first use. Versions
+            of the server list created afterwards with :meth:`with_loads` or
+            :meth:`merge` share it, since server locations do not change.
+        """
+        if self._geo_index is None:
+            indexed_logicals = self._get_bitmaps().logicals
+            if isinstance(indexed_logicals, LazyLogicalServers):
+                indexed_logicals = indexed_logicals.keys
+            # The geo index refers to the servers by their position in the bitmaps.
+            self._geo_index = GeoIndex(
+                (position, logical_server.latitude, logical_server.longitude)
+                for position, logical_server in enumerate(indexed_logicals)
+            )
+        return self._geo_index
 
     @property
     def user_tier(self) -> TierEnum:
         """Tier of the user that requested the server list."""
         return self._user_tier
 
+    @property
+    def columnar(self) -> bool:
+        """Whether the server list keeps a columnar copy of the server attributes."""
+        return self._columns is not None
+
     @property
     def logicals(self) -> List[LogicalServer]:
-        """The internal list of logical servers."""
+        """
+        The internal list of logical servers. On lazy server lists, this is
+        a sequence that builds the logical servers on first access.
+        """
         return self._logicals
 
     @property
@@ -108,6 +230,31 @@ class ServerList:
         """
         return time.time() > self._expiration_time
 
+    @property
+    def etag(self) -> Optional[str]:
+        """ETag header of the REST API response the server list was built from."""
+        return self._etag
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        """Last-Modified header of the REST API response the server list was built from."""
+        return self._last_modified
+
+    def with_expiration_time(self, expiration_time: float) -> ServerList:
+        """
+        Returns a new version of the server list with the specified
+        expiration time, sharing everything else with this instance.
+
+        This is used to extend the validity of the server list when the
+        REST API reports that it did not change.
+        """
+        server_list = copy.copy(self)
+        # pylint: disable=protected-access
+        server_list._expiration_time = expiration_time
+        server_list._changes = ServerListChanges()
+        server_list._delta = ServerListDelta()
+        return server_list
+
     @property
     def loads_expiration_time(self) -> float:
         """The expiration time of the server loads as a unix timestamp."""
@@ -121,13 +268,29 @@ class ServerList:
         """
         return time.time() > self._loads_expiration_time
 
-    def update(self, server_loads: List[ServerLoad]):
-        """Updates the server list with new server loads."""
+    def update(self, server_loads: List[ServerLoad]) -> ServerListChanges:
+        """
+        Updates the server list in place with new server loads.
+
+        Note that the logical servers are modified in place, which is visible
+        to any other server list sharing them. Use :meth:`with_loads` to get
+        an updated copy of the server list instead.
+
+        :returns: the servers whose load, score or status changed.
+        """
+        changes = []
         try:
             for server_load in server_loads:
                 try:
                     logical_server = self.get_by_id(server_load.id)
+                    old_state = get_load_state(logical_server)
                     logical_server.update(server_load)
+                    self._update_indexes(logical_server)
+                    change = ServerChange.build(
+                        logical_server.id, old_state, get_load_state(logical_server)
+                    )
+                    if change:
+                        changes.append(change)
                 except ServerNotFoundError:
                     # Currently /vpn/loads returns some extra servers not returned by /vpn/logicals
                     logger.debug(f"Logical server was not found for update: {server_load}")
@@ -136,6 +299,242 @@ class ServerList:
             # it's safer to always update the loads expiration time to avoid
             # clients potentially retrying in a loop.
             self._loads_expiration_time = self.get_loads_expiration_time()
+            self._changes = ServerListChanges(tuple(changes))
+
+        return self._changes
+
+    @property
+    def changes(self) -> ServerListChanges:
+        """
+        Servers whose load, score or status changed with the last server
+        loads update, either applied in place with :meth:`update` or used
+        to build this version of the server list with :meth:`with_loads`.
+        """
+        return self._changes
+
+    def with_loads(self, server_loads: List[ServerLoad]) -> ServerList:
+        """
+        Returns a new version of the server list with the new server loads
+        applied, leaving this instance untouched.
+
+        Logical servers that are not modified by the server loads are shared
+        between both versions, as well as the indexes that do not depend on
+        the server loads. This allows readers to keep using the current
+        version while the new one is being built, without any locking.
+        """
+        if self._logicals_by_id is None:
+            raise RuntimeError("The server list was not indexed.")
+
+        updated_logicals = {}
+        for server_load in server_loads:
+            if self.lazy and server_load.id not in updated_logicals:
+                # Servers that were not built yet are only built when changed.
+                position = self._logicals_by_id.position(server_load.id)
+                if position is not None and self._logicals.has_load(position, server_load):
+                    continue
+
+            logical_server = updated_logicals.get(server_load.id) \
+                or self._logicals_by_id.get(server_load.id)
+            if logical_server is None:
+                # Currently /vpn/loads returns some extra servers not returned by /vpn/logicals
+                logger.debug(f"Logical server was not found for update: {server_load}")
+                continue
+
+            updated_logical_server = logical_server.with_load(server_load)
+            if updated_logical_server is not logical_server:
+                updated_logicals[server_load.id] = updated_logical_server
+
+        server_list = self._copy_replacing(updated_logicals)
+        # pylint: disable=protected-access
+        server_list._loads_expiration_time = self.get_loads_expiration_time()
+        server_list._changes = self._get_changes(updated_logicals)
+        server_list._delta = ServerListDelta()
+        return server_list
+
+    def _get_changes(self, updated_logicals: Dict[str, LogicalServer]) -> ServerListChanges:
+        return ServerListChanges(tuple(
+            change for change in (
+                ServerChange.build(
+                    server_id,
+                    get_load_state(self._logicals_by_id[server_id]),
+                    get_load_state(logical_server)
+                )
+                for server_id, logical_server in updated_logicals.items()
+            ) if change
+        ))
+
+    @property
+    def delta(self) -> ServerListDelta:
+        """
+        Servers added, removed and modified by the full server list refresh
+        that built this version of the server list, see :meth:`merge`.
+        """
+        return self._delta
+
+    def merge(  # pylint: disable=too-many-locals
+            self, data: dict, interner: Optional[ValueInterner] = None
+    ) -> ServerList:
+        """
+        Builds a new version of the server list from newly fetched server
+        list data, reusing the logical servers of this version that did not
+        change, leaving this instance untouched.
+
+        Servers whose load, score or status changed, but nothing else, are
+        updated as with :meth:`with_loads`. Servers whose data changed
+        otherwise are built again. When no server was added, removed or
+        built again, the indexes of this version are reused as well.
+
+        The added, removed and modified servers are reported through the
+        `delta` attribute of the returned server list, and the load, score
+        and status changes through its `changes` attribute.
+
+        Note that all the servers of lazy server lists are built to be
+        compared with the new data.
+
+        :param data: dictionary with the server list data, see :meth:`from_dict`.
+        :param interner: optional interner used to deduplicate the values of
+            the servers that have to be built.
+        :returns: the new version of the server list.
+        """
+        if self._logicals_by_id is None:
+            raise RuntimeError("The server list was not indexed.")
+
+        try:
+            user_tier = data[PersistenceKeys.USER_TIER.value]
+            entries = data["LogicalServers"]
+        except KeyError as error:
+            raise ServerListDecodeError("Error merging server list from dict") from error
+
+        logicals = []
+        fingerprints = {}
+        reloaded_logicals = {}
+        added, modified = [], []
+        for entry in entries:
+            server_id = entry.get("ID")
+            fingerprint = _get_fingerprint(entry)
+            fingerprints[server_id] = fingerprint
+            current_logical = self._logicals_by_id.get(server_id)
+            unchanged = current_logical is not None \
+                and self._get_fingerprint(current_logical) == fingerprint
+
+            if unchanged:
+                logical_server = current_logical.with_load(ServerLoad(entry))
+                if logical_server is not current_logical:
+                    reloaded_logicals[server_id] = logical_server
+            else:
+                if interner is not None:
+                    entry = interner.intern_logical_server(entry)
+                logical_server = LogicalServer(entry)
+                (added if current_logical is None else modified).append(server_id)
+            logicals.append(logical_server)
+
+        removed = tuple(
+            server_id for server_id in self._logicals_by_id if server_id not in fingerprints
+        )
+
+        if (
+            not added and not modified and not removed
+            and user_tier == self._user_tier
+            and list(fingerprints) == [logical.id for logical in self._logicals]
+        ):
+            # Only loads changed: the indexes are updated instead of rebuilt.
+            server_list = self._copy_replacing(reloaded_logicals)
+            server_list._set_metadata(data)  # pylint: disable=protected-access
+        else:
+            server_list = self._from_logicals(data, user_tier, logicals, self.columnar)
+
+        # pylint: disable=protected-access
+        server_list._changes = self._get_changes(reloaded_logicals)
+        server_list._delta = ServerListDelta(
+            added=tuple(added), removed=removed, modified=tuple(modified),
+            reused_count=len(logicals) - len(added) - len(modified)
+        )
+        server_list._fingerprints = fingerprints
+        return server_list
+
+    def _get_fingerprint(self, logical_server: LogicalServer) -> bytes:
+        fingerprint = self._fingerprints.get(logical_server.id)
+        if fingerprint is None:
+            fingerprint = _get_fingerprint(logical_server.to_dict())
+            self._fingerprints[logical_server.id] = fingerprint
+        return fingerprint
+
+    def _copy_replacing(self, updated_logicals: Dict[str, LogicalServer]) -> ServerList:
+        """
+        Returns a shallow copy of this server list where the logical servers
+        with the given ids are replaced, copying only the data structures
+        that have to be modified.
+        """
+        server_list = copy.copy(self)
+        if not updated_logicals:
+            return server_list
+
+        # pylint: disable=protected-access
+        if self.lazy:
+            # The copy keeps mapping ids and names to positions, so that the
+            # servers that were not updated are still only built when accessed.
+            server_list._logicals = self._logicals.replacing({
+                self._logicals_by_id.position(server_id): logical_server
+                for server_id, logical_server in updated_logicals.items()
+            })
+            server_list._logicals_by_id = self._logicals_by_id.with_servers(
+                server_list._logicals
+            )
+            server_list._logicals_by_name = self._logicals_by_name.with_servers(
+                server_list._logicals
+            )
+            # The indexes of lazy server lists refer to the lazy sequence.
+            indexed_logicals = server_list._logicals
+        else:
+            server_list._logicals = [
+                updated_logicals.get(logical_server.id, logical_server)
+                for logical_server in self._logicals
+            ]
+            server_list._logicals_by_id = {**self._logicals_by_id, **updated_logicals}
+            server_list._logicals_by_name = self._logicals_by_name.copy()
+            indexed_logicals = None
+        server_list._logicals_by_country = self._logicals_by_country.copy()
+        server_list._available_servers = self._available_servers.copy()
+        if self._bitmaps is not None:
+            server_list._bitmaps = self._bitmaps.copy(indexed_logicals)
+        if self._columns is not None:
+            server_list._columns = self._columns.copy(indexed_logicals)
+
+        updated_countries = set()
+        for logical_server in updated_logicals.values():
+            if not self.lazy:
+                server_list._logicals_by_name[logical_server.name] = logical_server
+            country_key = _country_key(logical_server)
+            if country_key not in updated_countries:
+                updated_countries.add(country_key)
+                server_list._logicals_by_country[country_key] = \
+                    self._logicals_by_country[country_key].copy()
+            server_list._update_indexes(logical_server)
+
+        # Only the countries with updated servers are regrouped.
+        if self._countries is not None:
+            server_list._countries = tuple(
+                Country(country.code, tuple(
+                    updated_logicals.get(logical_server.id, logical_server)
+                    for logical_server in country.servers
+                )) if country.code in updated_countries else country
+                for country in self._countries
+            )
+
+        return server_list
+
+    def _update_indexes(self, logical_server: LogicalServer):
+        self._logicals_by_country[_country_key(logical_server)].update(
+            logical_server.id, logical_server.score
+        )
+        if self._is_available(logical_server):
+            self._available_servers.update(logical_server.id, logical_server.score)
+        else:
+            self._available_servers.remove(logical_server.id)
+        if self._bitmaps is not None:
+            self._bitmaps.update(logical_server)
+        if self._columns is not None:
+            self._columns.update(logical_server)
 
     @property
     def seconds_until_expiration(self) -> float:
@@ -184,6 +583,19 @@ class ServerList:
         :returns: the fastest server in the specified country and the tiers
         the user has access to.
         """
+        if self._columns is not None:
+            return self._get_fastest_from_columns(
+                self._columns.country_mask(country_code)
+            )
+
+        if self._logicals_by_country is not None:
+            # Servers are only resolved until the first available one is found.
+            for server_id in self._logicals_by_country.get(country_code.lower(), ()):
+                server = self._logicals_by_id[server_id]
+                if self._is_available(server):
+                    return server
+            raise ServerNotFoundError("No server available in the current tier")
+
         country_servers = [
             server for server in self.logicals
             if server.exit_country.lower() == country_code.lower()
@@ -192,16 +604,31 @@ class ServerList:
             self.user_tier, country_servers, index_servers=False
         ).get_fastest()
 
+    def get_servers_in_country(self, country_code: str) -> List[LogicalServer]:
+        """
+        :returns: the servers in the specified country, sorted by score
+            (fastest first).
+        """
+        if self._logicals_by_country is None:
+            raise RuntimeError("The server list was not indexed.")
+
+        country_index = self._logicals_by_country.get(country_code.lower(), ())
+        return [self._logicals_by_id[server_id] for server_id in country_index]
+
     def get_fastest(self) -> LogicalServer:
         """:returns: the fastest server in the tiers the user has access to."""
+        if self._columns is not None:
+            return self._get_fastest_from_columns()
+
+        if self._available_servers is not None:
+            fastest_id = self._available_servers.first()
+            if fastest_id is None:
+                raise ServerNotFoundError("No server available in the current tier")
+            return self._logicals_by_id[fastest_id]
+
         available_servers = [
             server for server in self.logicals
-            if (
-                    server.enabled
-                    and server.tier <= self.user_tier
-                    and ServerFeatureEnum.SECURE_CORE not in server.features
-                    and ServerFeatureEnum.TOR not in server.features
-            )
+            if self._is_available(server)
         ]
 
         if not available_servers:
@@ -209,24 +636,182 @@ class ServerList:
 
         return sorted(available_servers, key=lambda server: server.score)[0]
 
-    def group_by_country(self) -> List[Country]:
+    def get_fastest_n(self, count: int) -> List[LogicalServer]:
         """
-        Returns the servers grouped by country.
+        :returns: the specified amount of fastest servers in the tiers the
+            user has access to, sorted by score (fastest first). Fewer servers
+            are returned if there are not enough available servers.
+        """
+        if self._available_servers is not None:
+            return [
+                self._logicals_by_id[server_id]
+                for server_id in self._available_servers.first_n(count)
+            ]
 
-        Before grouping the servers, they are sorted alphabetically by
-        country name and server name.
+        return heapq.nsmallest(
+            count,
+            (server for server in self.logicals if self._is_available(server)),
+            key=lambda server: server.score
+        )
+
+    def query(  # pylint: disable=too-many-arguments
+            self, *,
+            country: Optional[str] = None,
+            city: Optional[str] = None,
+            features_all: int = 0,
+            features_none: int = 0,
+            max_tier: Optional[int] = None,
+            enabled: Optional[bool] = None,
+            order_by: Optional[str] = "score",
+            limit: Optional[int] = None
+    ) -> List[LogicalServer]:
+        """
+        Returns the servers matching all the specified conditions.
+
+        The conditions are resolved by intersecting bitmap indexes, without
+        iterating over the servers. The bitmap indexes are built on the
+        first call.
 
-        :return: The list of countries, each of them containing the servers
-        in that country.
+        :param country: exit country code (case-insensitive).
+        :param city: city name (case-insensitive).
+        :param features_all: ServerFeatureEnum flags the servers must have.
+        :param features_none: ServerFeatureEnum flags the servers must not have.
+        :param max_tier: maximum tier of the servers.
+        :param enabled: whether the servers must be enabled or disabled.
+        :param order_by: "score", "load", "name" or None to keep the
+            server list order.
+        :param limit: maximum number of servers to return.
+        :returns: the list of matching servers.
         """
-        self.logicals.sort(key=sort_servers_alphabetically_by_country_and_server_name)
+        bitmaps = self._get_bitmaps()
+
+        if order_by is not None and order_by not in _QUERY_SORT_KEYS:
+            raise ValueError(f"Invalid order_by value: {order_by}")
+
+        servers = bitmaps.get_servers(bitmaps.select(
+            country=country, city=city,
+            features_all=features_all, features_none=features_none,
+            max_tier=max_tier, enabled=enabled
+        ))
+
+        if order_by is None:
+            return servers[:limit]
+
+        sort_key = _QUERY_SORT_KEYS[order_by]
+        if limit is not None:
+            return heapq.nsmallest(limit, servers, key=sort_key)
+        return sorted(servers, key=sort_key)
+
+    def get_nearest(
+            self, latitude: float, longitude: float, count: int = 1, **filters
+    ) -> List[LogicalServer]:
+        """
+        Returns the servers closest to the specified location, e.g. the one
+        from :class:`proton.vpn.session.dataclasses.VPNLocation`.
+
+        :param latitude: latitude of the location to search from.
+        :param longitude: longitude of the location to search from.
+        :param count: maximum number of servers to return.
+        :param filters: optional conditions the servers must fulfill. The
+            same conditions as the ones in :meth:`query` are supported.
+        :returns: the closest servers, sorted by distance.
+
+        The geo-spatial index is built on the first call.
+        """
+        geo_index = self._get_geo_index()
         return [
-            Country(country_code, list(country_servers))
-            for country_code, country_servers in itertools.groupby(
-                self.logicals, lambda server: server.exit_country.lower()
+            self._bitmaps.logicals[position]
+            for _, position in geo_index.nearest(
+                latitude, longitude, count, accept=self._build_geo_filter(filters)
             )
         ]
 
+    def get_within_radius(
+            self, latitude: float, longitude: float, radius_km: float, **filters
+    ) -> List[LogicalServer]:
+        """
+        Returns the servers within a given distance of the specified location.
+
+        :param latitude: latitude of the location to search from.
+        :param longitude: longitude of the location to search from.
+        :param radius_km: maximum distance of the servers, in km.
+        :param filters: optional conditions the servers must fulfill. The
+            same conditions as the ones in :meth:`query` are supported.
+        :returns: the servers within the radius, sorted by distance.
+        """
+        geo_index = self._get_geo_index()
+        return [
+            self._bitmaps.logicals[position]
+            for _, position in geo_index.within_radius(
+                latitude, longitude, radius_km, accept=self._build_geo_filter(filters)
+            )
+        ]
+
+    def _build_geo_filter(self, filters: dict) -> Optional[Callable[[int], bool]]:
+        if not filters:
+            return None
+
+        allowed = self._get_bitmaps().select(**filters)
+        return lambda position: (allowed >> position) & 1 == 1
+
+    def _is_available(self, server: LogicalServer) -> bool:
+        """
+        Returns whether the server is a candidate for the fastest server:
+        it has to be enabled, in the tiers the user has access to and it
+        should not be a secure core or TOR server.
+        """
+        return (
+            server.enabled
+            and (server.tier or 0) <= self.user_tier
+            and server.lacks_features(_FASTEST_SERVER_EXCLUDED_FEATURES)
+        )
+
+    def _get_fastest_from_columns(self, mask=None) -> LogicalServer:
+        eligible = self._columns.eligible_mask(
+            self.user_tier, _FASTEST_SERVER_EXCLUDED_FEATURES
+        )
+        fastest = self._columns.get_fastest(eligible if mask is None else eligible & mask)
+        if fastest is None:
+            raise ServerNotFoundError("No server available in the current tier")
+
+        return fastest
+
+    def group_by_country(self) -> Tuple[Country, ...]:
+        """
+        Returns the servers grouped by country.
+
+        Before grouping the servers, they are sorted alphabetically by
+        country name and server name. The server list itself is not reordered.
+
+        The grouping is computed once and cached, since updating the server
+        loads changes neither the servers in each country nor their
+        order.
+
+        :return: The read-only sequence of countries, each of them
+        containing the servers in that country.
+        """
+        countries = self._countries
+        if countries is None:
+            sorted_logicals = sorted(
+                self._logicals, key=sort_servers_alphabetically_by_country_and_server_name
+            )
+            countries = tuple(
+                Country(country_code, tuple(country_servers))
+                for country_code, country_servers in itertools.groupby(
+                    sorted_logicals, lambda server: server.exit_country.lower()
+                )
+            )
+            self._countries = countries
+
+        return countries
+
+    def memory_footprint(self) -> MemoryFootprint:
+        """
+        :returns: the approximate memory used by the logical servers, their
+            physical servers and their data. Indexes are not included.
+        """
+        return measure_memory_footprint(self._logicals)
+
     @classmethod
     def _generate_random_component(cls):
         # 1 +/- 0.22*random
@@ -260,17 +845,81 @@ class ServerList:
 
     @classmethod
     def from_dict(
-            cls, data: dict
+            cls, data: dict, columnar: bool = False, lazy: bool = False, compact: bool = False
     ):
         """
+        :param data: dictionary with the server list data.
+        :param columnar: whether to keep a columnar (numpy) copy of the
+            server attributes to speed up filtering. Requires numpy.
+        :param lazy: whether to build the logical servers only when they are
+            accessed (e.g. through :meth:`get_by_name`), instead of building
+            all of them upfront. The raw server data is kept and should not be
+            modified afterwards. Versions built with :meth:`with_loads` stay
+            lazy, whereas :meth:`merge` builds all the servers.
+        :param compact: whether to decode all the attributes of the logical
+            servers upfront and release their raw data, which makes building
+            the server list slower but reduces its memory usage. See
+            :meth:`LogicalServer.decode`. Ignored in lazy mode.
         :returns: the server list built from the given dictionary.
         """
         try:
             user_tier = data[PersistenceKeys.USER_TIER.value]
-            logicals = [LogicalServer(logical_dict) for logical_dict in data["LogicalServers"]]
+            if lazy:
+                logicals = LazyLogicalServers(data["LogicalServers"])
+            else:
+                logicals = [
+                    LogicalServer(logical_dict) for logical_dict in data["LogicalServers"]
+                ]
+                if compact:
+                    for logical_server in logicals:
+                        logical_server.decode()
         except KeyError as error:
             raise ServerListDecodeError("Error building server list from dict") from error
 
+        return cls._from_logicals(data, user_tier, logicals, columnar)
+
+    @classmethod
+    def from_stream(
+            cls, stream: IO, columnar: bool = False,
+            interner: Optional[ValueInterner] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            compact: bool = False
+    ):
+        """
+        Builds the server list by parsing its JSON representation from a
+        stream incrementally. Each logical server is built as soon as its data
+        is parsed, so that the whole JSON document is never kept in memory.
+
+        :param stream: text or binary file-like object to read from.
+        :param columnar: see :meth:`from_dict`.
+        :param interner: optional interner used to deduplicate the values of
+            each server before building it.
+        :param chunk_size: amount of data read from the stream at once.
+        :param compact: see :meth:`from_dict`.
+        :returns: the server list built from the stream.
+        :raises ValueError: if the stream content is not valid JSON.
+        """
+        def build_logical(logical_dict: dict) -> LogicalServer:
+            if interner is not None:
+                logical_dict = interner.intern_logical_server(logical_dict)
+            logical_server = LogicalServer(logical_dict)
+            if compact:
+                logical_server.decode()
+            return logical_server
+
+        data = load_server_list_stream(stream, build_logical, chunk_size)
+        try:
+            user_tier = data[PersistenceKeys.USER_TIER.value]
+            logicals = data["LogicalServers"]
+        except KeyError as error:
+            raise ServerListDecodeError("Error building server list from stream") from error
+
+        return cls._from_logicals(data, user_tier, logicals, columnar)
+
+    @classmethod
+    def _from_logicals(
+            cls, data: dict, user_tier: TierEnum, logicals, columnar: bool
+    ) -> ServerList:
         expiration_time = data.get(
             PersistenceKeys.EXPIRATION_TIME.value,
             cls.get_expiration_time()
@@ -281,24 +930,44 @@ class ServerList:
         )
 
         return ServerList(
-            user_tier, logicals, expiration_time, loads_expiration_time
+            user_tier, logicals, expiration_time, loads_expiration_time,
+            columnar=columnar,
+            etag=data.get(PersistenceKeys.ETAG.value),
+            last_modified=data.get(PersistenceKeys.LAST_MODIFIED.value)
         )
 
+    def _set_metadata(self, data: dict):
+        """Sets the expiration times and the response validators found in the data."""
+        self._expiration_time = data.get(
+            PersistenceKeys.EXPIRATION_TIME.value,
+            self.get_expiration_time()
+        )
+        self._loads_expiration_time = data.get(
+            PersistenceKeys.LOADS_EXPIRATION_TIME.value,
+            self.get_loads_expiration_time()
+        )
+        self._etag = data.get(PersistenceKeys.ETAG.value)
+        self._last_modified = data.get(PersistenceKeys.LAST_MODIFIED.value)
+
     def to_dict(self) -> dict:
         """:returns: the server list instance converted back to a dictionary."""
-        return {
+        data = {
             PersistenceKeys.LOGICALS.value: [logical.to_dict() for logical in self.logicals],
             PersistenceKeys.EXPIRATION_TIME.value: self.expiration_time,
             PersistenceKeys.LOADS_EXPIRATION_TIME.value: self.loads_expiration_time,
             PersistenceKeys.USER_TIER.value: self._user_tier
         }
+        if self._etag is not None:
+            data[PersistenceKeys.ETAG.value] = self._etag
+        if self._last_modified is not None:
+            data[PersistenceKeys.LAST_MODIFIED.value] = self._last_modified
+        return data
 
     def __len__(self):
         return len(self.logicals)
 
     def __iter__(self):
-        for logical in self.logicals:
-            yield logical
+        yield from self.logicals
 
     def __getitem__(self, item):
         return self.logicals[item]
@@ -306,35 +975,62 @@ class ServerList:
     def sort(self, key: Callable = None):
         """See List.sort()."""
         key = key or sort_servers_alphabetically_by_country_and_server_name
-        self.logicals.sort(key=key)
+        if self.lazy:
+            # The indexes keep the lazy sequence, which must not be reordered.
+            self._logicals = list(self._logicals)
+        self._logicals.sort(key=key)
+
 
+_QUERY_SORT_KEYS = {
+    "score": lambda server: (server.score is None, server.score),
+    "load": lambda server: (server.load is None, server.load),
+    "name": lambda server: server.name or "",
+}
 
-def sort_servers_alphabetically_by_country_and_server_name(server: LogicalServer) -> str:
+
+# Keys of the logical server data that are updated by server loads updates.
+_LOAD_KEYS = frozenset(("Load", "Score", "Status"))
+
+
+def _get_fingerprint(logical_data: dict) -> bytes:
+    """
+    :returns: a digest of the logical server data, excluding the keys
+        updated by server loads updates.
+    """
+    static_data = {
+        key: value for key, value in logical_data.items() if key not in _LOAD_KEYS
+    }
+    return hashlib.blake2b(
+        json.dumps(static_data, sort_keys=True).encode("utf-8"), digest_size=16
+    ).digest()
+
+
+def _country_key(server: LogicalServer) -> str:
+    return (server.exit_country or "").lower()
+
+
+def sort_servers_alphabetically_by_country_and_server_name(
+        server: LogicalServer
+) -> Tuple[str, str, int, str]:
     """
     Returns the comparison key used to sort servers alphabetically,
     first by exit country name and then by server name.
 
     If the server name is in the form of COUNTRY-CODE#NUMBER, then NUMBER
-    is padded with zeros to be able to sort the server name in natural sort
-    order.
-    """
-    country_name = server.exit_country_name
-    server_name = server.name or ""
-    server_name = server_name.lower()
-    if "#" in server_name:
-        # Pad server number with zeros to achieve natural sorting
-        server_name = f"{server_name.split('#')[0]}#" \
-                      f"{server_name.split('#')[1].zfill(10)}"
+    is compared numerically to sort the server name in natural sort order.
 
-    return f"{country_name}__{server_name}"
+    The key is precomputed when the logical server is built, see
+    :attr:`LogicalServer.sort_key`.
+    """
+    return server.sort_key
 
 
-@dataclass
+@dataclass(frozen=True)
 class Country:
     """Group of servers belonging to a country."""
 
     code: str
-    servers: List[LogicalServer]
+    servers: Sequence[LogicalServer]
 
     @property
     def name(self):
@@ -0,0 +1,176 @@
+"""
+Helpers to reduce and measure the memory used by server lists.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, Set
+
+from proton.vpn.session.servers.types import LogicalServer
+
+
+class ValueInterner:
+    """
+    Deduplicates repeated values in the server list data, so that equal
+    values (country codes, cities, labels, coordinates...) are stored once
+    and shared by all the servers.
+
+    Strings are interned with :func:`sys.intern`, so they are also shared
+    with other server lists kept by the same process.
+    """
+
+    def __init__(self):
+        self._values: Dict[object, object] = {}
+
+    def intern_server_list(self, data: dict) -> dict:
+        """
+        Deduplicates the values of the logical and physical servers in the
+        server list data, in place.
+
+        :returns: the same server list data.
+        """
+        for logical_data in data.get("LogicalServers", []):
+            self.intern_logical_server(logical_data)
+
+        return data
+
+    def intern_logical_server(self, data: dict) -> dict:
+        """
+        Deduplicates the values of the logical server data and the ones of
+        its physical servers, in place.
+
+        :returns: the same logical server data.
+        """
+        self.intern_server(data)
+        for physical_data in data.get("Servers") or []:
+            self.intern_server(physical_data)
+
+        return data
+
+    def intern_server(self, data: dict):
+        """Deduplicates the values of the server data, in place."""
+        for key, value in data.items():
+            if isinstance(value, dict):
+                data[key] = self._intern_dict(value)
+            elif not isinstance(value, list):
+                data[key] = self.intern(value)
+
+    def intern(self, value):
+        """:returns: the shared instance of the value."""
+        if isinstance(value, str):
+            return sys.intern(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # The type is part of the key so that e.g. 1 and 1.0 are not merged.
+            return self._values.setdefault((type(value), value), value)
+        return value
+
+    def _intern_dict(self, value: dict) -> dict:
+        # Small dicts with scalar values (e.g. locations) are shared too.
+        # They are not modified after the server list is parsed.
+        try:
+            key = tuple(
+                (item_key, self.intern(item_value)) for item_key, item_value in value.items()
+            )
+            return self._values.setdefault((dict, key), dict(key))
+        except TypeError:
+            # Unhashable values.
+            return value
+
+
+def intern_server_list_data(data: dict) -> dict:
+    """
+    Deduplicates the repeated values in the server list data, in place.
+    See :class:`ValueInterner`.
+
+    :returns: the same server list data.
+    """
+    return ValueInterner().intern_server_list(data)
+
+
+@dataclass(frozen=True)
+class MemoryFootprint:
+    """
+    Approximate memory used by the servers of a server list, in bytes.
+
+    Values shared by several servers are only counted once.
+    """
+    logical_servers: int
+    physical_servers: int
+    values: int
+
+    @property
+    def total(self) -> int:
+        """Total amount of bytes."""
+        return self.logical_servers + self.physical_servers + self.values
+
+
+def measure_memory_footprint(logicals: Iterable[LogicalServer]) -> MemoryFootprint:
+    """:returns: the approximate memory used by the logical servers and their data."""
+    seen: Set[int] = set()
+    logical_servers = physical_servers = values = 0
+
+    for logical in logicals:
+        logical_servers += sys.getsizeof(logical)
+        for attribute in LogicalServer.__slots__:
+            value = _get_decoded_attribute(logical, attribute)
+            if attribute in ("_physical_servers", "_enabled_physical_servers"):
+                values += _get_size(value, seen, deep=False)
+                for physical in value or []:
+                    if id(physical) not in seen:
+                        seen.add(id(physical))
+                        physical_servers += sys.getsizeof(physical)
+                        values += sum(
+                            _get_size(getattr(physical, physical_attribute, None), seen)
+                            for physical_attribute in type(physical).__slots__
+                        )
+            else:
+                values += _get_size(value, seen)
+
+    return MemoryFootprint(logical_servers, physical_servers, values)
+
+
+def _get_decoded_attribute(logical: LogicalServer, attribute: str):
+    # Unlike getattr, object.__getattribute__ does not fall back to
+    # LogicalServer.__getattr__, so measuring does not decode the attribute.
+    try:
+        return object.__getattribute__(logical, attribute)
+    except AttributeError:
+        return None
+
+
+def _get_size(value, seen: Set[int], deep: bool = True) -> int:
+    if value is None or isinstance(value, bool) or id(value) in seen:
+        return 0
+
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if not deep:
+        return size
+
+    if isinstance(value, dict):
+        size += sum(
+            _get_size(key, seen) + _get_size(item, seen) for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple)):
+        size += sum(_get_size(item, seen) for item in value)
+
+    return size
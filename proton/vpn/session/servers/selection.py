@@ -0,0 +1,154 @@
+"""
+Strategies to select the physical server to connect to.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import random
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from proton.vpn.session.exceptions import ServerNotFoundError
+from proton.vpn.session.servers.types import LogicalServer, PhysicalServer
+
+
+class PhysicalServerSelector(ABC):  # pylint: disable=too-few-public-methods
+    """
+    Selects one of the enabled physical servers of a logical server.
+
+    The enabled physical servers of each logical server are precomputed by
+    the logical server itself (see
+    :attr:`LogicalServer.enabled_physical_servers`) and only change when
+    the server is updated.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        """
+        :param rng: random number generator to use. A seeded generator
+            can be passed to get reproducible selections.
+        """
+        self._rng = rng or random.Random()
+
+    def select(self, logical_server: LogicalServer) -> PhysicalServer:
+        """
+        :returns: one of the enabled physical servers of the logical server.
+        :raises ServerNotFoundError: if the logical server does not have
+            any enabled physical server.
+        """
+        candidates = logical_server.enabled_physical_servers
+        if not candidates:
+            raise ServerNotFoundError("No physical servers could be found")
+
+        return self._select(logical_server, candidates)
+
+    @abstractmethod
+    def _select(
+            self, logical_server: LogicalServer, candidates: Sequence[PhysicalServer]
+    ) -> PhysicalServer:
+        """Selects one of the (non-empty) candidates."""
+
+
+class UniformSelector(PhysicalServerSelector):  # pylint: disable=too-few-public-methods
+    """Selects any of the enabled physical servers with the same probability."""
+
+    def _select(
+            self, logical_server: LogicalServer, candidates: Sequence[PhysicalServer]
+    ) -> PhysicalServer:
+        return self._rng.choice(candidates)
+
+
+class WeightedSelector(PhysicalServerSelector):  # pylint: disable=too-few-public-methods
+    """
+    Selects the enabled physical servers with a probability proportional
+    to their weight.
+
+    The cumulative weights of the physical servers of each logical server
+    are computed on first use and reused until its enabled physical servers
+    change.
+    """
+
+    def __init__(
+            self,
+            weight: Optional[Callable[[PhysicalServer], float]] = None,
+            rng: Optional[random.Random] = None
+    ):
+        """
+        :param weight: function returning the weight of a physical server.
+            Servers with a weight of 0 are never selected. By default, all
+            physical servers have a weight of 1.
+        :param rng: random number generator to use.
+        """
+        super().__init__(rng)
+        self._weight = weight or (lambda physical_server: 1)
+        self._cumulative_weights: Dict[
+            str, Tuple[Sequence[PhysicalServer], List[float]]
+        ] = {}
+
+    def _select(
+            self, logical_server: LogicalServer, candidates: Sequence[PhysicalServer]
+    ) -> PhysicalServer:
+        cumulative_weights = self._get_cumulative_weights(logical_server.id, candidates)
+        total_weight = cumulative_weights[-1]
+        if total_weight <= 0:
+            # None of the candidates has weight: fall back to a uniform selection.
+            return self._rng.choice(candidates)
+
+        position = bisect.bisect_right(cumulative_weights, self._rng.random() * total_weight)
+        return candidates[min(position, len(candidates) - 1)]
+
+    def _get_cumulative_weights(
+            self, logical_server_id: str, candidates: Sequence[PhysicalServer]
+    ) -> List[float]:
+        cached_candidates, cumulative_weights = self._cumulative_weights.get(
+            logical_server_id, (None, None)
+        )
+        if cached_candidates is not candidates:
+            cumulative_weights = list(itertools.accumulate(
+                max(float(self._weight(candidate)), 0.0) for candidate in candidates
+            ))
+            self._cumulative_weights[logical_server_id] = (candidates, cumulative_weights)
+
+        return cumulative_weights
+
+
+class RoundRobinSelector(PhysicalServerSelector):  # pylint: disable=too-few-public-methods
+    """
+    Cycles through the enabled physical servers of each logical server.
+
+    The first physical server selected for each logical server is picked
+    at random, so that clients do not all start with the same one.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        super().__init__(rng)
+        self._counters: Dict[str, Iterator[int]] = {}
+
+    def _select(
+            self, logical_server: LogicalServer, candidates: Sequence[PhysicalServer]
+    ) -> PhysicalServer:
+        counter = self._counters.get(logical_server.id)
+        if counter is None:
+            counter = self._counters.setdefault(
+                logical_server.id, itertools.count(self._rng.randrange(len(candidates)))
+            )
+
+        return candidates[next(counter) % len(candidates)]
@@ -0,0 +1,183 @@
+"""
+Incremental parsing of the server list JSON document.
+
+
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Callable, IO, Iterator, Optional, TypeVar
+
+T = TypeVar("T")  # pylint: disable=invalid-name
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+LOGICALS_KEY = "LogicalServers"
+
+
+def load_server_list_stream(
+        stream: IO,
+        build_logical: Callable[[dict], T],
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> dict:
+    """
+    Parses the server list JSON document from a text or binary (UTF-8)
+    stream, reading it in chunks.
+
+    Each item of the logical servers array is passed to `build_logical` as
+    soon as it is parsed, and only the returned object is kept. This way,
+    the whole document never needs to be in memory at the same time.
+
+    :param stream: file-like object to read the JSON document from.
+    :param build_logical: function called with the data of each logical
+        server, returning the object to keep (e.g. a LogicalServer).
+    :param chunk_size: amount of data read from the stream at once.
+    :returns: the server list data, where the logical servers array
+        contains the objects returned by `build_logical`.
+    :raises ValueError: if the stream content is not a valid JSON object.
+    """
+    reader = _JSONStreamReader(stream, chunk_size)
+    data = {}
+
+    reader.expect("{")
+    if reader.consume("}"):
+        reader.expect_end()
+        return data
+
+    while True:
+        key = reader.decode_value()
+        if not isinstance(key, str):
+            raise reader.error("Expecting property name")
+        reader.expect(":")
+        if key == LOGICALS_KEY:
+            data[key] = list(reader.iter_array(build_logical))
+        else:
+            data[key] = reader.decode_value()
+
+        if not reader.consume(","):
+            break
+
+    reader.expect("}")
+    reader.expect_end()
+    return data
+
+
+class _JSONStreamReader:
+    """Decodes JSON values one by one from a stream, using a sliding buffer."""
+
+    _WHITESPACE = " \t\n\r"
+    _NUMBER_CHARS = "0123456789.eE+-"
+
+    def __init__(self, stream: IO, chunk_size: int):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder: Optional[codecs.IncrementalDecoder] = None
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def iter_array(self, build_item: Callable[[object], T]) -> Iterator[T]:
+        """Yields the items of the array at the current position, transformed."""
+        self.expect("[")
+        if self.consume("]"):
+            return
+
+        while True:
+            yield build_item(self.decode_value())
+            if not self.consume(","):
+                break
+
+        self.expect("]")
+
+    def decode_value(self):
+        """:returns: the JSON value at the current position."""
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                self._read_chunk()
+                continue
+
+            # A value ending right at the end of the buffer may be truncated,
+            # and so may a number followed by more number characters
+            # (e.g. "1" when the buffer ends with "1.").
+            if not self._eof and (
+                end == len(self._buffer)
+                or (_is_number(value) and self._buffer[end] in self._NUMBER_CHARS)
+            ):
+                self._read_chunk()
+                continue
+
+            self._position = end
+            return value
+
+    def consume(self, char: str) -> bool:
+        """Consumes the character if it is the next one, ignoring whitespace."""
+        self._skip_whitespace()
+        if self._buffer.startswith(char, self._position):
+            self._position += 1
+            return True
+        return False
+
+    def expect(self, char: str):
+        """Consumes the character, which must be the next one ignoring whitespace."""
+        if not self.consume(char):
+            raise self.error(f"Expecting '{char}'")
+
+    def expect_end(self):
+        """Checks that there is nothing else than whitespace left in the stream."""
+        self._skip_whitespace()
+        if not self._eof or self._position < len(self._buffer):
+            raise self.error("Extra data")
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        """:returns: a decoding error at the current position."""
+        return json.JSONDecodeError(message, self._buffer, self._position)
+
+    def _skip_whitespace(self):
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in self._WHITESPACE
+            ):
+                self._position += 1
+            if self._position < len(self._buffer) or self._eof:
+                return
+            self._read_chunk()
+
+    def _read_chunk(self):
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+        if isinstance(chunk, bytes):
+            if self._text_decoder is None:
+                self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+            chunk = self._text_decoder.decode(chunk, final=self._eof)
+
+        # Drop the data already consumed so that the buffer does not grow.
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
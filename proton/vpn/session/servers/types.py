@@ -19,7 +19,7 @@ along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 from __future__ import annotations
 import random
 from enum import IntFlag
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
 
 from proton.vpn.session.exceptions import ServerNotFoundError
 from proton.vpn.session.servers.country_codes import get_country_name_by_code
@@ -45,24 +45,88 @@ class ServerFeatureEnum(IntFlag):
     IPV6 = 1 << 4  # 16
 
 
-class PhysicalServer:
+# Keys of the server data that are decoded into attributes, mapped to
+# the attribute where the decoded value is stored. Any other key is kept
+# as is, so that the original data can be rebuilt with to_dict().
+_PHYSICAL_SERVER_ATTRIBUTES = {
+    "ID": "_id",
+    "EntryIP": "_entry_ip",
+    "ExitIP": "_exit_ip",
+    "Domain": "_domain",
+    "Status": "_status",
+    "Generation": "_generation",
+    "Label": "_label",
+    "ServicesDownReason": "_services_down_reason",
+    "X25519PublicKey": "_x25519_pk",
+}
+
+_LOGICAL_SERVER_ATTRIBUTES = {
+    "ID": "_id",
+    "Name": "_name",
+    "EntryCountry": "_entry_country",
+    "ExitCountry": "_exit_country",
+    "HostCountry": "_host_country",
+    # Tier and features are serialized from their raw values, which are
+    # decoded into TierEnum and an int bitmask.
+    "Tier": "_raw_tier",
+    "Features": "_raw_features",
+    "Region": "_region",
+    "City": "_city",
+    "Score": "_score",
+    "Load": "_load",
+    "Status": "_status",
+    "Location": "_location",
+    "Servers": "_physical_servers",
+}
+
+# Key layouts (the keys present in the server data, in their original
+# order) are shared between all servers with the same layout.
+_KEY_LAYOUTS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _intern_key_layout(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    return _KEY_LAYOUTS.setdefault(keys, keys)
+
+
+def _get_extra_data(data: Dict, attributes: Dict[str, str]) -> Optional[Dict]:
+    extra_data = {key: value for key, value in data.items() if key not in attributes}
+    return extra_data or None
+
+
+class PhysicalServer:  # pylint: disable=too-many-instance-attributes
     """
     A physical server instance contains the network information
     to initiate a VPN connection to the server.
+
+    The server data is decoded once, when the instance is created.
     """
+    __slots__ = (
+        "_id", "_entry_ip", "_exit_ip", "_domain", "_status", "_generation",
+        "_label", "_services_down_reason", "_x25519_pk", "_keys", "_extra_data"
+    )
 
     def __init__(self, data: Dict):
-        self._data = data
+        self._id = data.get("ID")
+        self._entry_ip = data.get("EntryIP")
+        self._exit_ip = data.get("ExitIP")
+        self._domain = data.get("Domain")
+        self._status = data.get("Status")
+        self._generation = data.get("Generation")
+        self._label = data.get("Label")
+        self._services_down_reason = data.get("ServicesDownReason")
+        self._x25519_pk = data.get("X25519PublicKey")
+        self._keys = _intern_key_layout(tuple(data))
+        self._extra_data = _get_extra_data(data, _PHYSICAL_SERVER_ATTRIBUTES)
 
     @property
     def id(self) -> str:  # pylint: disable=invalid-name
         """Returns the physical ID of the server."""
-        return self._data.get("ID")
+        return self._id
 
     @property
     def entry_ip(self) -> str:
         """Returns the IP of the entered server."""
-        return self._data.get("EntryIP")
+        return self._entry_ip
 
     @property
     def exit_ip(self) -> str:
@@ -70,24 +134,24 @@ class PhysicalServer:
             If you want to display to which IP a user is connected
             then use this one.
         """
-        return self._data.get("ExitIP")
+        return self._exit_ip
 
     @property
     def domain(self) -> str:
         """Returns the Domain of the connected server.
             This is usually used for TLS Authentication.
         """
-        return self._data.get("Domain")
+        return self._domain
 
     @property
     def enabled(self) -> bool:
         """Returns if the server is enabled or not"""
-        return self._data.get("Status") == 1
+        return self._status == 1
 
     @property
     def generation(self) -> str:
         """Returns the generation of the server."""
-        return self._data.get("Generation")
+        return self._generation
 
     @property
     def label(self) -> str:
@@ -95,18 +159,26 @@ class PhysicalServer:
             If label is passed then it ensures that the
             `ExitIP` matches exactly to the server that we're connected.
         """
-        return self._data.get("Label")
+        return self._label
 
     @property
     def services_down_reason(self) -> str:
         """Returns the reason of why the servers are down."""
-        return self._data.get("ServicesDownReason")
+        return self._services_down_reason
 
     @property
     def x25519_pk(self) -> str:
         """ X25519 public key of the physical available as a base64 encoded string.
         """
-        return self._data.get("X25519PublicKey")
+        return self._x25519_pk
+
+    def to_dict(self) -> Dict:
+        """Converts this object to a dictionary for serialization purposes."""
+        return {
+            key: getattr(self, _PHYSICAL_SERVER_ATTRIBUTES[key])
+            if key in _PHYSICAL_SERVER_ATTRIBUTES else self._extra_data[key]
+            for key in self._keys
+        }
 
     def __repr__(self):
         if self.label != '':
@@ -115,16 +187,107 @@ class PhysicalServer:
         return f'PhysicalServer<{self.domain}>'
 
 
-class LogicalServer:  # pylint: disable=too-many-public-methods
+# Lookup table of the features unpacked from each feature bitmask.
+_FEATURES_BY_MASK: Dict[int, Tuple[ServerFeatureEnum, ...]] = {}
+
+
+def _unpack_bitmap_features(feature_mask: int) -> Tuple[ServerFeatureEnum, ...]:
+    features = _FEATURES_BY_MASK.get(feature_mask)
+    if features is None:
+        features = tuple(
+            feature_enum
+            for feature_enum
+            in ServerFeatureEnum
+            if (feature_mask & feature_enum) != 0
+        )
+        _FEATURES_BY_MASK[feature_mask] = features
+    return features
+
+
+class LogicalServer:  # pylint: disable=too-many-public-methods,too-many-instance-attributes
     """
     Abstraction of a VPN server.
 
     One logical servers abstract one or more
     PhysicalServer instances away.
+
+    Each attribute is decoded from the server data the first time it is
+    accessed, so that building many servers is cheap. :meth:`decode`
+    decodes all of them at once and releases the server data, which
+    reduces the memory used by long-lived servers. Either way, the
+    server can be converted back to a dictionary with :meth:`to_dict`.
     """
+    __slots__ = (
+        "_data", "_id", "_name", "_entry_country", "_exit_country", "_host_country",
+        "_tier", "_raw_tier", "_feature_mask", "_raw_features", "_region", "_city",
+        "_score", "_load", "_status",
+        "_location", "_latitude", "_longitude", "_physical_servers",
+        "_enabled_physical_servers", "_enabled", "_keys", "_extra_data", "_sort_key"
+    )
 
     def __init__(self, data: Dict):
         self._data = data
+        # The attributes needed to index the server are decoded upfront.
+        self._id = data.get("ID")
+        self._name = data.get("Name")
+        self._exit_country = data.get("ExitCountry")
+        self._score = data.get("Score")
+        self._load = data.get("Load")
+        self._status = data.get("Status")
+        self._raw_tier = data.get("Tier")
+        self._tier = _decode_tier(self._raw_tier)
+        self._raw_features = data.get("Features")
+        self._feature_mask = int(self._raw_features or 0)
+        self._enabled = self._status == 1 and _has_enabled_physical_servers(data)
+
+    def __getattr__(self, name):
+        # Only called when the attribute was not set yet, i.e. not decoded.
+        decoder = _LOGICAL_SERVER_DECODERS.get(name)
+        if decoder is None:
+            raise AttributeError(name)
+
+        value = decoder(self)
+        setattr(self, name, value)
+        return value
+
+    def decode(self):
+        """
+        Decodes all the attributes of the server that were not decoded yet
+        and releases the server data, which is not needed afterwards.
+        """
+        if self._data is None:
+            return
+
+        for attribute in _LOGICAL_SERVER_DECODERS:
+            getattr(self, attribute)
+        self._data = None
+
+    @property
+    def decoded(self) -> bool:
+        """Whether all the attributes were decoded with :meth:`decode` or not."""
+        return self._data is None
+
+    def _build_sort_key(self) -> Tuple[str, str, int, str]:
+        country_name = get_country_name_by_code(self._exit_country or "")
+        server_name = (self._name or "").lower()
+        prefix, separator, suffix = server_name.partition("#")
+        if not separator:
+            return country_name, prefix, -1, ""
+
+        # Split the server number from the rest of the suffix (e.g. "18-tor")
+        # to achieve natural sorting.
+        digits = len(suffix) - len(suffix.lstrip("0123456789"))
+        number = int(suffix[:digits]) if digits else -1
+        return country_name, prefix, number, suffix[digits:]
+
+    def _is_enabled(self) -> bool:
+        if self._status != 1:
+            return False
+
+        if _is_decoded(self, "_enabled_physical_servers"):
+            return len(self._enabled_physical_servers) > 0
+
+        return _has_enabled_physical_servers(self._data)
 
     def update(self, server_load: ServerLoad):
         """Internally updates the logical server:
@@ -138,14 +301,56 @@ class LogicalServer:  # pylint: disable=too-many-public-methods
                 "the server load object"
             )
 
-        self._data["Load"] = server_load.load
-        self._data["Score"] = server_load.score
-        self._data["Status"] = 1 if server_load.enabled else 0
+        self._set_load(server_load)
+
+    def with_load(self, server_load: ServerLoad) -> LogicalServer:
+        """
+        Returns a copy of the logical server updated with the server load,
+        leaving this instance untouched. If the server load does not change
+        the load, the score nor the status, this same instance is returned.
+
+        The copy shares the data that is not modified by the update (e.g. the
+        physical servers) with this instance.
+        """
+        if self.id != server_load.id:
+            raise ValueError(
+                "The id of the logical server does not match the one of "
+                "the server load object"
+            )
+
+        if (
+            self._load == server_load.load
+            and self._score == server_load.score
+            and self._status == (1 if server_load.enabled else 0)
+        ):
+            return self
+
+        logical_server = LogicalServer.__new__(LogicalServer)
+        # Only the attributes decoded so far are copied, the copy decodes
+        # the other ones from the same server data on first access.
+        for attribute in LogicalServer.__slots__:
+            if _is_decoded(self, attribute):
+                setattr(logical_server, attribute, getattr(self, attribute))
+        logical_server._set_load(server_load)  # pylint: disable=protected-access
+        return logical_server
+
+    def _set_load(self, server_load: ServerLoad):
+        self._load = server_load.load
+        self._score = server_load.score
+        self._status = 1 if server_load.enabled else 0
+        self._enabled = self._is_enabled()
+
+        # The key layout is decoded on first access, see __getattr__.
+        keys = self._keys  # pylint: disable=access-member-before-definition
+        missing_keys = tuple(key for key in ("Load", "Score", "Status") if key not in keys)
+        if missing_keys:
+            # pylint: disable=attribute-defined-outside-init
+            self._keys = _intern_key_layout(keys + missing_keys)
 
     @property
     def id(self) -> str:  # pylint: disable=invalid-name
         """Returns the id of the logical server."""
-        return self._data.get("ID")
+        return self._id
 
     # Score, load and status can be modified (needed to update loads)
     @property
@@ -153,7 +358,7 @@ class LogicalServer:  # pylint: disable=too-many-public-methods
         """Returns the load of the servers.
             This is generally only used for UI purposes.
         """
-        return self._data.get("Load")
+        return self._load
 
     @property
     def score(self) -> float:
@@ -162,7 +367,7 @@ class LogicalServer:  # pylint: disable=too-many-public-methods
             is used for the logic of the "Quick Connect".
             The lower the number is the better is for establishing a connection.
         """
-        return self._data.get("Score")
+        return self._score
 
     @property
     def enabled(self) -> bool:
@@ -171,20 +376,18 @@ class LogicalServer:  # pylint: disable=too-many-public-methods
             are not enabled, but just to be sure we also evaluate all
             physical servers.
         """
-        return self._data.get("Status") == 1 and any(
-            x.enabled for x in self.physical_servers
-        )
+        return self._enabled
 
     # Every other propriety is readonly
     @property
     def name(self) -> str:
         """Name of the logical, ie: CH#10"""
-        return self._data.get("Name")
+        return self._name
 
     @property
     def entry_country(self) -> str:
         """2 letter country code entry, ie: CH"""
-        return self._data.get("EntryCountry")
+        return self._entry_country
 
     @property
     def entry_country_name(self) -> str:
@@ -194,7 +397,7 @@ class LogicalServer:  # pylint: disable=too-many-public-methods
     @property
     def exit_country(self) -> str:
         """2 letter country code exit, ie: CH"""
-        return self._data.get("ExitCountry")
+        return self._exit_country
 
     @property
     def exit_country_name(self) -> str:
@@ -207,75 +410,177 @@ class LogicalServer:  # pylint: disable=too-many-public-methods
             If there is a host country then it means that this server location
             is emulated, see Smart Routing definition for further clarification.
         """
-        return self._data.get("HostCountry")
+        return self._host_country
+
+    @property
+    def feature_mask(self) -> int:
+        """Features supported by this logical, as a ServerFeatureEnum bitmask."""
+        return self._feature_mask
+
+    def has_features(self, feature_mask: int) -> bool:
+        """Returns whether the logical supports all the features in the bitmask."""
+        return self._feature_mask & feature_mask == feature_mask
+
+    def lacks_features(self, feature_mask: int) -> bool:
+        """Returns whether the logical supports none of the features in the bitmask."""
+        return self._feature_mask & feature_mask == 0
 
     @property
     def features(self) -> List[ServerFeatureEnum]:
         """ List of features supported by this Logical."""
-        return self.__unpack_bitmap_features(self._data.get("Features", 0))
-
-    def __unpack_bitmap_features(self, server_value):
-        server_features = [
-            feature_enum
-            for feature_enum
-            in ServerFeatureEnum
-            if (server_value & feature_enum) != 0
-        ]
-        return server_features
+        return list(_unpack_bitmap_features(self._feature_mask))
 
     @property
     def region(self) -> str:
         """Returns the region of the server."""
-        return self._data.get("Region")
+        return self._region
 
     @property
     def city(self) -> str:
         """Returns the city of the server."""
-        return self._data.get("City")
+        return self._city
 
     @property
     def tier(self) -> int:
         """Returns the minimum required tier to be able to establish a connection.
             Server-side check is always done, so this is mainly for UI purposes.
         """
-        return TierEnum(int(self._data.get("Tier")))
+        return self._tier
 
     @property
     def latitude(self) -> float:
         """Returns servers latitude."""
-        return self._data.get("Location", {}).get("Lat")
+        return self._latitude
 
     @property
     def longitude(self) -> float:
         """Returns servers longitude."""
-        return self._data.get("Location", {}).get("Long")
+        return self._longitude
+
+    @property
+    def sort_key(self) -> Tuple[str, str, int, str]:
+        """
+        Key used to sort servers alphabetically, first by exit country name
+        and then by server name, in natural sort order.
+
+        For a server name in the form of PREFIX#NUMBER-SUFFIX, the key is
+        (exit country name, prefix, number, suffix), where the server name
+        parts are in lowercase.
+        """
+        return self._sort_key
 
     @property
     def data(self) -> dict:
         """Returns a copy of the data pertaining this server."""
-        return self._data.copy()
+        return self.to_dict()
 
     @property
-    def physical_servers(self) -> List[PhysicalServer]:
+    def physical_servers(self) -> Sequence[PhysicalServer]:
         """ Get all the physicals of supporting a logical
         """
-        return [PhysicalServer(x) for x in self._data.get("Servers", [])]
+        return self._physical_servers
 
-    def get_random_physical_server(self) -> PhysicalServer:
+    @property
+    def enabled_physical_servers(self) -> Sequence[PhysicalServer]:
+        """ Get the `enabled` physicals supporting a logical
+        """
+        return self._enabled_physical_servers
+
+    def get_random_physical_server(self, rng: Optional[random.Random] = None) -> PhysicalServer:
         """ Get a random `enabled` physical linked to this logical
+
+        :param rng: optional random number generator, to get reproducible
+            selections. See also :mod:`proton.vpn.session.servers.selection`.
         """
-        enabled_servers = [x for x in self.physical_servers if x.enabled]
-        if len(enabled_servers) == 0:
+        if len(self._enabled_physical_servers) == 0:
             raise ServerNotFoundError("No physical servers could be found")
 
-        return random.choice(enabled_servers)
+        return (rng or random).choice(self._enabled_physical_servers)
 
     def to_dict(self) -> Dict:
         """Converts this object to a dictionary for serialization purposes."""
-        return self._data
+        data = {}
+        for key in self._keys:
+            if key == "Servers":
+                data[key] = [physical.to_dict() for physical in self._physical_servers]
+            elif key in _LOGICAL_SERVER_ATTRIBUTES:
+                data[key] = getattr(self, _LOGICAL_SERVER_ATTRIBUTES[key])
+            else:
+                data[key] = self._extra_data[key]
+        return data
 
     def __repr__(self):
-        return f'LogicalServer<{self._data.get("Name", "??")}>'
+        return f'LogicalServer<{self._name if "Name" in self._keys else "??"}>'
+
+
+# Slot descriptors of the logical server attributes, used to check whether
+# an attribute was already set without triggering its decoding.
+_LOGICAL_SERVER_SLOTS = {
+    attribute: getattr(LogicalServer, attribute) for attribute in LogicalServer.__slots__
+}
+
+
+def _is_decoded(logical_server: LogicalServer, attribute: str) -> bool:
+    try:
+        # Unlike getattr, the slot descriptor does not fall back to __getattr__.
+        _LOGICAL_SERVER_SLOTS[attribute].__get__(  # pylint: disable=unnecessary-dunder-call
+            logical_server, LogicalServer
+        )
+    except AttributeError:
+        return False
+    return True
+
+
+def _has_enabled_physical_servers(data: Dict) -> bool:
+    # Avoids building the physical servers just to check their status.
+    return any(physical_data.get("Status") == 1 for physical_data in data.get("Servers", []))
+
+
+# Cache of the TierEnum instances, which are expensive to build.
+_TIERS: Dict[int, TierEnum] = {}
+
+
+def _decode_tier(raw_tier) -> Optional[TierEnum]:
+    if raw_tier is None:
+        return None
+
+    tier = _TIERS.get(raw_tier)
+    if tier is None:
+        tier = _TIERS[raw_tier] = TierEnum(int(raw_tier))
+    return tier
+
+
+def _decode_location(logical_server: LogicalServer) -> Dict:
+    return logical_server._location or {}  # pylint: disable=protected-access
+
+
+# Decoders of the logical server attributes, called on their first access
+# (see LogicalServer.__getattr__) and by LogicalServer.decode.
+# pylint: disable=protected-access
+_LOGICAL_SERVER_DECODERS: Dict[str, Callable[[LogicalServer], object]] = {
+    **{
+        attribute: lambda logical_server, key=key: logical_server._data.get(key)
+        for key, attribute in _LOGICAL_SERVER_ATTRIBUTES.items()
+        if key != "Servers"
+    },
+    "_latitude": lambda logical_server: _decode_location(logical_server).get("Lat"),
+    "_longitude": lambda logical_server: _decode_location(logical_server).get("Long"),
+    "_physical_servers": lambda logical_server: tuple(
+        PhysicalServer(physical_data)
+        for physical_data in logical_server._data.get("Servers", [])
+    ),
+    # Server loads updates only change the status of the logical server,
+    # so the enabled physical servers only need to be computed once.
+    "_enabled_physical_servers": lambda logical_server: tuple(
+        physical for physical in logical_server._physical_servers if physical.enabled
+    ),
+    "_keys": lambda logical_server: _intern_key_layout(tuple(logical_server._data)),
+    "_extra_data": lambda logical_server: _get_extra_data(
+        logical_server._data, _LOGICAL_SERVER_ATTRIBUTES
+    ),
+    "_sort_key": lambda logical_server: logical_server._build_sort_key(),
+}
+# pylint: enable=protected-access
 
 
 class ServerLoad:
@@ -17,8 +17,9 @@ You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
 import asyncio
+import time
 from os.path import basename
-from typing import Optional
+from typing import Awaitable, Callable, Dict, Optional
 
 from proton.session import Session, FormData, FormField
 
@@ -27,13 +28,14 @@ from proton.vpn.session.account import VPNAccount
 from proton.vpn.session.fetcher import VPNSessionFetcher
 from proton.vpn.session.client_config import ClientConfig
 from proton.vpn.session.credentials import VPNSecrets
-from proton.vpn.session.dataclasses import LoginResult, BugReportForm
+from proton.vpn.session.dataclasses import LoginResult, BugReportForm, VPNCertificate
+from proton.vpn.session.scheduler import RefreshScheduler
 from proton.vpn.session.servers.logicals import ServerList
 
 logger = logging.getLogger(__name__)
 
 
-class VPNSession(Session):
+class VPNSession(Session):  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """
     Augmented Session that provides helpers to a persistent offline keyring
     access to user account information available from the PROTON VPN REST API.
@@ -58,19 +60,41 @@ class VPNSession(Session):
     """
 
     BUG_REPORT_ENDPOINT = "/core/v4/reports/bug"
+    MAX_STALENESS = 60 * 60  # 1 hour
+    REVALIDATION_RETRY_DELAY = 60  # seconds
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
             self, *args,
             fetcher: Optional[VPNSessionFetcher] = None,
             vpn_account: Optional[VPNAccount] = None,
             server_list: Optional[ServerList] = None,
             client_config: Optional[ClientConfig] = None,
+            refresh_scheduler: Optional[RefreshScheduler] = None,
+            stale_while_revalidate: bool = False,
+            max_staleness: float = MAX_STALENESS,
+            revalidation_retry_delay: float = REVALIDATION_RETRY_DELAY,
             **kwargs
     ):
+        """
+        :param stale_while_revalidate: when enabled, the `server_list` and
+            `client_config` accessors return expired data straight away and
+            refresh it in the background. See :meth:`get_server_list`.
+        :param max_staleness: seconds after its expiration time during which
+            data is still returned by :meth:`get_server_list` and
+            :meth:`get_client_config` without waiting for it to be refreshed.
+        :param revalidation_retry_delay: seconds to wait after a failed
+            background refresh before starting a new one.
+        """
         self._fetcher = fetcher or VPNSessionFetcher(session=self)
         self._vpn_account = vpn_account
         self._server_list = server_list
         self._client_config = client_config
+        self._refresh_scheduler = refresh_scheduler or RefreshScheduler.for_session(self)
+        self._stale_while_revalidate = stale_while_revalidate
+        self._max_staleness = max_staleness
+        self._revalidation_retry_delay = revalidation_retry_delay
+        self._revalidation_tasks: Dict[str, asyncio.Task] = {}
+        self._revalidation_failure_times: Dict[str, float] = {}
         super().__init__(*args, **kwargs)
 
     @property
@@ -138,6 +162,8 @@ class VPNSession(Session):
         """
         Log out and reset session data.
         """
+        await self.stop_refresh_scheduler()
+        await self._cancel_revalidations()
         result = await super().async_logout(no_condition_check, additional_headers)
         self._vpn_account = None
         self._server_list = None
@@ -219,6 +245,25 @@ class VPNSession(Session):
             # serialization of the session to the keyring.
             self._requests_unlock()
 
+    def start_refresh_scheduler(self):
+        """
+        Starts refreshing the server list, the server loads, the client
+        configuration and the VPN certificate in the background, shortly
+        before they expire. It has to be called from a running event loop.
+        """
+        self._refresh_scheduler.start()
+
+    async def stop_refresh_scheduler(self):
+        """Stops refreshing the session data in the background."""
+        await self._refresh_scheduler.stop()
+
+    async def flush_cache(self):
+        """
+        Waits for the session data being persisted to the cache in the
+        background. It should be called before shutting down.
+        """
+        await self._fetcher.flush_cache()
+
     @property
     def vpn_account(self) -> VPNAccount:
         """
@@ -227,6 +272,29 @@ class VPNSession(Session):
         """
         return self._vpn_account
 
+    async def fetch_certificate(self) -> VPNCertificate:
+        """
+        Fetches a new certificate for the current VPN account keys,
+        e.g. before the current certificate expires.
+        """
+        secrets = VPNSecrets(
+            ed25519_privatekey=self._vpn_account.vpn_credentials
+            .pubkey_credentials.ed_255519_private_key
+        )
+
+        # See fetch_session_data for why the requests lock is handled manually.
+        self._requests_lock(no_condition_check=True)
+        try:
+            certificate = await self._fetcher.fetch_certificate(
+                client_public_key=secrets.ed25519_pk_pem
+            )
+            self._vpn_account = self._vpn_account.with_certificate(certificate)
+        finally:
+            # Persists the new certificate to the keyring.
+            self._requests_unlock()
+
+        return certificate
+
     async def fetch_server_list(self) -> ServerList:
         """
         Fetches the server list from the REST API.
@@ -236,17 +304,70 @@ class VPNSession(Session):
 
     @property
     def server_list(self) -> ServerList:
-        """The current server list."""
+        """
+        The current server list.
+
+        In stale-while-revalidate mode, an expired server list (or one with
+        expired server loads) is still returned straight away, and a single
+        background refresh is started to replace it.
+        """
+        if self._stale_while_revalidate:
+            self._revalidate_server_list()
+        return self._server_list
+
+    async def get_server_list(self) -> ServerList:
+        """
+        :returns: the current server list. In stale-while-revalidate mode,
+            it only waits for the server list to be refreshed if it expired
+            more than `max_staleness` seconds ago. Otherwise, it behaves
+            like the `server_list` property.
+        """
+        refresh = self._revalidate_server_list() if self._stale_while_revalidate else None
+        if refresh:
+            await asyncio.shield(refresh)
         return self._server_list
 
+    def _revalidate_server_list(self) -> Optional[asyncio.Task]:
+        server_list = self._server_list
+        if not server_list:
+            return None
+
+        if server_list.expired:
+            # Fetching the server list also refreshes the server loads.
+            return self._revalidate(
+                "server list", server_list.expiration_time, self.fetch_server_list
+            )
+        if server_list.loads_expired:
+            return self._revalidate(
+                "server loads", server_list.loads_expiration_time, self.update_server_loads
+            )
+        return None
+
     async def update_server_loads(self) -> ServerList:
         """
         Fetches the server loads from the REST API and updates the current
         server list with them.
+
+        :returns: the updated server list. The servers whose load, score or
+            status changed are available through its `changes` attribute.
         """
         self._server_list = await self._fetcher.update_server_loads()
         return self._server_list
 
+    def subscribe_to_server_loads_updates(self, callback: Callable[[ServerList], None]):
+        """
+        Subscribes to server loads updates.
+
+        :param callback: function called with the updated server list every
+            time the server loads are updated. The servers whose load, score
+            or status changed are available through its `changes` attribute.
+        """
+        self._fetcher.subscribe_to_server_loads_updates(callback)
+
+    def unsubscribe_from_server_loads_updates(self, callback: Callable[[ServerList], None]):
+        """Unsubscribes a callback previously subscribed to server loads updates."""
+        self._fetcher.unsubscribe_from_server_loads_updates(callback)
+
     async def fetch_client_config(self) -> ClientConfig:
         """Fetches the client configuration from the REST api."""
         self._client_config = await self._fetcher.fetch_client_config()
@@ -254,9 +375,92 @@ class VPNSession(Session):
 
     @property
     def client_config(self) -> ClientConfig:
-        """The current client configuration."""
+        """
+        The current client configuration.
+
+        In stale-while-revalidate mode, an expired client configuration is
+        still returned straight away, and a single background refresh is
+        started to replace it.
+        """
+        if self._stale_while_revalidate:
+            self._revalidate_client_config()
         return self._client_config
 
+    async def get_client_config(self) -> ClientConfig:
+        """
+        :returns: the current client configuration. See
+            :meth:`get_server_list` for the stale-while-revalidate behaviour.
+        """
+        refresh = self._revalidate_client_config() if self._stale_while_revalidate else None
+        if refresh:
+            await asyncio.shield(refresh)
+        return self._client_config
+
+    def _revalidate_client_config(self) -> Optional[asyncio.Task]:
+        client_config = self._client_config
+        if not client_config or not client_config.is_expired:
+            return None
+
+        return self._revalidate(
+            "client config", client_config.expiration_time, self.fetch_client_config
+        )
+
+    def _revalidate(
+            self, name: str, expiration_time: float, refresh: Callable[[], Awaitable]
+    ) -> Optional[asyncio.Task]:
+        """
+        Starts refreshing expired data in the background, unless it is
+        already being refreshed or the last refresh failed less than
+        `revalidation_retry_delay` seconds ago. Nothing is done when there
+        is no running event loop.
+
+        :returns: the refresh task only if the data expired more than
+            `max_staleness` seconds ago, so that the caller waits for it.
+        """
+        task = self._revalidation_tasks.get(name)
+        if task is None:
+            failure_time = self._revalidation_failure_times.get(name)
+            if (
+                failure_time is not None
+                and time.monotonic() - failure_time < self._revalidation_retry_delay
+            ):
+                return None
+
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return None
+
+            logger.info(f"Refreshing stale {name} in the background.")
+            task = loop.create_task(refresh())
+            self._revalidation_tasks[name] = task
+            task.add_done_callback(
+                lambda done_task: self._on_revalidation_done(name, done_task)
+            )
+
+        if time.time() - expiration_time > self._max_staleness:
+            return task
+        return None
+
+    def _on_revalidation_done(self, name: str, task: asyncio.Task):
+        if self._revalidation_tasks.get(name) is task:
+            del self._revalidation_tasks[name]
+        if task.cancelled():
+            return
+
+        if task.exception():
+            # Otherwise, the next access to the stale data would retry straight away.
+            self._revalidation_failure_times[name] = time.monotonic()
+            logger.error(f"Error refreshing stale {name}.", exc_info=task.exception())
+        else:
+            self._revalidation_failure_times.pop(name, None)
+
+    async def _cancel_revalidations(self):
+        tasks, self._revalidation_tasks = list(self._revalidation_tasks.values()), {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
     async def submit_bug_report(self, bug_report: BugReportForm):
         """Submits a bug report to customer support."""
         data = FormData()
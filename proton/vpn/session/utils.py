@@ -16,15 +16,86 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
 from proton.vpn import logging
+from proton.vpn.session.metrics import get_metrics_collector
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")  # pylint: disable=invalid-name
+
 
 async def rest_api_request(session, route, **api_request_kwargs):  # noqa: E501 pylint: disable=missing-function-docstring
     logger.info(f"'{route}'", category="api", event="request")
-    response = await session.async_api_request(
-        route, **api_request_kwargs
+    start_time = time.monotonic()
+    try:
+        response = await session.async_api_request(
+            route, **api_request_kwargs
+        )
+    except Exception as error:
+        _record_request_metrics(route, time.monotonic() - start_time, error=error)
+        raise
+
+    _record_request_metrics(
+        route, time.monotonic() - start_time, received_bytes=_get_received_bytes(response)
     )
     logger.info(f"'{route}'", category="api", event="response")
     return response
+
+
+def _record_request_metrics(route: str, duration: float, **kwargs):
+    try:
+        get_metrics_collector().record_request(route.split("?")[0], duration, **kwargs)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Error recording REST API request metrics.")
+
+
+def _get_received_bytes(response) -> Optional[int]:
+    # Only raw responses (requested with return_raw=True) expose the size of
+    # the response body. Serializing parsed responses again is too costly.
+    find_first_header = getattr(response, "find_first_header", None)
+    if find_first_header is None:
+        return None
+
+    try:
+        return int(find_first_header("Content-Length"))
+    except (TypeError, ValueError):
+        return None
+
+
+class SingleFlight:  # pylint: disable=too-few-public-methods
+    """
+    Coalesces concurrent calls sharing the same key (e.g. a REST API route)
+    into a single call: while a call is in flight, other callers with the
+    same key wait for it and get the same result (or exception).
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        :param enabled: whether calls are coalesced or not. When disabled,
+            every call is run independently.
+        """
+        self.enabled = enabled
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, coroutine_function: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs the coroutine function, unless a call with the same key is
+        already in flight, in which case its result is awaited instead.
+
+        :returns: the result of the call.
+        """
+        if not self.enabled:
+            return await coroutine_function()
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(coroutine_function())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shielded so that a cancelled caller does not cancel the call for the others.
+        return await asyncio.shield(future)
@@ -11,7 +11,10 @@ setup(
     url="https://github.com/ProtonMail/python-protonvpn-session",
     install_requires=["proton-core", "proton-vpn-logger", "cryptography", "PyNaCl", "distro"],
     extras_require={
-        "development": ["pytest", "pytest-coverage", "pytest-asyncio", "flake8", "pylint"]
+        "columnar": ["numpy"],
+        "development": [
+            "pytest", "pytest-coverage", "pytest-asyncio", "flake8", "pylint", "numpy"
+        ]
     },
     packages=find_namespace_packages(include=['proton.*']),
     include_package_data=True,
@@ -0,0 +1,52 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import copy
+from typing import Dict
+from unittest.mock import Mock
+
+import pytest
+
+
+class CountingSession:
+    """
+    Fake session counting the REST API requests, which are answered with
+    a copy of the JSON data given for each route.
+    """
+    def __init__(self, responses: Dict[str, dict]):
+        self.responses = responses
+        self.requests = []
+        self.vpn_account = Mock()
+        self.vpn_account.location.IP = "1.2.3.4"
+        self.vpn_account.max_tier = 2
+
+    async def async_api_request(self, route, return_raw=False, **kwargs):  # noqa: E501 pylint: disable=unused-argument
+        self.requests.append(route)
+        await asyncio.sleep(0)
+        # Fetchers modify the responses, so each request gets its own copy.
+        json_data = copy.deepcopy(self.responses[route])
+        if return_raw:
+            return Mock(status_code=200, json=json_data, find_first_header=Mock(return_value=None))
+        return json_data
+
+
+@pytest.fixture
+def counting_session():
+    """:returns: the factory of :class:`CountingSession` instances."""
+    return CountingSession
@@ -0,0 +1,127 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from proton.vpn.session.exceptions import ServerNotFoundError
+
+from proton.vpn.session.servers import LogicalServer, ServerFeatureEnum
+from proton.vpn.session.servers.logicals import ServerList
+from proton.vpn.session.servers.types import ServerLoad
+
+pytest.importorskip("numpy")
+
+
+def create_logicals():
+    return [
+        LogicalServer({
+            "ID": "1", "Name": "JP#10", "Status": 1, "Servers": [{"Status": 1}],
+            "Score": 15.0, "Tier": 2, "ExitCountry": "JP",
+        }),
+        LogicalServer({
+            "ID": "2", "Name": "AR#11", "Status": 1, "Servers": [{"Status": 1}],
+            "Score": 1.0, "Tier": 3, "ExitCountry": "AR",
+        }),
+        LogicalServer({
+            "ID": "3", "Name": "AR#9", "Status": 1, "Servers": [{"Status": 1}],
+            "Score": 10.0, "Tier": 2, "ExitCountry": "AR",
+        }),
+        LogicalServer({
+            "ID": "4", "Name": "CH#18-TOR", "Status": 1, "Servers": [{"Status": 1}],
+            "Score": 7.0, "Features": ServerFeatureEnum.TOR, "Tier": 2, "ExitCountry": "CH",
+        }),
+        LogicalServer({
+            "ID": "5", "Name": "JP#1", "Status": 0, "Servers": [{"Status": 0}],
+            "Score": 9.0, "Tier": 2, "ExitCountry": "JP",
+        }),
+    ]
+
+
+def test_columnar_server_list_get_fastest_matches_object_based_lookup():
+    columnar_list = ServerList(user_tier=2, logicals=create_logicals(), columnar=True)
+    object_list = ServerList(user_tier=2, logicals=create_logicals())
+
+    assert columnar_list.columnar
+    assert columnar_list.get_fastest().name == object_list.get_fastest().name == "AR#9"
+    assert columnar_list.get_fastest_in_country("jp").name == "JP#10"
+
+
+def test_columnar_server_list_reflects_server_load_updates():
+    server_list = ServerList(user_tier=2, logicals=create_logicals(), columnar=True)
+
+    server_list.update([
+        ServerLoad({"ID": "5", "Load": 10, "Score": 2.0, "Status": 1}),
+    ])
+
+    # JP#1 status is still 0 at the physical server level, so it's not eligible.
+    assert server_list.get_fastest().name == "AR#9"
+
+    server_list.update([
+        ServerLoad({"ID": "1", "Load": 10, "Score": 2.0, "Status": 1}),
+        ServerLoad({"ID": "3", "Load": 90, "Score": 20.0, "Status": 0}),
+    ])
+
+    assert server_list.get_fastest().name == "JP#10"
+    with pytest.raises(ServerNotFoundError):
+        server_list.get_fastest_in_country("AR")
+
+
+def test_columnar_server_list_with_loads_does_not_modify_current_version():
+    server_list = ServerList(user_tier=2, logicals=create_logicals(), columnar=True)
+
+    new_server_list = server_list.with_loads([
+        ServerLoad({"ID": "1", "Load": 10, "Score": 2.0, "Status": 1}),
+    ])
+
+    assert server_list.get_fastest_in_country("JP").score == 15.0
+    assert new_server_list.get_fastest_in_country("JP").score == 2.0
+
+
+def test_columnar_server_list_finds_the_fastest_servers_with_the_columns():
+    server_list = ServerList(user_tier=2, logicals=create_logicals(), columnar=True)
+
+    columns = server_list._columns  # pylint: disable=protected-access
+    with patch.object(columns, "get_fastest", wraps=columns.get_fastest) as get_fastest:
+        assert server_list.get_fastest().name == "AR#9"
+        assert server_list.get_fastest_in_country("JP").name == "JP#10"
+
+    assert get_fastest.call_count == 2
+
+
+def test_columnar_server_list_get_fastest_when_the_scores_of_all_eligible_servers_are_missing():
+    def create_logicals_without_scores():
+        return [
+            LogicalServer({
+                "ID": "1", "Name": "A#1", "Status": 0, "Servers": [{"Status": 0}],
+                "Score": None, "Tier": 2, "ExitCountry": "AR",
+            }),
+            LogicalServer({
+                "ID": "2", "Name": "A#2", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": None, "Tier": 2, "ExitCountry": "AR",
+            }),
+        ]
+
+    columnar_list = ServerList(
+        user_tier=2, logicals=create_logicals_without_scores(), columnar=True
+    )
+    object_list = ServerList(user_tier=2, logicals=create_logicals_without_scores())
+
+    assert columnar_list.get_fastest().name == object_list.get_fastest().name == "A#2"
+    assert columnar_list.get_fastest_in_country("AR").name == "A#2"
@@ -16,9 +16,21 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock
+
 import pytest
 
-from proton.vpn.session.servers.fetcher import truncate_ip_address
+from proton.vpn.session.cache import CacheFile, IndexedCodec, JSONCodec
+from proton.vpn.session.exceptions import ServerNotFoundError
+from proton.vpn.session.servers.fetcher import ServerListFetcher, truncate_ip_address
+from proton.vpn.session.servers.logicals import ServerList
+from proton.vpn.session.servers.types import LogicalServer
 
 
 def test_truncate_ip_replaces_last_ip_address_byte_with_a_zero():
@@ -28,3 +40,241 @@ def test_truncate_ip_replaces_last_ip_address_byte_with_a_zero():
 def test_truncate_ip_raises_exception_when_ip_address_is_invalid():
     with pytest.raises(ValueError):
         truncate_ip_address("foobar")
+
+
+@pytest.mark.asyncio
+async def test_update_loads_publishes_new_server_list_version_and_notifies_subscribers():
+    session = Mock()
+    session.vpn_account.location.IP = "1.2.3.4"
+    session.async_api_request = AsyncMock(return_value={
+        "LogicalServers": [{"ID": "1", "Load": 50, "Score": 2.0, "Status": 1}]
+    })
+    server_list = ServerList(user_tier=2, logicals=[LogicalServer({
+        "ID": "1", "Name": "CH#1", "Load": 10, "Score": 1.0, "Status": 1,
+        "Servers": [{"Status": 1}], "Tier": 2, "ExitCountry": "CH",
+    })])
+    fetcher = ServerListFetcher(session, server_list=server_list, cache_file=Mock())
+    callback = Mock()
+    fetcher.subscribe_to_loads_updates(callback)
+
+    new_server_list = await fetcher.update_loads()
+
+    assert new_server_list is not server_list
+    assert server_list.get_by_id("1").load == 10
+    assert new_server_list.get_by_id("1").load == 50
+    assert new_server_list.changes.ids == ("1",)
+    callback.assert_called_once_with(new_server_list)
+
+
+def test_load_from_cache_builds_lazy_server_list_when_requested():
+    cache_file = Mock()
+    cache_file.load.return_value = {
+        "LogicalServers": [{
+            "ID": "1", "Name": "CH#1", "Load": 10, "Score": 1.0, "Status": 1,
+            "Servers": [{"Status": 1}], "Tier": 2, "ExitCountry": "CH",
+        }],
+        "MaxTier": 2,
+    }
+    fetcher = ServerListFetcher(Mock(), cache_file=cache_file, lazy=True)
+
+    server_list = fetcher.load_from_cache()
+
+    assert server_list.lazy
+    assert server_list.logicals.materialized_count == 0
+    assert server_list.get_by_name("CH#1").id == "1"
+
+
+SERVER_LIST_RESPONSE = {
+    "Code": 1000,
+    "LogicalServers": [{
+        "ID": "1", "Name": "CH#1", "Load": 10, "Score": 1.0, "Status": 1,
+        "Servers": [{"Status": 1}], "Tier": 2, "ExitCountry": "CH",
+    }],
+}
+
+
+class StandInAPIHandler(BaseHTTPRequestHandler):
+    """Serves the server list with validators, honoring conditional requests."""
+    ETAG = '"v1"'
+    LAST_MODIFIED = "Tue, 03 Oct 2023 10:00:00 GMT"
+    requests = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = json.dumps(SERVER_LIST_RESPONSE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", self.ETAG)
+        self.send_header("Last-Modified", self.LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class StandInRawResponse:
+    """Mimics the raw response returned by the session when passing return_raw=True."""
+    def __init__(self, status_code, headers, json_data):
+        self.status_code = status_code
+        self.headers = tuple(headers)
+        self.json = json_data
+
+    def find_first_header(self, name, default=None):
+        return next(
+            (value for key, value in self.headers if key.lower() == name.lower()), default
+        )
+
+
+class StandInSession:
+    """Session sending the API requests to the stand-in HTTP server."""
+    def __init__(self, base_url):
+        self._base_url = base_url
+        self.vpn_account = Mock()
+        self.vpn_account.location.IP = "1.2.3.4"
+        self.vpn_account.max_tier = 2
+
+    async def async_api_request(self, route, additional_headers=None, return_raw=False):
+        request = urllib.request.Request(self._base_url + route, headers=additional_headers or {})
+
+        def send_request():
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return response.status, response.headers.items(), response.read()
+            except urllib.error.HTTPError as error:
+                return error.code, error.headers.items(), b""
+
+        status, headers, body = await asyncio.get_running_loop().run_in_executor(
+            None, send_request
+        )
+        json_data = json.loads(body) if body else None
+        return StandInRawResponse(status, headers, json_data) if return_raw else json_data
+
+
+@pytest.fixture
+def stand_in_api():
+    StandInAPIHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInAPIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_sends_validators_and_extends_expiration_when_server_list_not_modified(
+        stand_in_api
+):
+    cache_file = Mock()
+    fetcher = ServerListFetcher(StandInSession(stand_in_api), cache_file=cache_file)
+
+    server_list = await fetcher.fetch()
+
+    assert server_list.etag == StandInAPIHandler.ETAG
+    assert server_list.last_modified == StandInAPIHandler.LAST_MODIFIED
+    assert cache_file.save_in_background.call_args.args[0]["ETag"] == StandInAPIHandler.ETAG
+    assert "If-None-Match" not in StandInAPIHandler.requests[0]
+
+    server_list._expiration_time = 0  # pylint: disable=protected-access
+    not_modified_server_list = await fetcher.fetch()
+
+    assert StandInAPIHandler.requests[1]["If-None-Match"] == StandInAPIHandler.ETAG
+    assert StandInAPIHandler.requests[1]["If-Modified-Since"] == StandInAPIHandler.LAST_MODIFIED
+    assert not not_modified_server_list.expired
+    assert not_modified_server_list.logicals is server_list.logicals
+    assert cache_file.save_in_background.call_args.args[0]()["ExpirationTime"] == \
+        not_modified_server_list.expiration_time
+
+
+LOADS_RESPONSE = {
+    "Code": 1000,
+    "LogicalServers": [{"ID": "1", "Load": 50, "Score": 2.0, "Status": 1}],
+}
+
+
+def create_counting_session(counting_session):
+    return counting_session({
+        ServerListFetcher.ROUTE_LOGICALS: SERVER_LIST_RESPONSE,
+        ServerListFetcher.ROUTE_LOADS: LOADS_RESPONSE,
+    })
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("single_flight, expected_requests", [(True, 1), (False, 3)])
+async def test_concurrent_fetches_share_the_same_request_with_single_flight(
+        counting_session, single_flight, expected_requests
+):
+    session = create_counting_session(counting_session)
+    fetcher = ServerListFetcher(session, cache_file=Mock(), single_flight=single_flight)
+
+    server_lists = await asyncio.gather(fetcher.fetch(), fetcher.fetch(), fetcher.fetch())
+    assert len(session.requests) == expected_requests
+    assert len(set(map(id, server_lists))) == expected_requests
+
+    session.requests.clear()
+    server_lists = await asyncio.gather(
+        fetcher.update_loads(), fetcher.update_loads(), fetcher.update_loads()
+    )
+    assert session.requests == [ServerListFetcher.ROUTE_LOADS] * expected_requests
+    assert all(server_list.get_by_id("1").load == 50 for server_list in server_lists)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exceptions_and_allows_new_requests_afterwards(
+        counting_session
+):
+    session = create_counting_session(counting_session)
+    session.async_api_request = AsyncMock(side_effect=Exception("Network error"))
+    fetcher = ServerListFetcher(session, cache_file=Mock())
+
+    results = await asyncio.gather(fetcher.fetch(), fetcher.fetch(), return_exceptions=True)
+    assert all(isinstance(result, Exception) for result in results)
+    assert session.async_api_request.await_count == 1
+
+    with pytest.raises(Exception):
+        await fetcher.fetch()
+    assert session.async_api_request.await_count == 2
+
+
+def test_load_from_cache_parses_the_cache_incrementally_when_streaming(tmp_path):
+    cache_file = CacheFile(tmp_path / "serverlist.json")
+    cache_file.save({**SERVER_LIST_RESPONSE, "MaxTier": 2})
+    fetcher = ServerListFetcher(Mock(), cache_file=cache_file, streaming=True)
+
+    server_list = fetcher.load_from_cache()
+
+    assert server_list.get_by_name("CH#1").id == "1"
+
+
+@pytest.mark.parametrize("intern_values", [False, True])
+def test_load_from_cache_only_deduplicates_values_when_requested(tmp_path, intern_values):
+    cache_file = CacheFile(tmp_path / "serverlist.json")
+    cache_file.save({"LogicalServers": [
+        {**SERVER_LIST_RESPONSE["LogicalServers"][0], "ID": str(i), "City": "Zurich"}
+        for i in range(2)
+    ], "MaxTier": 2})
+    fetcher = ServerListFetcher(Mock(), cache_file=cache_file, intern_values=intern_values)
+
+    first, second = fetcher.load_from_cache()
+
+    assert first.city == second.city == "Zurich"
+    assert (first.city is second.city) == intern_values
+
+
+@pytest.mark.parametrize("codec", [JSONCodec(), IndexedCodec()])
+def test_load_server_by_name_and_id_from_cache(tmp_path, codec):
+    cache_file = CacheFile(tmp_path / "serverlist.json", codec=codec)
+    cache_file.save({**SERVER_LIST_RESPONSE, "MaxTier": 2})
+    fetcher = ServerListFetcher(Mock(), cache_file=cache_file)
+
+    assert fetcher.load_server_by_name_from_cache("CH#1").id == "1"
+    assert fetcher.load_server_by_id_from_cache("1").name == "CH#1"
+    with pytest.raises(ServerNotFoundError):
+        fetcher.load_server_by_name_from_cache("CH#2")
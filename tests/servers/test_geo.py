@@ -0,0 +1,59 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import random
+
+import pytest
+
+from proton.vpn.session.servers.geo import GeoIndex, haversine_distance
+
+
+def test_geo_index_nearest_matches_brute_force_search():
+    rng = random.Random(42)
+    coordinates = [
+        (position, rng.uniform(-90, 90), rng.uniform(-180, 180))
+        for position in range(500)
+    ]
+    index = GeoIndex(coordinates)
+    latitude, longitude = 46.2, 6.1
+
+    expected = sorted(
+        (haversine_distance(latitude, longitude, lat, long), position)
+        for position, lat, long in coordinates
+    )[:5]
+    nearest = index.nearest(latitude, longitude, count=5)
+
+    assert [position for _, position in nearest] == [position for _, position in expected]
+    assert [distance for distance, _ in nearest] == pytest.approx(
+        [distance for distance, _ in expected]
+    )
+
+
+def test_geo_index_within_radius_and_filters():
+    index = GeoIndex([
+        (0, 47.37, 8.54),     # Zurich
+        (1, 46.20, 6.14),     # Geneva
+        (2, 59.33, 18.06),    # Stockholm
+        (3, None, None),      # Servers without location are not indexed.
+    ])
+
+    assert len(index) == 3
+    assert [position for _, position in index.within_radius(47.0, 7.5, 300)] == [0, 1]
+    assert [
+        position for _, position in index.nearest(47.0, 7.5, 2, accept=lambda pos: pos != 0)
+    ] == [1, 2]
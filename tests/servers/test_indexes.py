@@ -0,0 +1,51 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from proton.vpn.session.servers.indexes import ScoreIndex, BitmapIndex, count_bits, iter_bits
+
+
+def test_score_index_keeps_ids_sorted_by_score_and_id():
+    index = ScoreIndex([("c", 3.0), ("a", 1.0), ("b", 1.0), ("d", None)])
+
+    assert list(index) == ["a", "b", "c", "d"]
+    assert index.first() == "a"
+    assert index.first_n(2) == ["a", "b"]
+
+
+def test_score_index_update_moves_entry_to_its_new_position():
+    index = ScoreIndex([("a", 1.0), ("b", 2.0), ("c", 3.0)])
+
+    index.update("a", 4.0)
+    index.remove("b")
+    index.add("d", 0.5)
+
+    assert list(index) == ["d", "c", "a"]
+    assert "b" not in index
+    assert len(index) == 3
+
+
+def test_bitmap_index_flags_positions_per_key():
+    index = BitmapIndex()
+    index.add("ch", 0)
+    index.add("ch", 3)
+    index.add("se", 1)
+    index.remove("ch", 0)
+
+    assert list(iter_bits(index.get("ch"))) == [3]
+    assert count_bits(index.get("ch") | index.get("se")) == 2
+    assert index.get("jp") == 0
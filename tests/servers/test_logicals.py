@@ -16,7 +16,15 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+from unittest.mock import patch
+
+import pytest
+
+from proton.vpn.session.exceptions import ServerNotFoundError
 from proton.vpn.session.servers import LogicalServer, ServerFeatureEnum
+from proton.vpn.session.servers.types import ServerLoad
+from proton.vpn.session.servers.geo import GeoIndex
+from proton.vpn.session.servers.indexes import ServerBitmaps
 from proton.vpn.session.servers.logicals import sort_servers_alphabetically_by_country_and_server_name, ServerList
 
 
@@ -141,3 +149,438 @@ def test_sort_servers_alphabetically_by_country_and_server_name():
     expected_server_name_order = ["AR#9", "AR#10", "JP#9", "JP-FREE#10", "Random Name"]
     actual_server_name_order = [server.name for server in logicals]
     assert actual_server_name_order == expected_server_name_order
+
+
+def create_server_list_with_countries(user_tier=2):
+    return ServerList(
+        user_tier=user_tier,
+        logicals=[
+            LogicalServer({
+                "ID": "1", "Name": "AR#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 5.0, "Tier": 2, "ExitCountry": "AR",
+            }),
+            LogicalServer({
+                "ID": "2", "Name": "AR#2", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 1.0, "Tier": 3, "ExitCountry": "AR",  # Not in the user tier.
+            }),
+            LogicalServer({
+                "ID": "3", "Name": "AR#3", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 3.0, "Tier": 2, "ExitCountry": "AR",
+            }),
+            LogicalServer({
+                "ID": "4", "Name": "CH#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 2.0, "Tier": 2, "ExitCountry": "CH",
+            }),
+        ]
+    )
+
+
+def test_server_list_get_servers_in_country_returns_servers_sorted_by_score():
+    server_list = create_server_list_with_countries()
+
+    assert [server.name for server in server_list.get_servers_in_country("ar")] == [
+        "AR#2", "AR#3", "AR#1"
+    ]
+    assert server_list.get_servers_in_country("JP") == []
+
+
+def test_server_list_get_fastest_in_country_is_kept_up_to_date_after_updating_loads():
+    server_list = create_server_list_with_countries()
+    assert server_list.get_fastest_in_country("AR").name == "AR#3"
+
+    server_list.update([ServerLoad({"ID": "1", "Load": 10, "Score": 0.5, "Status": 1})])
+
+    assert server_list.get_fastest_in_country("AR").name == "AR#1"
+    assert [server.name for server in server_list.get_servers_in_country("AR")] == [
+        "AR#1", "AR#2", "AR#3"
+    ]
+
+
+def test_server_list_get_fastest_in_country_raises_error_when_no_server_is_available():
+    server_list = create_server_list_with_countries()
+
+    with pytest.raises(ServerNotFoundError):
+        server_list.get_fastest_in_country("JP")
+
+
+def test_server_list_get_fastest_in_country_only_builds_servers_until_an_available_one():
+    server_list = ServerList.from_dict(create_server_list_with_countries().to_dict(), lazy=True)
+
+    # AR#2 (not in the user tier) and AR#3 are resolved, AR#1 is not.
+    assert server_list.get_fastest_in_country("AR").name == "AR#3"
+    assert server_list.logicals.materialized_count == 2
+
+
+def test_server_list_treats_servers_without_tier_as_free_servers():
+    server_list = ServerList(user_tier=0, logicals=[LogicalServer({
+        "ID": "1", "Name": "CH#1", "Status": 1, "Servers": [{"Status": 1}],
+        "Score": 1.0, "ExitCountry": "CH",
+    })])
+
+    assert server_list.get_by_name("CH#1").tier is None
+    assert server_list.get_fastest().name == "CH#1"
+
+
+def test_server_list_get_fastest_is_kept_up_to_date_after_updating_loads():
+    server_list = create_server_list_with_countries()
+    assert server_list.get_fastest().name == "CH#1"
+
+    server_list.update([
+        ServerLoad({"ID": "4", "Load": 90, "Score": 9.0, "Status": 1}),
+        ServerLoad({"ID": "3", "Load": 10, "Score": 4.0, "Status": 0}),
+    ])
+
+    # CH#1 is now slower and AR#3 was disabled.
+    assert server_list.get_fastest().name == "AR#1"
+
+
+def test_server_list_get_fastest_n_returns_available_servers_sorted_by_score():
+    server_list = create_server_list_with_countries()
+
+    assert [server.name for server in server_list.get_fastest_n(2)] == ["CH#1", "AR#3"]
+    assert [server.name for server in server_list.get_fastest_n(10)] == [
+        "CH#1", "AR#3", "AR#1"
+    ]
+
+
+def create_server_list_with_features():
+    return ServerList(
+        user_tier=2,
+        logicals=[
+            LogicalServer({
+                "ID": "1", "Name": "CH#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 3.0, "Load": 30, "Tier": 2, "ExitCountry": "CH", "City": "Zurich",
+                "Features": ServerFeatureEnum.P2P | ServerFeatureEnum.STREAMING,
+            }),
+            LogicalServer({
+                "ID": "2", "Name": "CH#2", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 1.0, "Load": 50, "Tier": 2, "ExitCountry": "CH", "City": "Geneva",
+                "Features": ServerFeatureEnum.P2P,
+            }),
+            LogicalServer({
+                "ID": "3", "Name": "CH-FREE#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 2.0, "Load": 10, "Tier": 0, "ExitCountry": "CH", "City": "Zurich",
+                "Features": 0,
+            }),
+            LogicalServer({
+                "ID": "4", "Name": "CH#18-TOR", "Status": 0, "Servers": [{"Status": 0}],
+                "Score": 0.5, "Load": 0, "Tier": 2, "ExitCountry": "CH", "City": "Zurich",
+                "Features": ServerFeatureEnum.TOR | ServerFeatureEnum.P2P,
+            }),
+            LogicalServer({
+                "ID": "5", "Name": "SE#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Score": 0.1, "Load": 5, "Tier": 2, "ExitCountry": "SE", "City": "Stockholm",
+                "Features": ServerFeatureEnum.P2P,
+            }),
+        ]
+    )
+
+
+def test_server_list_query_intersects_all_conditions():
+    server_list = create_server_list_with_features()
+
+    servers = server_list.query(
+        country="ch", features_all=ServerFeatureEnum.P2P,
+        features_none=ServerFeatureEnum.TOR, enabled=True
+    )
+
+    assert [server.name for server in servers] == ["CH#2", "CH#1"]
+    assert [server.name for server in server_list.query(city="zurich", max_tier=0)] == [
+        "CH-FREE#1"
+    ]
+    assert server_list.query(country="CH", city="Stockholm") == []
+
+
+def test_server_list_query_order_and_limit():
+    server_list = create_server_list_with_features()
+
+    assert [server.name for server in server_list.query(order_by="load", limit=2)] == [
+        "CH#18-TOR", "SE#1"
+    ]
+    assert [server.name for server in server_list.query(order_by=None, limit=2)] == [
+        "CH#1", "CH#2"
+    ]
+    with pytest.raises(ValueError):
+        server_list.query(order_by="foobar")
+
+
+def test_server_list_query_reflects_status_updates():
+    server_list = create_server_list_with_features()
+
+    server_list.update([ServerLoad({"ID": "5", "Load": 5, "Score": 0.1, "Status": 0})])
+
+    assert [server.name for server in server_list.query(enabled=False)] == ["SE#1", "CH#18-TOR"]
+
+
+def test_server_list_get_nearest_and_get_within_radius():
+    server_list = ServerList(
+        user_tier=2,
+        logicals=[
+            LogicalServer({
+                "ID": "1", "Name": "CH#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Tier": 2, "ExitCountry": "CH", "Location": {"Lat": 47.37, "Long": 8.54},
+            }),
+            LogicalServer({
+                "ID": "2", "Name": "CH#2", "Status": 0, "Servers": [{"Status": 0}],
+                "Tier": 2, "ExitCountry": "CH", "Location": {"Lat": 46.20, "Long": 6.14},
+            }),
+            LogicalServer({
+                "ID": "3", "Name": "US#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Tier": 2, "ExitCountry": "US", "Location": {"Lat": 40.71, "Long": -74.0},
+            }),
+        ]
+    )
+
+    assert [server.name for server in server_list.get_nearest(46.0, 6.0, count=2)] == [
+        "CH#2", "CH#1"
+    ]
+    assert [server.name for server in server_list.get_nearest(46.0, 6.0, enabled=True)] == [
+        "CH#1"
+    ]
+    assert [server.name for server in server_list.get_within_radius(46.0, 6.0, 500)] == [
+        "CH#2", "CH#1"
+    ]
+
+
+def test_server_list_builds_bitmap_and_geo_indexes_on_first_use_and_shares_them():
+    module = "proton.vpn.session.servers.logicals"
+    with patch(f"{module}.ServerBitmaps", wraps=ServerBitmaps) as bitmaps, \
+            patch(f"{module}.GeoIndex", wraps=GeoIndex) as geo_index:
+        server_list = create_server_list_with_features()
+        assert bitmaps.call_count == geo_index.call_count == 0
+
+        server_list.get_nearest(46.0, 6.0)
+        new_server_list = server_list.with_loads([
+            ServerLoad({"ID": "1", "Load": 10, "Score": 0.01, "Status": 1})
+        ])
+        new_server_list.get_nearest(46.0, 6.0)
+        new_server_list.query(country="CH")
+
+        assert bitmaps.call_count == geo_index.call_count == 1
+
+
+def test_server_list_group_by_country_does_not_reorder_the_server_list_and_is_cached():
+    server_list = create_server_list_with_countries()
+    original_order = [server.name for server in server_list]
+
+    countries = server_list.group_by_country()
+
+    assert [server.name for server in server_list] == original_order
+    assert [country.code for country in countries] == ["ar", "ch"]
+    assert [server.name for server in countries[0].servers] == ["AR#1", "AR#2", "AR#3"]
+    assert server_list.group_by_country() is countries
+
+    server_list.update([ServerLoad({"ID": "1", "Load": 10, "Score": 0.5, "Status": 0})])
+
+    assert server_list.group_by_country() is countries
+    assert not countries[0].servers[0].enabled
+
+
+def test_sort_servers_alphabetically_compares_server_numbers_numerically():
+    logicals = [
+        LogicalServer({"ID": 1, "Name": "CH#100", "ExitCountry": "CH"}),
+        LogicalServer({"ID": 2, "Name": "CH#18-TOR", "ExitCountry": "CH"}),
+        LogicalServer({"ID": 3, "Name": "CH#18", "ExitCountry": "CH"}),
+        LogicalServer({"ID": 4, "Name": "CH", "ExitCountry": "CH"}),
+    ]
+
+    logicals.sort(key=sort_servers_alphabetically_by_country_and_server_name)
+
+    assert [server.name for server in logicals] == ["CH", "CH#18", "CH#18-TOR", "CH#100"]
+
+
+def test_server_list_with_loads_returns_new_version_and_leaves_current_one_untouched():
+    server_list = create_server_list_with_countries()
+    countries = server_list.group_by_country()
+
+    new_server_list = server_list.with_loads([
+        ServerLoad({"ID": "1", "Load": 10, "Score": 0.5, "Status": 1}),
+        ServerLoad({"ID": "4", "Score": 2.0, "Status": 1}),  # No changes.
+        ServerLoad({"ID": "unknown", "Load": 90, "Score": 2.0, "Status": 1}),
+    ])
+
+    # The current version is not modified.
+    assert server_list.get_by_id("1").score == 5.0
+    assert server_list.get_fastest().name == "CH#1"
+    assert server_list.group_by_country() is countries
+
+    # The new version has the new loads applied.
+    assert new_server_list.get_by_id("1").score == 0.5
+    assert new_server_list.get_fastest().name == "AR#1"
+    assert new_server_list.get_fastest_in_country("AR").name == "AR#1"
+    assert new_server_list.get_by_name("AR#1") is new_server_list.get_by_id("1")
+    assert new_server_list.group_by_country()[0].servers[0] is new_server_list.get_by_id("1")
+
+    # Servers not modified by the loads are shared between versions.
+    assert new_server_list.get_by_id("4") is server_list.get_by_id("4")
+    assert new_server_list.group_by_country()[1] is countries[1]
+
+
+def test_server_list_update_returns_the_servers_that_changed():
+    server_list = create_server_list_with_countries()
+
+    changes = server_list.update([
+        ServerLoad({"ID": "1", "Load": None, "Score": 0.5, "Status": 1}),
+        ServerLoad({"ID": "3", "Score": 3.0, "Status": 0}),
+        ServerLoad({"ID": "4", "Score": 2.0, "Status": 1}),  # No changes.
+    ])
+
+    assert changes is server_list.changes
+    assert changes.ids == ("1", "3")
+    change = changes.changes[0]
+    assert (change.old_score, change.new_score) == (5.0, 0.5)
+    assert change.score_changed and not change.load_changed and not change.enabled_changed
+    assert [change.id for change in changes.enabled_changes] == ["3"]
+
+
+def test_server_list_with_loads_reports_changes_in_the_new_version():
+    server_list = create_server_list_with_countries()
+
+    new_server_list = server_list.with_loads([
+        ServerLoad({"ID": "2", "Load": 20, "Score": 1.0, "Status": 1}),
+    ])
+
+    assert len(server_list.changes) == 0
+    assert new_server_list.changes.ids == ("2",)
+    change = new_server_list.changes.changes[0]
+    assert (change.old_load, change.new_load) == (None, 20)
+
+
+def create_lazy_server_list():
+    server_list = create_server_list_with_features()
+    return ServerList.from_dict(server_list.to_dict(), lazy=True)
+
+
+def test_lazy_server_list_only_builds_the_servers_that_are_accessed():
+    server_list = create_lazy_server_list()
+    assert server_list.lazy
+    assert server_list.logicals.materialized_count == 0
+
+    server = server_list.get_by_name("CH#2")
+
+    assert server.id == "2"
+    assert server_list.get_by_id("2") is server
+    assert server_list.logicals.materialized_count == 1
+    with pytest.raises(ServerNotFoundError):
+        server_list.get_by_name("CH#100")
+
+
+def test_lazy_server_list_indexes_return_the_same_servers_as_an_eager_one():
+    server_list = create_server_list_with_features()
+    lazy_server_list = create_lazy_server_list()
+
+    assert lazy_server_list.get_fastest().name == server_list.get_fastest().name
+    assert [
+        server.name for server in lazy_server_list.get_servers_in_country("CH")
+    ] == [server.name for server in server_list.get_servers_in_country("CH")]
+    assert [
+        server.name for server in lazy_server_list.query(features_all=ServerFeatureEnum.P2P)
+    ] == [server.name for server in server_list.query(features_all=ServerFeatureEnum.P2P)]
+    assert [server.name for server in lazy_server_list] == [
+        server.name for server in server_list
+    ]
+    assert lazy_server_list.to_dict()["LogicalServers"] == server_list.to_dict()["LogicalServers"]
+
+
+def test_lazy_server_list_can_be_updated_and_sorted():
+    server_list = create_lazy_server_list()
+
+    new_server_list = server_list.with_loads([
+        ServerLoad({"ID": "3", "Load": 10, "Score": 0.01, "Status": 1})
+    ])
+    server_list.sort()
+
+    assert new_server_list.get_fastest().name == "CH-FREE#1"
+    assert server_list.get_fastest().name == "SE#1"
+    assert [server.name for server in server_list] == [
+        "SE#1", "CH#1", "CH#2", "CH#18-TOR", "CH-FREE#1"
+    ]
+
+
+def test_lazy_server_list_queries_see_servers_updated_in_place():
+    server_list = create_lazy_server_list()
+
+    server_list.update([ServerLoad({"ID": "5", "Load": 5, "Score": 0.1, "Status": 0})])
+
+    assert [server.name for server in server_list.query(enabled=True)] == [
+        server.name for server in create_server_list_with_features().query(enabled=True)
+        if server.name != "SE#1"
+    ]
+
+
+def test_lazy_server_list_with_loads_only_builds_the_updated_servers():
+    server_list = create_lazy_server_list()
+    assert not server_list.query(country="XX")  # Builds the bitmaps.
+
+    new_server_list = server_list.with_loads([
+        ServerLoad({"ID": "1", "Load": 30, "Score": 3.0, "Status": 1}),  # No changes.
+        ServerLoad({"ID": "5", "Load": 90, "Score": 9.0, "Status": 1}),
+    ])
+
+    assert new_server_list.lazy
+    assert new_server_list.changes.ids == ("5",)
+    # Only the updated server was built, in both versions.
+    assert server_list.logicals.materialized_count == 1
+    assert new_server_list.logicals.materialized_count == 1
+    assert new_server_list.get_by_name("SE#1").load == 90
+    assert server_list.get_by_name("SE#1").load == 5
+    assert new_server_list.get_fastest().name == "CH#2"
+    assert [
+        server.name for server in new_server_list.query(
+            features_all=ServerFeatureEnum.P2P, enabled=True, order_by="score"
+        )
+    ] == ["CH#2", "CH#1", "SE#1"]
+
+
+def test_server_list_merge_reuses_unchanged_servers_and_reports_the_delta():
+    server_list = create_server_list_with_features()
+    data = server_list.to_dict()
+    logicals_data = data["LogicalServers"]
+    logicals_data[0]["Load"] = 99  # Load changes are not modifications.
+    logicals_data[1]["City"] = "Bern"
+    del logicals_data[2]
+    logicals_data.append({
+        "ID": "6", "Name": "SE#2", "Status": 1, "Servers": [{"Status": 1}],
+        "Score": 0.05, "Tier": 2, "ExitCountry": "SE",
+    })
+
+    new_server_list = server_list.merge(data)
+
+    assert new_server_list.delta.added == ("6",)
+    assert new_server_list.delta.removed == ("3",)
+    assert new_server_list.delta.modified == ("2",)
+    assert new_server_list.delta.reused_count == 3
+    assert new_server_list.changes.ids == ("1",)
+    assert new_server_list.get_by_id("1").load == 99
+    assert new_server_list.get_by_id("4") is server_list.get_by_id("4")
+    assert new_server_list.get_by_id("2").city == "Bern"
+    assert new_server_list.get_fastest().name == "SE#2"
+    assert server_list.get_by_id("2").city == "Geneva"
+    with pytest.raises(ServerNotFoundError):
+        new_server_list.get_by_id("3")
+
+
+def test_server_list_merge_does_not_report_unchanged_servers_as_modified():
+    def create_data():
+        return {"MaxTier": 2, "LogicalServers": [{
+            "ID": "7", "Name": "CH#7", "Status": 1, "Servers": [{"Status": 1}],
+            "Tier": 2, "Features": None, "ExitCountry": "CH",
+        }]}
+
+    new_server_list = ServerList.from_dict(create_data()).merge(create_data())
+
+    assert new_server_list.delta.empty
+
+
+def test_server_list_merge_reuses_the_indexes_when_only_loads_changed():
+    server_list = create_server_list_with_features()
+    data = server_list.to_dict()
+    data["LogicalServers"][2]["Score"] = 0.01
+
+    new_server_list = server_list.merge(data)
+
+    assert new_server_list.delta.empty
+    assert new_server_list.changes.ids == ("3",)
+    assert new_server_list.get_by_id("1") is server_list.get_by_id("1")
+    assert new_server_list.get_fastest().name == "CH-FREE#1"
+    assert server_list.get_fastest().name == "SE#1"
@@ -0,0 +1,92 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+from unittest.mock import patch
+
+from proton.vpn.session.servers.logicals import ServerList
+from proton.vpn.session.servers.memory import intern_server_list_data
+from proton.vpn.session.servers.types import LogicalServer, PhysicalServer
+
+
+def create_server_list_data(count=10):
+    logicals = [
+        {
+            "ID": str(i), "Name": f"CH#{i}", "ExitCountry": "CH", "City": "Zurich",
+            "Tier": 2, "Features": 0, "Load": 10, "Score": 1.0 + i, "Status": 1,
+            "Location": {"Lat": 47.37, "Long": 8.54},
+            "Servers": [{"ID": f"{i}-1", "Label": "0", "Status": 1, "Generation": 0}],
+        }
+        for i in range(count)
+    ]
+    # Parsing the JSON creates a new copy of every value, as when fetching it.
+    return json.loads(json.dumps({"LogicalServers": logicals, "MaxTier": 2}))
+
+
+def test_intern_server_list_data_shares_repeated_values():
+    data = intern_server_list_data(create_server_list_data())
+
+    first, second = data["LogicalServers"][:2]
+    assert first["City"] is second["City"]
+    assert first["Location"] is second["Location"]
+    assert first["Servers"][0]["Label"] is second["Servers"][0]["Label"]
+    assert first["Name"] == "CH#0" and second["Name"] == "CH#1"
+
+
+def test_intern_server_list_data_keeps_the_data_unchanged():
+    data = create_server_list_data()
+    expected = json.dumps(data)
+
+    assert json.dumps(intern_server_list_data(data)) == expected
+
+
+def test_memory_footprint_decreases_after_interning_the_server_list_data():
+    server_list = ServerList.from_dict(create_server_list_data(count=50))
+    interned_server_list = ServerList.from_dict(
+        intern_server_list_data(create_server_list_data(count=50))
+    )
+
+    footprint = server_list.memory_footprint()
+    interned_footprint = interned_server_list.memory_footprint()
+
+    assert interned_footprint.logical_servers == footprint.logical_servers
+    assert interned_footprint.physical_servers == footprint.physical_servers
+    assert interned_footprint.values < footprint.values
+    assert interned_footprint.total < footprint.total
+
+
+def test_memory_footprint_decreases_with_compact_servers():
+    server_list = ServerList.from_dict(create_server_list_data(count=50))
+    compact_server_list = ServerList.from_dict(create_server_list_data(count=50), compact=True)
+
+    footprint = server_list.memory_footprint()
+    compact_footprint = compact_server_list.memory_footprint()
+
+    assert all(server.decoded for server in compact_server_list)
+    assert compact_server_list.to_dict()["LogicalServers"] == \
+        server_list.to_dict()["LogicalServers"]
+    assert compact_footprint.values < footprint.values
+
+
+def test_measuring_the_memory_footprint_does_not_decode_the_servers():
+    server_list = ServerList.from_dict(create_server_list_data())
+
+    with patch(f"{LogicalServer.__module__}.PhysicalServer", wraps=PhysicalServer) as physical:
+        server_list.memory_footprint()
+
+    physical.assert_not_called()
@@ -0,0 +1,77 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from proton.vpn.session.exceptions import ServerNotFoundError
+from proton.vpn.session.servers.selection import (
+    RoundRobinSelector, UniformSelector, WeightedSelector
+)
+from proton.vpn.session.servers.types import LogicalServer
+
+
+def create_logical_server(physical_statuses=(1, 1, 0, 1)):
+    return LogicalServer({
+        "ID": "1", "Name": "CH#1", "Status": 1,
+        "Servers": [
+            {"ID": str(i), "Status": status} for i, status in enumerate(physical_statuses)
+        ],
+    })
+
+
+def test_uniform_selector_is_reproducible_with_a_seeded_rng():
+    logical_server = create_logical_server()
+
+    def select_ids(seed):
+        selector = UniformSelector(rng=random.Random(seed))
+        return [selector.select(logical_server).id for _ in range(20)]
+
+    assert select_ids(1) == select_ids(1)
+    assert set(select_ids(1)) <= {"0", "1", "3"}
+
+
+def test_weighted_selector_selects_servers_proportionally_to_their_weight():
+    logical_server = create_logical_server()
+    weights = {"0": 0, "1": 1, "3": 3}
+    selector = WeightedSelector(
+        weight=lambda physical: weights[physical.id], rng=random.Random(0)
+    )
+
+    selections = Counter(selector.select(logical_server).id for _ in range(4000))
+
+    assert "0" not in selections
+    assert 2.5 < selections["3"] / selections["1"] < 3.5
+
+
+def test_round_robin_selector_cycles_through_enabled_servers():
+    logical_server = create_logical_server()
+    selector = RoundRobinSelector(rng=random.Random(0))
+
+    selected_ids = [selector.select(logical_server).id for _ in range(6)]
+
+    assert sorted(selected_ids[:3]) == ["0", "1", "3"]
+    assert selected_ids[3:] == selected_ids[:3]
+
+
+@pytest.mark.parametrize("selector", [UniformSelector(), WeightedSelector(), RoundRobinSelector()])
+def test_selectors_raise_exception_when_there_are_no_enabled_servers(selector):
+    with pytest.raises(ServerNotFoundError):
+        selector.select(create_logical_server(physical_statuses=(0, 0)))
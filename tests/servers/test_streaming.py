@@ -0,0 +1,83 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import io
+import json
+
+import pytest
+
+from proton.vpn.session.servers.logicals import ServerList
+from proton.vpn.session.servers.memory import ValueInterner
+from proton.vpn.session.servers.streaming import load_server_list_stream
+
+SERVER_LIST_DATA = {
+    "Code": 1000,
+    "LogicalServers": [
+        {
+            "ID": "1", "Name": "CH#1", "ExitCountry": "CH", "City": "Zürich",
+            "Tier": 2, "Load": 12, "Score": 1.5, "Status": 1,
+            "Location": {"Lat": 47.37, "Long": 8.54},
+            "Servers": [{"ID": "1-1", "Label": "0", "Status": 1}],
+        },
+        {
+            "ID": "2", "Name": "SE#1", "ExitCountry": "SE", "City": "Stockholm",
+            "Tier": 2, "Load": 100, "Score": 12345.678, "Status": 0,
+            "Servers": [],
+        },
+    ],
+    "MaxTier": 2,
+    "ExpirationTime": 1700000000.25,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64 * 1024])
+@pytest.mark.parametrize("as_bytes", [True, False])
+def test_load_server_list_stream_parses_the_same_data_as_json_load(chunk_size, as_bytes):
+    document = json.dumps(SERVER_LIST_DATA, indent=2, ensure_ascii=False)
+    stream = io.BytesIO(document.encode("utf-8")) if as_bytes else io.StringIO(document)
+    built_logicals = []
+
+    def build_logical(logical_data):
+        built_logicals.append(logical_data["ID"])
+        return logical_data
+
+    data = load_server_list_stream(stream, build_logical, chunk_size=chunk_size)
+
+    assert data == SERVER_LIST_DATA
+    assert built_logicals == ["1", "2"]
+
+
+@pytest.mark.parametrize("document", [
+    "", "[]", '{"LogicalServers": [{}', '{"MaxTier": 1.}', '{"MaxTier": 2} extra',
+    '{"MaxTier": 2,}', "{1: 2}"
+])
+def test_load_server_list_stream_raises_value_error_on_invalid_json(document):
+    with pytest.raises(ValueError):
+        load_server_list_stream(io.StringIO(document), dict, chunk_size=2)
+
+
+def test_server_list_from_stream_is_equivalent_to_from_dict():
+    stream = io.BytesIO(json.dumps(SERVER_LIST_DATA).encode("utf-8"))
+
+    server_list = ServerList.from_stream(stream, interner=ValueInterner(), chunk_size=16)
+
+    expected_server_list = ServerList.from_dict(json.loads(json.dumps(SERVER_LIST_DATA)))
+    assert server_list.to_dict()["LogicalServers"] == \
+        expected_server_list.to_dict()["LogicalServers"]
+    assert server_list.expiration_time == SERVER_LIST_DATA["ExpirationTime"]
+    assert server_list.get_fastest().name == "CH#1"
@@ -16,8 +16,12 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+from unittest.mock import patch
+
 from proton.vpn.session.exceptions import ServerNotFoundError
-from proton.vpn.session.servers.types import PhysicalServer, LogicalServer, ServerLoad
+from proton.vpn.session.servers.types import (
+    PhysicalServer, LogicalServer, ServerLoad, ServerFeatureEnum, TierEnum
+)
 from proton.vpn.session.servers.country_codes import get_country_name_by_code
 
 import pytest
@@ -120,6 +124,18 @@ class TestLogicalServer:
         assert server.physical_servers[0].entry_ip == PhysicalServer(MOCK_PHYSICAL).entry_ip
         assert server.physical_servers[0].exit_ip == PhysicalServer(MOCK_PHYSICAL).exit_ip
 
+    def test_feature_mask_helpers(self):
+        server = LogicalServer({
+            **MOCK_LOGICAL, "Features": ServerFeatureEnum.P2P | ServerFeatureEnum.STREAMING
+        })
+
+        assert server.feature_mask == ServerFeatureEnum.P2P | ServerFeatureEnum.STREAMING
+        assert server.has_features(ServerFeatureEnum.P2P | ServerFeatureEnum.STREAMING)
+        assert not server.has_features(ServerFeatureEnum.P2P | ServerFeatureEnum.TOR)
+        assert server.lacks_features(ServerFeatureEnum.SECURE_CORE | ServerFeatureEnum.TOR)
+        assert not server.lacks_features(ServerFeatureEnum.TOR | ServerFeatureEnum.P2P)
+        assert server.features == [ServerFeatureEnum.P2P, ServerFeatureEnum.STREAMING]
+
     def test_update(self):
         server = LogicalServer(MOCK_LOGICAL)
 
@@ -135,6 +151,78 @@ class TestLogicalServer:
         assert server.score == 3.14159
         assert not server.enabled
 
+    def test_with_load_returns_updated_copy(self):
+        server = LogicalServer({**MOCK_LOGICAL, "Load": LOAD, "Score": SCORE, "Status": L_STATUS})
+
+        updated_server = server.with_load(ServerLoad({
+            "ID": L_ID,
+            "Load": 55,
+            "Score": 3.14159,
+            "Status": 0
+        }))
+
+        assert (updated_server.load, updated_server.score) == (55, 3.14159)
+        assert not updated_server.enabled
+        assert (server.load, server.score) == (LOAD, SCORE)
+        assert server.enabled
+        assert updated_server.physical_servers[0].id == server.physical_servers[0].id
+
+    def test_with_load_returns_same_instance_when_nothing_changes(self):
+        server = LogicalServer({**MOCK_LOGICAL, "Load": LOAD, "Score": SCORE, "Status": L_STATUS})
+
+        assert server.with_load(ServerLoad({
+            "ID": L_ID, "Load": LOAD, "Score": SCORE, "Status": L_STATUS
+        })) is server
+
+    def test_to_dict_round_trips_the_server_data(self):
+        data = {**MOCK_LOGICAL, "Load": LOAD, "Score": SCORE, "Status": L_STATUS}
+        server = LogicalServer(data)
+
+        assert server.to_dict() == data
+        assert LogicalServer(server.to_dict()).to_dict() == data
+
+    def test_to_dict_keeps_the_raw_tier_and_features_values(self):
+        server = LogicalServer({"ID": "1", "Tier": 2, "Features": None})
+
+        data = server.to_dict()
+
+        assert server.tier == TierEnum.PLUS
+        assert type(data["Tier"]) is int  # pylint: disable=unidiomatic-typecheck
+        assert data["Features"] is None
+
+    def test_to_dict_does_not_add_missing_keys(self):
+        data = {"ID": "1", "Name": "CH#1", "UnknownKey": [1, 2]}
+        server = LogicalServer(data)
+
+        assert server.to_dict() == data
+        assert server.tier is None
+        assert server.latitude is None
+
+    def test_attributes_are_decoded_on_first_access(self):
+        server = LogicalServer(MOCK_LOGICAL)
+
+        with patch(f"{LogicalServer.__module__}.PhysicalServer", wraps=PhysicalServer) as physical:
+            assert server.enabled
+            physical.assert_not_called()
+            assert server.physical_servers[0].id == ID
+            physical.assert_called_once()
+
+        assert not server.decoded
+        assert server.city == CITY
+
+    def test_decode_releases_the_server_data_and_keeps_to_dict_unchanged(self):
+        server = LogicalServer(MOCK_LOGICAL)
+        updated_server = server.with_load(
+            ServerLoad({"ID": L_ID, "Load": 90, "Score": SCORE, "Status": L_STATUS})
+        )
+
+        server.decode()
+        updated_server.decode()
+
+        assert server.decoded
+        assert server.to_dict() == MOCK_LOGICAL
+        assert updated_server.to_dict() == {**MOCK_LOGICAL, "Load": 90}
+
     def test_get_data(self):
         server = LogicalServer(MOCK_LOGICAL)
         _data = server.data
@@ -146,6 +234,25 @@ class TestLogicalServer:
         _s = server.get_random_physical_server()
         assert _s.x25519_pk == X25519_PK
 
+    def test_physical_servers_are_built_once(self):
+        server = LogicalServer({
+            **MOCK_LOGICAL, "Status": 1,
+            "Servers": [MOCK_PHYSICAL, {**MOCK_PHYSICAL, "ID": "disabled", "Status": 0}]
+        })
+
+        assert server.physical_servers is server.physical_servers
+        assert [physical.id for physical in server.enabled_physical_servers] == [ID]
+
+    def test_enabled_is_updated_when_status_changes(self):
+        server = LogicalServer({**MOCK_LOGICAL, "Status": 1})
+        assert server.enabled
+
+        server.update(ServerLoad({"ID": L_ID, "Load": 10, "Score": 1.0, "Status": 0}))
+        assert not server.enabled
+
+        server.update(ServerLoad({"ID": L_ID, "Load": 10, "Score": 1.0, "Status": 1}))
+        assert server.enabled
+
     def test_get_random_server_raises_exception(self):
         logical_copy = MOCK_LOGICAL.copy()
         logical_copy["Servers"] = []
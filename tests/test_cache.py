@@ -0,0 +1,155 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import pickle
+from pathlib import PurePosixPath
+from unittest.mock import patch
+
+import pytest
+
+from proton.vpn.session.cache import BinaryCodec, CacheFile, IndexedCodec, JSONCodec
+from proton.vpn.session.servers.logicals import ServerList
+from proton.vpn.session.servers.types import ServerLoad
+
+
+def test_save_replaces_the_file_atomically(tmp_path):
+    cache_file = CacheFile(tmp_path / "cache.json")
+    cache_file.save({"version": 1})
+    cache_file.save({"version": 2})
+
+    assert cache_file.load() == {"version": 2}
+    assert [path.name for path in tmp_path.iterdir()] == ["cache.json"]
+
+
+def test_save_keeps_the_previous_file_if_serialization_fails(tmp_path):
+    cache_file = CacheFile(tmp_path / "cache.json")
+    cache_file.save({"version": 1})
+
+    with pytest.raises(TypeError):
+        cache_file.save({"version": object()})
+
+    assert cache_file.load() == {"version": 1}
+    assert [path.name for path in tmp_path.iterdir()] == ["cache.json"]
+
+
+@pytest.mark.asyncio
+async def test_save_in_background_coalesces_saves_and_only_writes_the_latest_data(tmp_path):
+    cache_file = CacheFile(tmp_path / "cache.json")
+
+    with patch.object(CacheFile, "to_path", wraps=CacheFile.to_path) as to_path:
+        for version in range(5):
+            cache_file.save_in_background({"version": version})
+        cache_file.save_in_background(lambda: {"version": 5})
+        await cache_file.flush()
+
+    assert to_path.call_count == 1
+    assert cache_file.load() == {"version": 5}
+
+
+@pytest.mark.asyncio
+async def test_remove_discards_pending_background_saves(tmp_path):
+    cache_file = CacheFile(tmp_path / "cache.json")
+
+    cache_file.save_in_background({"version": 1})
+    cache_file.remove()
+    await cache_file.flush()
+
+    assert not cache_file.exists
+
+
+@pytest.mark.parametrize("codec", [JSONCodec(), BinaryCodec()])
+def test_load_uses_the_format_the_file_was_saved_with(tmp_path, codec):
+    data = {"LogicalServers": [{"Name": "CH#1", "Load": 12, "Score": 1.5}], "MaxTier": 2}
+    CacheFile(tmp_path / "cache.json", codec=codec).save(data)
+
+    # Binary files are detected by their header, otherwise JSON is assumed.
+    assert CacheFile(tmp_path / "cache.json").load() == data
+    assert CacheFile(tmp_path / "cache.json", codec=BinaryCodec()).load() == data
+
+
+@pytest.mark.parametrize("codec", [BinaryCodec(), IndexedCodec()])
+def test_binary_codecs_round_trip_server_lists(tmp_path, codec):
+    server_list = ServerList.from_dict({
+        "LogicalServers": [
+            {
+                "ID": "1", "Name": "CH#1", "Status": 1, "Servers": [{"Status": 1}],
+                "Load": 20, "Score": 1.0, "Tier": 2, "Features": 4, "ExitCountry": "CH",
+            },
+            {
+                "ID": "2", "Name": "CH#2", "Status": 1, "Servers": [{"Status": 1}],
+                "Load": 30, "Score": 2.0, "Tier": None, "Features": None, "ExitCountry": "CH",
+            },
+        ],
+        "MaxTier": 2,
+    })
+    data = server_list.with_loads([
+        ServerLoad({"ID": "1", "Load": 50, "Score": 3.0, "Status": 1}),
+    ]).to_dict()
+    cache_file = CacheFile(tmp_path / "cache.bin", codec=codec)
+    cache_file.save(data)
+
+    assert CacheFile(tmp_path / "cache.bin").load() == data
+
+
+def test_binary_codec_keeps_shared_values_shared(tmp_path):
+    location = {"Lat": 46.2, "Long": 6.1}
+    cache_file = CacheFile(tmp_path / "cache.bin", codec=BinaryCodec())
+    cache_file.save({"LogicalServers": [{"Location": location}, {"Location": location}]})
+
+    logicals = cache_file.load()["LogicalServers"]
+
+    assert logicals[0]["Location"] is logicals[1]["Location"]
+
+
+@pytest.mark.parametrize("content", [
+    BinaryCodec.MAGIC + b"\x63" + pickle.dumps({}),  # Unknown version.
+    BinaryCodec.HEADER + b"truncated",
+    BinaryCodec.HEADER + pickle.dumps({"path": PurePosixPath("/")}, protocol=5),
+])
+def test_binary_codec_refuses_invalid_content(tmp_path, content):
+    (tmp_path / "cache.bin").write_bytes(content)
+
+    with pytest.raises(ValueError):
+        CacheFile(tmp_path / "cache.bin").load()
+
+
+def test_mapped_cache_decodes_single_records(tmp_path):
+    data = {
+        "LogicalServers": [{"ID": str(i), "Name": f"CH#{i}", "Load": i} for i in range(100)],
+        "MaxTier": 2,
+    }
+    cache_file = CacheFile(tmp_path / "cache.bin", codec=IndexedCodec())
+    cache_file.save(data)
+
+    with cache_file.open_mapped() as cache:
+        assert len(cache) == 100
+        assert cache.data == {"MaxTier": 2}
+        assert cache.get("Name", "CH#42") == {"ID": "42", "Name": "CH#42", "Load": 42}
+        assert cache.get("ID", "7")["Name"] == "CH#7"
+        assert cache.get("Name", "CH#100") is None
+
+    # The whole file can still be loaded at once.
+    assert CacheFile(tmp_path / "cache.bin").load() == data
+
+
+def test_open_mapped_refuses_files_in_other_formats(tmp_path):
+    cache_file = CacheFile(tmp_path / "cache.json")
+    cache_file.save({"LogicalServers": []})
+
+    with pytest.raises(ValueError):
+        cache_file.open_mapped()
@@ -16,8 +16,12 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
+from unittest.mock import Mock
+
 import pytest
 
+from proton.vpn.session.client_config import ClientConfigFetcher
 from proton.vpn.session.exceptions import ClientConfigDecodeError
 from proton.vpn.session.session import ClientConfig
 import time
@@ -103,3 +107,17 @@ def test_from_dict(apidata):
 def test_from_dict_raises_error_when_dict_does_not_have_expected_keys():
     with pytest.raises(ClientConfigDecodeError):
         ClientConfig.from_dict({})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("single_flight, expected_requests", [(True, 1), (False, 3)])
+async def test_client_config_fetcher_coalesces_concurrent_fetches(
+        apidata, counting_session, single_flight, expected_requests
+):
+    session = counting_session({ClientConfigFetcher.ROUTE: apidata})
+    fetcher = ClientConfigFetcher(session, single_flight=single_flight, cache_file=Mock())
+
+    client_configs = await asyncio.gather(fetcher.fetch(), fetcher.fetch(), fetcher.fetch())
+
+    assert len(session.requests) == expected_requests
+    assert len(set(map(id, client_configs))) == expected_requests
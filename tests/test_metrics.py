@@ -0,0 +1,89 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import math
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from proton.vpn.session.metrics import (
+    InMemoryMetricsCollector, get_metrics_collector, set_metrics_collector
+)
+from proton.vpn.session.utils import rest_api_request
+
+
+@pytest.fixture
+def collector():
+    previous_collector = get_metrics_collector()
+    collector = InMemoryMetricsCollector()
+    set_metrics_collector(collector)
+    yield collector
+    set_metrics_collector(previous_collector)
+
+
+def test_in_memory_collector_aggregates_metrics_per_route():
+    collector = InMemoryMetricsCollector(latency_buckets=(0.1, 1.0))
+
+    collector.record_request("/vpn/loads", 0.05, received_bytes=100)
+    collector.record_request("/vpn/loads", 0.5, received_bytes=200)
+    collector.record_request("/vpn/loads", 2.0, error=TimeoutError())
+    collector.record_request("/vpn", 0.2)
+
+    metrics = collector.snapshot()["/vpn/loads"]
+    assert metrics.requests == 3
+    assert metrics.successes == 2
+    assert metrics.errors == {"TimeoutError": 1}
+    assert metrics.received_bytes == 300
+    assert metrics.latency.buckets == (0.1, 1.0, math.inf)
+    assert metrics.latency.counts == (1, 1, 1)
+    assert metrics.latency.minimum == 0.05
+    assert metrics.latency.maximum == 2.0
+    assert metrics.latency.mean == pytest.approx(2.55 / 3)
+    assert metrics.latency.quantile(0.5) == 1.0
+    assert metrics.latency.quantile(1.0) == 2.0
+    assert collector.snapshot()["/vpn"].requests == 1
+
+    collector.reset()
+    assert collector.snapshot() == {}
+
+
+@pytest.mark.asyncio
+async def test_rest_api_request_feeds_the_metrics_collector(collector):
+    raw_response = Mock()
+    raw_response.find_first_header.return_value = "1234"
+    session = Mock()
+    session.async_api_request = AsyncMock(side_effect=[{"Code": 1000}, raw_response])
+
+    await rest_api_request(session, "/vpn/logicals?SecureCoreFilter=all")
+    await rest_api_request(session, "/vpn/logicals?SecureCoreFilter=all", return_raw=True)
+
+    metrics = collector.snapshot()["/vpn/logicals"]
+    assert metrics.requests == 2
+    assert metrics.received_bytes == 1234
+    assert metrics.latency.count == 2
+
+
+@pytest.mark.asyncio
+async def test_rest_api_request_records_errors(collector):
+    session = Mock()
+    session.async_api_request = AsyncMock(side_effect=ConnectionError("Network error"))
+
+    with pytest.raises(ConnectionError):
+        await rest_api_request(session, "/vpn/v1/certificate")
+
+    assert collector.snapshot()["/vpn/v1/certificate"].errors == {"ConnectionError": 1}
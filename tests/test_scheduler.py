@@ -0,0 +1,116 @@
+"""
+Copyright (c) 2023 Proton AG
+
+This file is part of Proton VPN.
+
+Proton VPN is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Proton VPN is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import random
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from proton.vpn.session.scheduler import RefreshScheduler, RefreshTask
+
+
+class FakeClock:
+    """Clock whose time only advances when sleeping."""
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+async def wait_until(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("Condition not met")
+
+
+class FakeData:
+    def __init__(self, clock, expiration_time, refresh_interval=1000):
+        self.clock = clock
+        self.expiration_time = expiration_time
+        self.refresh_interval = refresh_interval
+        self.refresh_times = []
+
+    async def refresh(self):
+        self.refresh_times.append(self.clock.time())
+        self.expiration_time = self.clock.time() + self.refresh_interval
+
+
+@pytest.mark.asyncio
+async def test_scheduler_refreshes_data_shortly_before_it_expires():
+    clock = FakeClock()
+    data = FakeData(clock, expiration_time=clock.time() + 500)
+    scheduler = RefreshScheduler(
+        [RefreshTask("data", lambda: data.expiration_time, data.refresh)],
+        clock=clock.time, sleep=clock.sleep, lead_time=60, jitter=30, rng=random.Random(0)
+    )
+
+    scheduler.start()
+    try:
+        await wait_until(lambda: len(data.refresh_times) == 2)
+    finally:
+        await scheduler.stop()
+
+    assert not scheduler.running
+    assert 1000 + 500 - 90 <= data.refresh_times[0] <= 1000 + 500 - 60
+    assert data.refresh_times[0] + 1000 - 90 <= data.refresh_times[1] \
+        <= data.refresh_times[0] + 1000 - 60
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_after_a_refresh_error_and_waits_for_missing_data():
+    clock = FakeClock()
+    refresh = AsyncMock(side_effect=Exception("Network error"))
+    expiration_times = iter([None, clock.time()])
+    scheduler = RefreshScheduler(
+        [RefreshTask("data", lambda: next(expiration_times, clock.time()), refresh)],
+        clock=clock.time, sleep=clock.sleep, retry_delay=10
+    )
+
+    scheduler.start()
+    try:
+        await wait_until(lambda: refresh.await_count == 3)
+    finally:
+        await scheduler.stop()
+
+    # 10 seconds waiting for the data, then 10 seconds after each failed refresh.
+    assert clock.time() >= 1000 + 10 + 2 * 10
+
+
+def test_scheduler_for_session_uses_the_session_expiration_times():
+    session = Mock()
+    session.server_list.expiration_time = 1
+    session.server_list.loads_expiration_time = 2
+    session.client_config.expiration_time = 3
+    session.vpn_account.certificate.RefreshTime = 4
+
+    scheduler = RefreshScheduler.for_session(session)
+
+    # pylint: disable=protected-access
+    assert [task.get_expiration_time() for task in scheduler._tasks] == [1, 2, 3, 4]
+    assert [task.refresh for task in scheduler._tasks] == [
+        session.fetch_server_list, session.update_server_loads,
+        session.fetch_client_config, session.fetch_certificate
+    ]
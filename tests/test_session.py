@@ -16,9 +16,11 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with ProtonVPN.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
 import tempfile
+import time
 from os.path import basename
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 from unittest.mock import Mock
 
 import pytest
@@ -122,3 +124,123 @@ async def test_submit_report():
         assert form_field.value == bug_report.attachments[1]
         assert form_field.filename == basename(form_field.value.name)
 
+
+def create_stale_server_list(expired_seconds_ago: float):
+    server_list = Mock()
+    server_list.expired = True
+    server_list.expiration_time = time.time() - expired_seconds_ago
+    return server_list
+
+
+@pytest.mark.asyncio
+async def test_server_list_is_returned_while_being_revalidated_in_the_background():
+    fresh_server_list = Mock(expired=False, loads_expired=False)
+    refresh_done = asyncio.Event()
+
+    async def fetch_server_list():
+        await refresh_done.wait()
+        return fresh_server_list
+
+    fetcher = Mock()
+    fetcher.fetch_server_list = AsyncMock(side_effect=fetch_server_list)
+    stale_server_list = create_stale_server_list(expired_seconds_ago=10)
+    s = VPNSession(fetcher=fetcher, server_list=stale_server_list, stale_while_revalidate=True)
+
+    assert s.server_list is stale_server_list
+    assert s.server_list is stale_server_list
+    assert await s.get_server_list() is stale_server_list
+
+    refresh_done.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    fetcher.fetch_server_list.assert_called_once()
+    assert s.server_list is fresh_server_list
+
+
+@pytest.mark.asyncio
+async def test_get_server_list_waits_for_the_refresh_beyond_the_max_staleness():
+    fresh_server_list = Mock()
+    fetcher = Mock()
+    fetcher.fetch_server_list = AsyncMock(return_value=fresh_server_list)
+    s = VPNSession(
+        fetcher=fetcher, server_list=create_stale_server_list(expired_seconds_ago=120),
+        stale_while_revalidate=True, max_staleness=60
+    )
+
+    assert await s.get_server_list() is fresh_server_list
+    fetcher.fetch_server_list.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_revalidation_is_not_retried_before_the_retry_delay():
+    fetcher = Mock()
+    fetcher.fetch_server_list = AsyncMock(side_effect=RuntimeError("API unreachable"))
+    stale_server_list = create_stale_server_list(expired_seconds_ago=10)
+    s = VPNSession(
+        fetcher=fetcher, server_list=stale_server_list,
+        stale_while_revalidate=True, revalidation_retry_delay=60
+    )
+
+    assert s.server_list is stale_server_list
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert s.server_list is stale_server_list
+    assert await s.get_server_list() is stale_server_list
+    await asyncio.sleep(0)
+    fetcher.fetch_server_list.assert_called_once()
+
+    with patch("time.monotonic", return_value=time.monotonic() + 60):
+        assert s.server_list is stale_server_list
+    await asyncio.sleep(0)
+    assert fetcher.fetch_server_list.call_count == 2
+
+
+def test_server_list_is_not_revalidated_by_default():
+    fetcher = Mock()
+    stale_server_list = create_stale_server_list(expired_seconds_ago=10)
+    s = VPNSession(fetcher=fetcher, server_list=stale_server_list)
+
+    assert s.server_list is stale_server_list
+    fetcher.fetch_server_list.assert_not_called()
+
+
+def create_session_fetching_certificate(fetch_certificate: AsyncMock) -> VPNSession:
+    fetcher = Mock()
+    fetcher.fetch_certificate = fetch_certificate
+    s = VPNSession(fetcher=fetcher, vpn_account=Mock())
+    s._requests_lock = Mock()
+    s._requests_unlock = Mock()
+    return s
+
+
+@pytest.mark.asyncio
+async def test_fetch_certificate_replaces_the_certificate_of_the_vpn_account():
+    certificate = Mock()
+    s = create_session_fetching_certificate(AsyncMock(return_value=certificate))
+    vpn_account = s.vpn_account
+
+    with patch("proton.vpn.session.session.VPNSecrets") as vpn_secrets:
+        assert await s.fetch_certificate() is certificate
+
+    s._fetcher.fetch_certificate.assert_called_once_with(
+        client_public_key=vpn_secrets.return_value.ed25519_pk_pem
+    )
+    vpn_account.with_certificate.assert_called_once_with(certificate)
+    assert s.vpn_account is vpn_account.with_certificate.return_value
+    s._requests_lock.assert_called_once_with(no_condition_check=True)
+    s._requests_unlock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_fetch_certificate_releases_the_requests_lock_when_the_request_fails():
+    s = create_session_fetching_certificate(AsyncMock(side_effect=ConnectionError()))
+    vpn_account = s.vpn_account
+
+    with patch("proton.vpn.session.session.VPNSecrets"), pytest.raises(ConnectionError):
+        await s.fetch_certificate()
+
+    assert s.vpn_account is vpn_account
+    vpn_account.with_certificate.assert_not_called()
+    s._requests_unlock.assert_called_once()